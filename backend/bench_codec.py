@@ -0,0 +1,128 @@
+"""
+backend/bench_codec.py
+Storage codec benchmark: stores the same poller-shaped runs with every codec in
+storage/codec.py and reports payload bytes per run (runs.data + readings.extra)
+and get_run latency, plus the time spent decoding the payload columns alone.
+Values under codec.ZSTD_MIN_BYTES are stored uncompressed by the +zstd codecs.
+Usage: python bench_codec.py [--runs 200] [--calls 2000]
+
+Uses a throwaway database file; runs.db is not touched.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+_TMP_DIR = tempfile.TemporaryDirectory()
+os.environ["ENERGENT_DB_PATH"] = os.path.join(_TMP_DIR.name, "bench.db")
+
+import database
+from storage import codec
+
+DECODE_REPEATS = 5  # best of, so the codec order (cache warmth) doesn't skew the comparison
+
+_PAYLOAD_BYTES = '''
+    SELECT
+        (SELECT sum(length(CAST(data AS BLOB))) FROM runs WHERE run_id GLOB ? || '*'),
+        (SELECT sum(length(CAST(extra AS BLOB))) FROM readings WHERE run_id GLOB ? || '*')
+'''
+_PAYLOADS = '''
+    SELECT data AS value FROM runs WHERE run_id GLOB ? || '*'
+    UNION ALL
+    SELECT extra FROM readings WHERE run_id GLOB ? || '*'
+'''
+
+
+def _sample_run(prefix: str, i: int) -> dict:
+    """A completed run shaped like the poller's output (60 readings with their extra fields)."""
+    readings = [
+        {"gpu_watts": 20.0 + j % 7, "cpu_watts": 9.5, "npu_watts": 0.2, "total_watts": 29.7 + j % 7,
+         "gpu_utilization_pct": 41.0 + j % 5, "cpu_utilization_pct": 12.5, "npu_utilization_pct": 0.0,
+         "timestamp": 1_700_000_000 + j, "co2_g_cumulative": 0.01 * j, "source": "live",
+         "interval_s": 1.0003, "jitter_ms": 0.31, "latency_ms": {"gpu": 3.12, "cpu": 0.41, "npu": 0.05},
+         "stale": [], "ts": 1_700_000_000.1234 + j, "samples": 1, "seq": 10_000 + j,
+         "cpu_domain_watts": {"package-0": 8.1, "package-0/dram": 1.4},
+         "gpu_card_watts": [20.0 + j % 7], "gpu_card_utilization_pct": [41.0 + j % 5]}
+        for j in range(60)
+    ]
+    return {
+        "run_id": f"{prefix}{i:08x}", "model": "distilbert-base-uncased", "task": "NLP",
+        "precision": "FP32", "compute_target": "gpu", "batch_size": 1, "num_samples": 100,
+        "device_index": None, "status": "complete", "started_at": 1_700_000_000 + i,
+        "completed_at": 1_700_000_010 + i, "duration_s": 1.2, "avg_watts": 31.4, "total_energy_wh": 0.0105,
+        "co2_g": 0.0086, "grade": "B", "grid_intensity": 820.0, "energy_method": "counters+samples",
+        "energy_samples": 600, "energy_devices_j": {"gpu": 24.1, "cpu": 11.4, "npu": 0.24},
+        "energy_domains_j": {"rapl:package-0": 9.7, "rapl:package-0/dram": 1.7, "amdgpu:0": 24.1},
+        "power_readings": readings,
+    }
+
+
+def _time_decode(values: list) -> float:
+    start = time.perf_counter()
+    for value in values:
+        codec.decode(value)
+    return (time.perf_counter() - start) * 1e6
+
+
+def _time_calls(fn, args_list: list[tuple]) -> list[float]:
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def _summary(samples: list[float]) -> str:
+    ordered = sorted(samples)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    return f"mean {statistics.mean(samples):7.1f} µs   p50 {statistics.median(samples):7.1f} µs   p95 {p95:7.1f} µs"
+
+
+def run_benchmark(n_runs: int, n_calls: int) -> dict:
+    database.init_db()
+    conn = database.get_db()
+    codecs = [name for name in codec.CODECS if codec.available(name)]
+    results = {}
+    print("\n" + "=" * 78)
+    print(f"  Energent AI — storage codecs ({n_runs} runs × 60 readings, {n_calls} get_run calls)")
+    print("=" * 78)
+    for name in codecs:
+        prefix = f"{name}_"
+        database.STORAGE_CODEC = name
+        runs = [_sample_run(prefix, i) for i in range(n_runs)]
+        for run in runs:
+            database.save_run(run)
+        database.flush_runs()
+
+        data_bytes, extra_bytes = conn.execute(_PAYLOAD_BYTES, (prefix, prefix)).fetchone()
+        per_run = (data_bytes + extra_bytes) / n_runs
+        values = [row[0] for row in conn.execute(_PAYLOADS, (prefix, prefix))]
+        decode_us = min(_time_decode(values) for _ in range(DECODE_REPEATS)) / n_runs
+        reads = _time_calls(database.get_run, [(runs[i % n_runs]["run_id"],) for i in range(n_calls)])
+
+        results[name] = {"bytes_per_run": per_run, "decode_us": decode_us, "get_run_mean_us": statistics.mean(reads)}
+        baseline = results[codec.JSON]
+        print(f"  {name:<13} {per_run:8.0f} B/run  ({per_run / baseline['bytes_per_run']:4.0%} of json)   "
+              f"payload decode {decode_us:6.1f} µs/run")
+        print(f"  {'':<13} get_run {_summary(reads)}")
+    print("=" * 78 + "\n")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    try:
+        run_benchmark(args.runs, args.calls)
+    finally:
+        database.close_db()
+        _TMP_DIR.cleanup()
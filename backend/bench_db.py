@@ -0,0 +1,172 @@
+"""
+backend/bench_db.py
+Micro-benchmark for the database layer: per-call latency of save_run / get_run /
+get_history with a fresh connection per call and one JSON blob per run (the old
+layout) versus the pooled connections, normalized schema and write-behind queue.
+Usage: python bench_db.py [--runs 200] [--calls 2000]
+
+Uses a throwaway database file; runs.db is not touched.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+_TMP_DIR = tempfile.TemporaryDirectory()
+os.environ["ENERGENT_DB_PATH"] = os.path.join(_TMP_DIR.name, "bench.db")
+
+import database
+
+
+def _sample_run(i: int) -> dict:
+    readings = [
+        {"gpu_watts": 20.0 + j % 7, "cpu_watts": 9.5, "npu_watts": 0.2, "total_watts": 29.7 + j % 7,
+         "timestamp": 1_700_000_000 + j, "co2_g_cumulative": 0.01 * j, "source": "live"}
+        for j in range(60)
+    ]
+    return {
+        "run_id": f"run_{i:08x}", "model": "distilbert-base-uncased", "task": "NLP",
+        "precision": "FP32", "compute_target": "gpu", "batch_size": 1, "num_samples": 100,
+        "status": "complete", "started_at": 1_700_000_000 + i, "completed_at": 1_700_000_010 + i,
+        "duration_s": 1.2, "avg_watts": 31.4, "total_energy_wh": 0.0105, "co2_g": 0.0086,
+        "grade": "B", "grid_intensity": 820.0, "power_readings": readings,
+    }
+
+
+# ── Baseline: the previous connection-per-call, JSON-blob implementation ──────
+LEGACY_DB_PATH = os.path.join(_TMP_DIR.name, "legacy.db")
+_LEGACY_UPSERT = '''
+    INSERT INTO runs (run_id, data, started_at, status)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(run_id) DO UPDATE SET
+        data = excluded.data, started_at = excluded.started_at, status = excluded.status
+'''
+_LEGACY_SELECT_RUN = 'SELECT data FROM runs WHERE run_id = ?'
+_LEGACY_SELECT_HISTORY = "SELECT data FROM runs WHERE status = 'complete' ORDER BY started_at DESC LIMIT ?"
+
+
+def _init_legacy_db():
+    conn = sqlite3.connect(LEGACY_DB_PATH)
+    conn.execute('PRAGMA journal_mode=WAL;')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT PRIMARY KEY,
+            data JSON NOT NULL,
+            started_at INTEGER,
+            status TEXT
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def _fresh_conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(LEGACY_DB_PATH, check_same_thread=False, timeout=30.0)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def save_run_per_call(run: dict):
+    conn = _fresh_conn()
+    try:
+        conn.execute(_LEGACY_UPSERT, (run["run_id"], json.dumps(run), run["started_at"], run["status"]))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def get_run_per_call(run_id: str) -> dict | None:
+    conn = _fresh_conn()
+    try:
+        row = conn.execute(_LEGACY_SELECT_RUN, (run_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+    finally:
+        conn.close()
+
+
+def get_history_per_call(limit: int = 20) -> list[dict]:
+    conn = _fresh_conn()
+    try:
+        rows = conn.execute(_LEGACY_SELECT_HISTORY, (limit,)).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+    finally:
+        conn.close()
+
+
+def _history_page(limit: int = 20) -> list[dict]:
+    return database.query_history(limit, fields=_PAGE_FIELDS)[0]
+
+
+_PAGE_FIELDS = ("model", "task", "precision", "compute_target", "grade", "avg_watts", "co2_g", "started_at")
+
+
+def _time_calls(fn, args_list: list[tuple]) -> list[float]:
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def _summary(samples: list[float]) -> str:
+    ordered = sorted(samples)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    return f"mean {statistics.mean(samples):8.1f} µs   p50 {statistics.median(samples):8.1f} µs   p95 {p95:8.1f} µs"
+
+
+def run_benchmark(n_runs: int, n_calls: int) -> dict:
+    _init_legacy_db()
+    runs = [_sample_run(i) for i in range(n_runs)]
+    reads = [(runs[i % n_runs]["run_id"],) for i in range(n_calls)]
+    writes = [(runs[i % n_runs],) for i in range(n_calls)]
+    history = [(20,)] * max(1, n_calls // 10)
+
+    cases = {
+        "save_run": (save_run_per_call, database.save_run, writes),
+        "get_run": (get_run_per_call, database.get_run, reads),
+        "get_history": (get_history_per_call, database.get_history, history),
+        # History page as the runs table renders it: no readings, no JSON remainder
+        "history_page": (get_history_per_call, _history_page, history),
+    }
+    results = {}
+    print("\n" + "=" * 78)
+    print(f"  Energent AI — database per-call latency ({n_runs} runs, {n_calls} calls)")
+    print("=" * 78)
+    for name, (before, after, args_list) in cases.items():
+        old = _time_calls(before, args_list)
+        new = _time_calls(after, args_list)
+        results[name] = {"before_mean_us": statistics.mean(old), "after_mean_us": statistics.mean(new)}
+        print(f"  {name:<12} before  {_summary(old)}")
+        print(f"  {'':<12} after   {_summary(new)}   ({statistics.mean(old) / statistics.mean(new):.1f}× faster)")
+        if name == "save_run":
+            # save_run only queues; include the time the writer needs to commit the backlog
+            start = time.perf_counter()
+            database.flush_runs()
+            drain_ms = (time.perf_counter() - start) * 1e3
+            results[name]["drain_ms"] = drain_ms
+            per_call = (sum(old) / 1e3) / (sum(new) / 1e3 + drain_ms)
+            print(f"  {'':<12} queue drained in {drain_ms:.1f} ms  "
+                  f"{database._writer.stats()}   ({per_call:.1f}× faster end to end)")
+    print("=" * 78 + "\n")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    try:
+        run_benchmark(args.runs, args.calls)
+    finally:
+        database.close_db()
+        _TMP_DIR.cleanup()
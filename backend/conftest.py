@@ -0,0 +1,22 @@
+"""
+Shared pytest fixtures. database.py opens runs.db on import, so point it at a
+scratch directory before any test module imports it.
+"""
+import os
+import tempfile
+
+import pytest
+
+os.environ.setdefault("ENERGENT_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="energent-test-"), "runs.db"))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """database.py on a fresh, fully migrated runs.db (with its own archive dir) under tmp_path."""
+    import database
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "runs.db"))
+    monkeypatch.setattr(database, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    database.close_db()  # every thread reopens on the new path
+    database.init_db()
+    yield database
+    database.close_db()
@@ -1,24 +1,156 @@
 """
 Database layer for Energent AI.
 Uses SQLite to persist workload runs so history survives restarts.
+Run settings and results are typed, indexed columns on `runs` (anything else goes
+in its `data` column); power readings are rows of `readings`, keyed by
+(run_id, seq). Older single-blob databases are upgraded in place by init_db().
+Each thread keeps one persistent connection (PRAGMAs set once, warm page cache,
+statement cache reused across calls); close_db() closes them all on shutdown.
+Free-form fields (runs.data, readings.extra) are stored with STORAGE_CODEC
+(storage/codec.py); readers decode any codec, including the original JSON text.
+Readings of runs older than RUN_READINGS_RETENTION_D are moved to compressed day
+files under ARCHIVE_DIR and read back from there transparently.
+save_run() is write-behind: updates are queued, coalesced per run_id and committed
+in batches by a single writer thread, while get_run()/get_history() read pending
+updates from an in-memory overlay. close_db() flushes the queue first.
 """
+import atexit
+import base64
+import os
 import sqlite3
 import json
 import logging
-from typing import Any
+import threading
+import time
+from typing import Any, Iterator
+
+from storage import archive, codec, rollups, timeseries
 
 logger = logging.getLogger(__name__)
-DB_PATH = "runs.db"
+DB_PATH = os.getenv("ENERGENT_DB_PATH", "runs.db")
+ARCHIVE_DIR = os.getenv("ENERGENT_ARCHIVE_DIR", os.path.join(os.path.dirname(DB_PATH) or ".", "archive"))
+# Readings of runs older than this live in ARCHIVE_DIR (see storage/maintenance.py)
+READINGS_RETENTION_S = float(os.getenv("RUN_READINGS_RETENTION_D", "14")) * 86400
+STATEMENT_CACHE_SIZE = 256
+WRITE_BATCH_MAX = int(os.getenv("DB_WRITE_BATCH_MAX", "256"))  # runs per transaction
+WRITE_LINGER_S = float(os.getenv("DB_WRITE_LINGER_MS", "20")) / 1000.0  # wait for more updates to coalesce
+WRITE_RETRIES = 5             # attempts after a "database is locked"/busy error
+WRITE_RETRY_BACKOFF_S = 0.05  # doubled after every attempt (~1.5 s in total)
+STORAGE_CODEC = codec.resolve(os.getenv("STORAGE_CODEC", codec.PACKED))  # for new writes only
+
+_local = threading.local()
+_connections: list[sqlite3.Connection] = []  # every thread's connection, for close_db()
+_connections_lock = threading.Lock()
+_generation = 0  # bumped by close_db(); threads reopen on their next call
+
+SCHEMA_VERSION = 4  # PRAGMA user_version; 0 = single JSON blob per run, 1 = normalized
+
+# Typed, indexed run columns; every other run field lives in `data` and
+# power readings live in the `readings` table.
+RUN_COLUMNS = {
+    "model": "TEXT",
+    "task": "TEXT",
+    "precision": "TEXT",
+    "compute_target": "TEXT",
+    "batch_size": "INTEGER",
+    "num_samples": "INTEGER",
+    "status": "TEXT",
+    "started_at": "INTEGER",
+    "completed_at": "INTEGER",
+    "duration_s": "REAL",
+    "avg_watts": "REAL",
+    "total_energy_wh": "REAL",
+    "co2_g": "REAL",
+    "grade": "TEXT",
+    "grid_intensity": "REAL",
+}
+# Typed reading columns; the rest of each reading (latency, per-domain/per-card
+# watts, ...) is kept in readings.extra
+READING_COLUMNS = {
+    "timestamp": "INTEGER",
+    "gpu_watts": "REAL",
+    "cpu_watts": "REAL",
+    "npu_watts": "REAL",
+    "total_watts": "REAL",
+    "gpu_utilization_pct": "REAL",
+    "cpu_utilization_pct": "REAL",
+    "npu_utilization_pct": "REAL",
+    "co2_g_cumulative": "REAL",
+    "source": "TEXT",
+}
+
+# SQL kept as constants so each connection's statement cache hits on identical text
+_RUN_FIELDS = ("run_id", *RUN_COLUMNS, "data")
+_UPSERT_RUN = f'''
+    INSERT INTO runs ({", ".join(_RUN_FIELDS)})
+    VALUES ({", ".join("?" for _ in _RUN_FIELDS)})
+    ON CONFLICT(run_id) DO UPDATE SET
+        {", ".join(f"{c} = excluded.{c}" for c in _RUN_FIELDS[1:])}
+'''
+_READING_FIELDS = ("run_id", "seq", *READING_COLUMNS, "extra")
+_UPSERT_READING = f'''
+    INSERT OR REPLACE INTO readings ({", ".join(_READING_FIELDS)})
+    VALUES ({", ".join("?" for _ in _READING_FIELDS)})
+'''
+_TRIM_READINGS = 'DELETE FROM readings WHERE run_id = ? AND seq >= ?'
+_SELECT_STATUS = 'SELECT status FROM runs WHERE run_id = ?'
+_SELECT_RUN = f'SELECT {", ".join(_RUN_FIELDS)} FROM runs WHERE run_id = ?'
+_SELECT_READINGS_AFTER = f'''
+    SELECT {", ".join(_READING_FIELDS)} FROM readings
+    WHERE run_id = ? AND seq > ?
+    ORDER BY seq
+    LIMIT ?
+'''
+_SELECT_READINGS = f'''
+    SELECT {", ".join(_READING_FIELDS)} FROM readings
+    WHERE run_id = ?
+    ORDER BY seq
+'''
+
 
-def get_db():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=30.0)
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        DB_PATH, check_same_thread=False, timeout=30.0, cached_statements=STATEMENT_CACHE_SIZE,
+    )
     conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA synchronous=NORMAL;')  # safe with WAL; fsync only at checkpoints
     return conn
 
+
+def get_db() -> sqlite3.Connection:
+    """This thread's persistent connection, opened on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "generation", None) != _generation:
+        conn = _connect()
+        _local.conn, _local.generation = conn, _generation
+        with _connections_lock:
+            _connections.append(conn)
+    return conn
+
+
+def close_db():
+    """Flush pending writes, then close every thread's connection (called on shutdown)."""
+    global _generation
+    _writer.stop()
+    with _connections_lock:
+        connections = list(_connections)
+        _connections.clear()
+        _generation += 1
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"DB close error: {e}")
+
+
 def init_db():
-    """Initialize the database schema if it doesn't exist."""
+    """Create the schema, or upgrade an existing runs.db in place."""
     conn = sqlite3.connect(DB_PATH)
     try:
+        # Let scheduled maintenance hand freed pages back to the filesystem in small steps.
+        # Only takes effect on a new file (and only before WAL is set); an existing one is
+        # switched over by storage/maintenance.py, since that needs a full VACUUM
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL;')
         # Set WAL mode once
         conn.execute('PRAGMA journal_mode=WAL;')
         c = conn.cursor()
@@ -31,51 +163,451 @@ def init_db():
             )
         ''')
         conn.commit()
+        version = conn.execute('PRAGMA user_version;').fetchone()[0]
+        if version < 1:
+            _migrate_v1(conn)
+        if version < 2:
+            _migrate_v2(conn)
+        if version < 3:
+            _migrate_v3(conn)
+        if version < 4:
+            _migrate_v4(conn)
     finally:
         conn.close()
 
+
+def _migrate_v1(conn: sqlite3.Connection):
+    """Split the JSON blob into typed columns and move readings to their own table."""
+    with conn:
+        existing = {row[1] for row in conn.execute('PRAGMA table_info(runs);')}
+        for column, sql_type in RUN_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f'ALTER TABLE runs ADD COLUMN {column} {sql_type};')
+        columns = ",\n                ".join(f"{c} {t}" for c, t in READING_COLUMNS.items())
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS readings (
+                run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+                seq INTEGER NOT NULL,
+                {columns},
+                extra JSON,
+                PRIMARY KEY (run_id, seq)
+            ) WITHOUT ROWID
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_runs_status_started ON runs(status, started_at);')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_runs_config ON runs(model, precision, compute_target);')
+
+        rows = conn.execute('SELECT run_id, data FROM runs;').fetchall()
+        for run_id, data in rows:
+            run = json.loads(data)
+            if not isinstance(run, dict):
+                continue
+            run.setdefault("run_id", run_id)
+            _write_run(conn, run, rollup=False)
+        conn.execute('PRAGMA user_version = 1;')
+    if rows:
+        logger.info(f"Migrated {len(rows)} runs to schema v1")
+
+
+def _migrate_v2(conn: sqlite3.Connection):
+    """Extend the history index with run_id so keyset pages are a pure index range scan."""
+    with conn:
+        conn.execute('DROP INDEX IF EXISTS idx_runs_status_started;')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_runs_history ON runs(status, started_at, run_id);')
+        conn.execute('PRAGMA user_version = 2;')
+
+
+def _migrate_v3(conn: sqlite3.Connection):
+    """Add the aggregate rollup tables and fold in every run completed so far."""
+    with conn:
+        rollups.create(conn)
+        count = rollups.backfill(conn, tuple(RUN_COLUMNS))
+        conn.execute('PRAGMA user_version = 3;')
+    if count:
+        logger.info(f"Backfilled rollups from {count} completed runs")
+
+
+def _migrate_v4(conn: sqlite3.Connection):
+    """Add the tiered node power time series tables."""
+    with conn:
+        timeseries.create(conn)
+        conn.execute('PRAGMA user_version = 4;')
+
+
+def _write_run(conn: sqlite3.Connection, run: dict, rollup: bool = True):
+    """
+    Upsert one run's columns, remaining fields and readings (caller owns the transaction).
+    The first save of a run as complete also folds it into the aggregate rollups.
+    """
+    readings = run.get("power_readings") or []
+    extra = {k: v for k, v in run.items() if k not in RUN_COLUMNS and k not in ("run_id", "power_readings")}
+    completes = False
+    if rollup and run.get("status") == "complete":
+        previous = conn.execute(_SELECT_STATUS, (run["run_id"],)).fetchone()
+        completes = previous is None or previous[0] != "complete"
+    conn.execute(_UPSERT_RUN, (
+        run["run_id"], *(run.get(c) for c in RUN_COLUMNS), codec.encode(extra, STORAGE_CODEC),
+    ))
+    if completes:
+        rollups.record_completion(conn, run)
+    if readings:
+        conn.executemany(_UPSERT_READING, [
+            (run["run_id"], seq, *(r.get(c) for c in READING_COLUMNS),
+             codec.encode({k: v for k, v in r.items() if k not in READING_COLUMNS}, STORAGE_CODEC))
+            for seq, r in enumerate(readings)
+        ])
+    conn.execute(_TRIM_READINGS, (run["run_id"], len(readings)))
+
+
+def _row_to_run(row: sqlite3.Row, readings: list[dict]) -> dict:
+    # row is (run_id, *RUN_COLUMNS, data)
+    run = dict(zip(_RUN_FIELDS[:-1], row[:-1]))
+    if row[-1]:
+        run.update(codec.decode(row[-1]))
+    run["power_readings"] = readings
+    return run
+
+
+def _row_to_reading(row: sqlite3.Row) -> dict:
+    # row is (run_id, seq, *READING_COLUMNS, extra)
+    reading = dict(zip(READING_COLUMNS, row[2:-1]))
+    if row[-1]:
+        reading.update(codec.decode(row[-1]))
+    return reading
+
+
+# ── Write-behind queue ────────────────────────────────────────────────────────
+class RunWriter:
+    """
+    Single writer thread for run upserts. Pending runs are keyed by run_id, so a
+    run saved several times before the next commit is written once, and each batch
+    is one transaction. Until committed, pending runs double as a read overlay.
+    A locked database is retried with backoff; a batch that still fails is committed
+    run by run, so only a run that can't be written is lost.
+    """
+
+    def __init__(self, batch_max: int = WRITE_BATCH_MAX, linger_s: float = WRITE_LINGER_S):
+        self.batch_max = batch_max
+        self.linger_s = linger_s
+        self._pending: dict[str, dict] = {}     # run_id -> latest unsaved snapshot
+        self._in_flight: dict[str, dict] = {}   # being committed right now; still readable
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._running = False
+        self.committed = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    def submit(self, run: dict):
+        # Shallow copy: callers keep mutating their dict after saving it
+        snapshot = dict(run)
+        with self._cond:
+            if snapshot["run_id"] in self._pending:
+                self.coalesced += 1
+            self._pending[snapshot["run_id"]] = snapshot
+            if not self._running:
+                self._start()
+            self._cond.notify_all()
+
+    def get(self, run_id: str) -> dict | None:
+        with self._cond:
+            run = self._pending.get(run_id) or self._in_flight.get(run_id)
+        return dict(run) if run else None
+
+    def snapshot(self) -> list[dict]:
+        """Every run not yet committed, newest update winning."""
+        with self._cond:
+            merged = {**self._in_flight, **self._pending}
+        return [dict(run) for run in merged.values()]
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until everything submitted so far is committed."""
+        with self._cond:
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._pending and not self._in_flight, timeout)
+
+    def stop(self, timeout: float = 10.0):
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            logger.error(f"Run writer did not drain within {timeout}s; {len(self._pending)} runs unsaved")
+
+    def _start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="run-writer", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or not self._running)
+                if not self._pending and not self._running:
+                    return
+                if self._running and self.linger_s > 0 and len(self._pending) < self.batch_max:
+                    # Give the rest of a burst (queued → running → …) a moment to coalesce
+                    self._cond.wait(self.linger_s)
+                run_ids = list(self._pending)[:self.batch_max]
+                self._in_flight = {rid: self._pending.pop(rid) for rid in run_ids}
+            self._commit(list(self._in_flight.values()))
+            with self._cond:
+                self._in_flight = {}
+                self._cond.notify_all()
+
+    def _commit(self, runs: list[dict]):
+        try:
+            self._write(runs)
+            return
+        except Exception as e:
+            if len(runs) == 1:
+                self._drop(runs[0], e)
+                return
+            logger.warning(f"DB batch of {len(runs)} runs failed ({e}); committing them one by one")
+        for run in runs:
+            try:
+                self._write([run])
+            except Exception as e:
+                self._drop(run, e)
+
+    def _write(self, runs: list[dict]):
+        """One transaction for `runs`, retried while the database is locked by another connection."""
+        conn = get_db()
+        delay = WRITE_RETRY_BACKOFF_S
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                with conn:
+                    for run in runs:
+                        _write_run(conn, run)
+                self.committed += len(runs)
+                return
+            except sqlite3.OperationalError as e:
+                transient = "locked" in str(e) or "busy" in str(e)
+                if not transient or attempt == WRITE_RETRIES:
+                    raise
+                logger.warning(f"DB busy ({e}); retrying in {delay * 1000:.0f} ms")
+                time.sleep(delay)
+                delay *= 2
+
+    def _drop(self, run: dict, error: Exception):
+        self.failed += 1
+        logger.error(f"DB Save Error (run {run.get('run_id')} dropped): {error}")
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": len(self._pending) + len(self._in_flight),
+                "committed": self.committed,
+                "coalesced": self.coalesced,
+                "failed": self.failed,
+            }
+
+
+_writer = RunWriter()
+atexit.register(_writer.stop)
+
+
 def save_run(run: dict):
-    """Upsert a run into the database."""
-    conn = get_db()
-    try:
-        data_json = json.dumps(run)
-        conn.execute('''
-            INSERT INTO runs (run_id, data, started_at, status) 
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(run_id) DO UPDATE SET
-                data = excluded.data,
-                status = excluded.status
-        ''', (run["run_id"], data_json, run["started_at"], run["status"]))
-        conn.commit()
-    except Exception as e:
-        logger.error(f"DB Save Error: {e}")
-    finally:
-        conn.close()
+    """Queue an upsert of a run; visible to get_run() immediately, durable shortly after."""
+    _writer.submit(run)
+
+
+def flush_runs(timeout: float | None = None) -> bool:
+    """Wait until every queued save has been committed."""
+    return _writer.flush(timeout)
+
+
+def writer_stats() -> dict:
+    return _writer.stats()
+
+
+def get_aggregates(
+    since: int | None = None,
+    until: int | None = None,
+    group_by: tuple[str, ...] = ("model", "precision", "compute_target"),
+    filters: dict | None = None,
+) -> list[dict]:
+    """Aggregate statistics of committed runs, read from the rollup tables only."""
+    return rollups.query(get_db(), since, until, group_by, filters)
+
 
 def get_run(run_id: str) -> dict | None:
     """Fetch a single run by ID."""
+    pending = _writer.get(run_id)
+    if pending is not None:
+        return pending
     conn = get_db()
-    try:
-        row = conn.execute('SELECT data FROM runs WHERE run_id = ?', (run_id,)).fetchone()
-        if row:
-            return json.loads(row["data"])
-        return None
-    finally:
-        conn.close()
+    row = conn.execute(_SELECT_RUN, (run_id,)).fetchone()
+    if row:
+        readings = [_row_to_reading(r) for r in conn.execute(_SELECT_READINGS, (run_id,))]
+        run = _row_to_run(row, readings)
+        if not readings and _is_cold(run):
+            run["power_readings"] = archive.load(ARCHIVE_DIR, [(run_id, run["started_at"])]).get(run_id, [])
+        return run
+    return None
+
+
+def _is_cold(run: dict) -> bool:
+    """Whether a run is old enough for its readings to have been archived."""
+    return (run.get("started_at") or 0) < time.time() - READINGS_RETENTION_S
+
+
+def iter_run_readings(run_id: str, chunk: int = 500, started_at: int | None = None) -> Iterator[dict]:
+    """
+    A run's readings in order, fetched `chunk` rows at a time (each tagged with run_id).
+    A run still in the write queue is read from there, as get_run() does. Pass
+    started_at to fall back to the archive for cold runs.
+    """
+    pending = _writer.get(run_id)
+    if pending is not None:
+        for reading in list(pending.get("power_readings") or []):
+            yield {"run_id": run_id, **reading}
+        return
+    last = -1
+    while True:
+        rows = get_db().execute(_SELECT_READINGS_AFTER, (run_id, last, chunk)).fetchall()
+        for row in rows:
+            yield {"run_id": run_id, **_row_to_reading(row)}
+        if len(rows) < chunk:
+            break
+        last = rows[-1]["seq"]
+    if last == -1 and not rows and started_at is not None and _is_cold({"started_at": started_at}):
+        for reading in archive.load(ARCHIVE_DIR, [(run_id, started_at)]).get(run_id, []):
+            yield {"run_id": run_id, **reading}
+
 
 def get_history(limit: int = 50) -> list[dict]:
-    """Fetch recently completed runs."""
-    conn = get_db()
+    """Fetch recently completed runs, pending saves included."""
+    return query_history(limit)[0]
+
+
+# ── History queries ───────────────────────────────────────────────────────────
+HISTORY_FILTERS = ("model", "task", "precision", "compute_target", "grade")
+MAX_HISTORY_PAGE = 500
+
+
+def encode_cursor(run: dict) -> str:
+    """Opaque keyset cursor: the (started_at, run_id) of the last run on a page."""
+    raw = json.dumps([run.get("started_at"), run["run_id"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[int, str]:
+    """Inverse of encode_cursor; raises ValueError on anything malformed."""
     try:
-        rows = conn.execute('''
-            SELECT data FROM runs 
-            WHERE status = 'complete' 
-            ORDER BY started_at DESC 
-            LIMIT ?
-        ''', (limit,)).fetchall()
-        return [json.loads(row["data"]) for row in rows]
-    finally:
-        conn.close()
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        started_at, run_id = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(started_at, int) or not isinstance(run_id, str):
+        raise ValueError("Invalid cursor")
+    return started_at, run_id
+
+
+def query_history(
+    limit: int = 50,
+    cursor: str | None = None,
+    filters: dict | None = None,
+    since: int | None = None,
+    until: int | None = None,
+    fields: tuple[str, ...] | None = None,
+    status: str = "complete",
+) -> tuple[list[dict], str | None]:
+    """
+    One page of runs, newest first, ordered by (started_at, run_id) and paged by
+    keyset rather than OFFSET. `filters` maps HISTORY_FILTERS columns to exact values;
+    since/until bound started_at (inclusive). `fields` projects each run: when all
+    of them are columns the JSON data and readings are never read, and readings are
+    only fetched when "power_readings" is asked for. Returns (runs, next_cursor).
+    """
+    limit = max(1, min(limit, MAX_HISTORY_PAGE))
+    after = decode_cursor(cursor) if cursor else None
+    filters = {k: v for k, v in (filters or {}).items() if v is not None}
+    unknown = set(filters) - set(HISTORY_FILTERS)
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}")
+
+    want_readings = fields is None or "power_readings" in fields
+    want_data = fields is None or any(f not in RUN_COLUMNS and f not in ("run_id", "power_readings") for f in fields)
+    columns = ("run_id", *RUN_COLUMNS) if fields is None else (
+        "run_id", *(f for f in RUN_COLUMNS if f in fields or f == "started_at"),
+    )
+
+    where, params = ["status = ?"], [status]
+    for column, value in filters.items():
+        where.append(f"{column} = ?")
+        params.append(value)
+    if since is not None:
+        where.append("started_at >= ?")
+        params.append(since)
+    if until is not None:
+        where.append("started_at <= ?")
+        params.append(until)
+    if after is not None:
+        where.append("(started_at, run_id) < (?, ?)")
+        params.extend(after)
+
+    unsaved = {run["run_id"]: run for run in _writer.snapshot()}
+    pending = {rid: run for rid, run in unsaved.items() if _matches(run, status, filters, since, until, after)}
+    # One extra row tells whether there is a next page; unsaved updates may hide stored rows
+    sql = (
+        f'SELECT {", ".join(columns)}{", data" if want_data else ""} FROM runs '
+        f'WHERE {" AND ".join(where)} ORDER BY started_at DESC, run_id DESC LIMIT ?'
+    )
+    conn = get_db()
+    rows = conn.execute(sql, (*params, limit + 1 + len(unsaved))).fetchall()
+
+    runs = []
+    for row in rows:
+        if row["run_id"] in unsaved:
+            continue  # superseded by an uncommitted save; matching ones are merged below
+        run = dict(zip(columns, row))
+        if want_data and row["data"]:
+            run.update(codec.decode(row["data"]))
+        runs.append(run)
+    if pending:
+        runs += list(pending.values())
+        runs.sort(key=lambda run: (run.get("started_at") or 0, run["run_id"]), reverse=True)
+    page, more = runs[:limit], len(runs) > limit
+
+    if want_readings:
+        stored = [run for run in page if run["run_id"] not in pending]
+        for run, readings in zip(stored, _readings_for(conn, stored)):
+            run["power_readings"] = readings
+        cold = [(run["run_id"], run["started_at"]) for run in stored if not run["power_readings"] and _is_cold(run)]
+        if cold:
+            archived = archive.load(ARCHIVE_DIR, cold)
+            for run in stored:
+                if run["run_id"] in archived:
+                    run["power_readings"] = archived[run["run_id"]]
+    if fields is not None:
+        page = [{k: run[k] for k in ("run_id", *fields) if k in run} for run in page]
+    return page, encode_cursor(runs[limit - 1]) if more else None
+
+
+def _matches(run: dict, status: str, filters: dict, since: int | None, until: int | None, after) -> bool:
+    """The WHERE clause of query_history, for runs still in the write queue."""
+    started_at = run.get("started_at") or 0
+    return (
+        run.get("status") == status
+        and all(run.get(k) == v for k, v in filters.items())
+        and (since is None or started_at >= since)
+        and (until is None or started_at <= until)
+        and (after is None or (started_at, run["run_id"]) < after)
+    )
+
+
+def _readings_for(conn: sqlite3.Connection, rows: list) -> list[list[dict]]:
+    """Readings of several runs in one query, in the order of `rows`."""
+    by_run: dict[str, list[dict]] = {row["run_id"]: [] for row in rows}
+    if not by_run:
+        return []
+    placeholders = ", ".join("?" for _ in by_run)
+    query = f'SELECT {", ".join(_READING_FIELDS)} FROM readings WHERE run_id IN ({placeholders}) ORDER BY run_id, seq'
+    for r in conn.execute(query, tuple(by_run)):
+        by_run[r["run_id"]].append(_row_to_reading(r))
+    return [by_run[row["run_id"]] for row in rows]
 
 # Initialize on module load
 try:
@@ -7,37 +7,41 @@ import logging
 import argparse
 from typing import Any
 
+from measurement.counters import get_counters, energy_delta_j
+
 logger = logging.getLogger(__name__)
 
 # Lazy imports to avoid slow startup
 _pipeline_cache: dict[str, Any] = {}
 
 
-def _get_device(compute_target: str) -> str:
-    """Map compute_target string to torch device."""
+def _get_device(compute_target: str, device_index: int | None = None) -> str:
+    """Map compute_target string (and an optional GPU card index) to torch device."""
     if compute_target == "gpu":
         try:
             import torch
             if torch.cuda.is_available():
-                return "cuda"
+                return "cuda" if device_index is None else f"cuda:{device_index}"
         except ImportError:
             pass
     return "cpu"
 
 
-def load_model(model_id: str, task: str, precision: str, compute_target: str) -> Any:
+def load_model(
+    model_id: str, task: str, precision: str, compute_target: str, device_index: int | None = None,
+) -> Any:
     """
-    Load a HuggingFace pipeline. Caches loaded models.
+    Load a HuggingFace pipeline. Caches loaded models (one copy per GPU card).
     Returns the pipeline object.
     """
-    cache_key = f"{model_id}::{precision}::{compute_target}"
+    cache_key = f"{model_id}::{precision}::{compute_target}::{device_index}"
     if cache_key in _pipeline_cache:
         return _pipeline_cache[cache_key]
 
     from transformers import pipeline
     import torch
 
-    device = _get_device(compute_target)
+    device = _get_device(compute_target, device_index)
     if compute_target == "npu":
         logger.info("ROUTING: Workload assigned to AMD Ryzen AI NPU")
     else:
@@ -84,14 +88,17 @@ def run_inference(
     compute_target: str,
     num_samples: int = 100,
     batch_size: int = 1,
+    device_index: int | None = None,
 ) -> dict:
     """
     Run inference and return timing + sample results.
-    Returns dict with: duration_s, num_samples, avg_inference_s, results_sample
+    Returns dict with: duration_s, num_samples, avg_inference_s, results_sample,
+    energy_domains_j (exact joules per energy-counter domain over the timed section)
     """
+    counters = get_counters()
     # Fast-Sim Fallback: If we just want a quick telemetry demo or pipe fails
     try:
-        pipe = load_model(model_id, task, precision, compute_target)
+        pipe = load_model(model_id, task, precision, compute_target, device_index)
         
         # Generate dummy inputs based on task
         if task in ("NLP", "text-classification", "sentiment-analysis"):
@@ -101,6 +108,7 @@ def run_inference(
         else:
             inputs = ["sample input"] * num_samples
 
+        counters_start = counters.snapshot()
         start = time.monotonic()
         results = []
         for i in range(0, len(inputs), batch_size):
@@ -112,13 +120,16 @@ def run_inference(
                 logger.warning(f"Inference batch error: {e}")
         
         duration_s = time.monotonic() - start
+        counters_end = counters.snapshot()
         avg_inf = duration_s / max(len(inputs), 1)
 
     except Exception as e:
         logger.warning(f"FAST-SIM ACTIVATED: Bypassing real weights for {model_id} ({e})")
         # Simulate a 1-3 second run based on model size
         duration_s = 1.5 if "large" in model_id.lower() else 0.8
+        counters_start = counters.snapshot()
         time.sleep(duration_s)
+        counters_end = counters.snapshot()
         avg_inf = duration_s / num_samples
         results = [{"label": "SIMULATED", "score": 1.0}]
 
@@ -127,6 +138,9 @@ def run_inference(
         "num_samples": num_samples,
         "avg_inference_s": round(avg_inf, 4),
         "results_sample": results[:3],
+        "energy_domains_j": {
+            d: round(j, 6) for d, j in energy_delta_j(counters_start, counters_end).items()
+        },
     }
 
 
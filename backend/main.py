@@ -10,10 +10,11 @@ import time
 import uuid
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query, BackgroundTasks
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query, BackgroundTasks, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -26,10 +27,11 @@ from models import (
     WorkloadRunRequest, WorkloadRun, OptimizationSuggestion,
     HardwareProfile, PredictionResult, Alternative,
 )
-from measurement.poller import get_poller
-from measurement.gpu import get_gpu_model, is_rocm_available, FALLBACK_GPU_TDP_W
-from measurement.cpu import get_cpu_model, is_rapl_available
-from measurement.npu import is_npu_available, get_npu_model
+from measurement.poller import get_poller, average_watts, BUFFER_SIZE
+from measurement.counters import get_counters, attribute_run_energy
+from measurement.gpu import FALLBACK_GPU_TDP_W, close_gpu_backend
+from measurement.cpu import get_cpu_model, is_rapl_available, get_rapl_domains
+from measurement.npu import close_npu_backend
 from carbon.electricity_maps import get_carbon_intensity, get_cached_intensity_sync
 from carbon.calculator import (
     calculate_energy_wh, calculate_co2_grams,
@@ -38,12 +40,28 @@ from carbon.calculator import (
 from inference.optimizer import generate_suggestions
 from inference.predictor import get_predictor
 
-from database import save_run, get_run, get_history
+from database import save_run, get_run, query_history, get_aggregates, close_db, writer_stats
+from storage.export import (
+    FORMATS as EXPORT_FORMATS, RUN_EXPORT_COLUMNS, READING_EXPORT_COLUMNS, READING_CSV_COLUMNS,
+    TIMESERIES_EXPORT_COLUMNS, check_format, run_chunks, reading_chunks, run_reading_chunks,
+    reading_csv_chunks, timeseries_chunks,
+    stream as stream_export,
+)
+from storage.maintenance import get_maintenance
+from storage.timeseries import get_timeseries, readings_timeline
+from streaming.broadcaster import Broadcaster
+from streaming.codec import JSON, MSGPACK, negotiate
+from streaming.views import Subscription
 
 # ── In-memory stores ──────────────────────────────────────────────────────────
 # _runs: dict[str, dict] = {} # Removed in favor of SQLite
-_ws_clients: list[WebSocket] = []    # active WebSocket connections
 _loop: asyncio.AbstractEventLoop | None = None  # captured at startup for thread-safe broadcast
+# Both hooks run on the event loop; a RemotePoller serves them without a socket round-trip
+_broadcaster = Broadcaster(  # active WebSocket clients, their views and replay backlogs
+    history_size=BUFFER_SIZE,
+    history_source=lambda: get_poller().get_buffer(),
+    on_change=lambda n: get_poller().set_subscriber_count(n),
+)
 
 
 # ── App lifecycle ─────────────────────────────────────────────────────────────
@@ -68,15 +86,27 @@ async def lifespan(app: FastAPI):
     # Fetch initial carbon intensity
     carbon = await get_carbon_intensity()
     poller = get_poller()
-    poller.set_grid_intensity(carbon["intensity_g_kwh"])
+    # A call to a shared sampler may have to start it first; keep that off the loop
+    await asyncio.to_thread(poller.set_grid_intensity, carbon["intensity_g_kwh"])
 
-    # Register WebSocket broadcast callback — thread-safe via run_coroutine_threadsafe
+    # Register WebSocket broadcast callback. The threaded poller hops onto the loop via
+    # run_coroutine_threadsafe; the asyncio poller (POLLER_MODE=asyncio) already runs on it.
     def broadcast_reading(reading: dict):
-        if _loop and _loop.is_running():
+        if not (_loop and _loop.is_running()):
+            return
+        if _on_loop_thread():
+            _loop.create_task(_broadcast(reading))
+        else:
             asyncio.run_coroutine_threadsafe(_broadcast(reading), _loop)
 
     poller.register_callback(broadcast_reading)
+    # Persist node power into the tiered time series (buffered; flushed on its own thread)
+    timeseries = get_timeseries()
+    poller.register_callback(timeseries.record)
+    timeseries.start()
     poller.start()
+    # Archive old readings, expire runs and vacuum on a schedule
+    get_maintenance().start()
 
     # Warm up predictor
     try:
@@ -91,6 +121,12 @@ async def lifespan(app: FastAPI):
     yield
 
     poller.stop()
+    timeseries.stop()
+    get_maintenance().stop()
+    _broadcaster.close()
+    close_db()  # flushes queued run saves first
+    close_gpu_backend()
+    close_npu_backend()
     logger.info("Energent AI shut down")
 
 
@@ -106,6 +142,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Static file serving moved to end of file to avoid route shadowing
@@ -117,67 +154,61 @@ async def _refresh_carbon_loop():
         await asyncio.sleep(300)
         try:
             carbon = await get_carbon_intensity()
-            get_poller().set_grid_intensity(carbon["intensity_g_kwh"])
+            await asyncio.to_thread(get_poller().set_grid_intensity, carbon["intensity_g_kwh"])
         except Exception as e:
             logger.warning(f"Carbon refresh error: {e}")
 
 
-async def _broadcast(reading: dict):
-    if not _ws_clients:
-        return
-    
-    msg = json.dumps(reading)
-    tasks = []
-    for ws in _ws_clients:
-        tasks.append(ws.send_text(msg))
-    
-    if not tasks:
-        return
+def _on_loop_thread() -> bool:
+    try:
+        return asyncio.get_running_loop() is _loop
+    except RuntimeError:
+        return False
 
-    # Parallel broadcast to all clients
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    
-    dead = []
-    for i, res in enumerate(results):
-        if isinstance(res, Exception):
-            logger.debug(f"Broadcast failed for client: {res}")
-            dead.append(_ws_clients[i])
-            
-    for ws in dead:
-        try:
-            if ws in _ws_clients:
-                _ws_clients.remove(ws)
-        except Exception:
-            pass
+
+async def _broadcast(reading: dict):
+    # Encoded once per view and wire format, then queued per client;
+    # each connection's writer task does the actual (timed) send
+    _broadcaster.publish(reading)
 
 
 # ── WebSocket ─────────────────────────────────────────────────────────────────
 @app.websocket("/ws/power")
 async def ws_power(websocket: WebSocket):
-    await websocket.accept()
-    _ws_clients.append(websocket)
+    # Opt-in binary protocol: Sec-WebSocket-Protocol: energent.msgpack.v2 (JSON otherwise)
+    subprotocol = negotiate(websocket.scope.get("subprotocols", []))
+    encoding = MSGPACK if subprotocol else JSON
+    await websocket.accept(subprotocol=subprotocol)
     client_host = websocket.client.host if websocket.client else "unknown"
-    logger.info(f"WebSocket connected from {client_host}. Total clients: {len(_ws_clients)}")
-    
+
     try:
-        # Send buffered history on connect
-        buffer = get_poller().get_buffer()
-        if buffer:
-            logger.info(f"Sending {len(buffer)} buffered readings to new client")
-            for reading in buffer:
-                await websocket.send_text(json.dumps(reading))
-        
-        # Keep alive - wait for messages or disconnect
+        # Buffered history goes out first, as one batched frame, then live readings
+        _broadcaster.add(websocket, encoding=encoding)
+        logger.info(f"WebSocket connected from {client_host} ({encoding}). Total clients: {len(_broadcaster)}")
+
+        # Client messages: {"type": "subscribe", "every": N, "fields": [...]} narrows the stream
         while True:
-            await websocket.receive_text()
+            _handle_client_message(websocket, await websocket.receive_text())
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected from {client_host}")
     except Exception as e:
         logger.warning(f"WebSocket error for {client_host}: {e}")
     finally:
-        if websocket in _ws_clients:
-            _ws_clients.remove(websocket)
-        logger.info(f"WebSocket cleaned up. Remaining clients: {len(_ws_clients)}")
+        _broadcaster.remove(websocket)
+        logger.info(f"WebSocket cleaned up. Remaining clients: {len(_broadcaster)}")
+
+
+def _handle_client_message(websocket: WebSocket, text: str) -> None:
+    try:
+        message = json.loads(text)
+    except ValueError:
+        return  # keep-alive pings and other free text are ignored
+    if not isinstance(message, dict) or message.get("type") != "subscribe":
+        return
+    try:
+        _broadcaster.subscribe(websocket, Subscription.parse(message))
+    except ValueError as e:
+        _broadcaster.reject(websocket, str(e))
 
 
 # ── POST /api/run ─────────────────────────────────────────────────────────────
@@ -185,6 +216,13 @@ async def ws_power(websocket: WebSocket):
 def start_run(req: WorkloadRunRequest, background_tasks: BackgroundTasks) -> dict:
     logger.info(f"API CALL: POST /api/run (model={req.model})")
     """Trigger a workload run. Returns run_id immediately; run executes in background."""
+    if req.device_index is not None:
+        if req.compute_target != "gpu":
+            raise HTTPException(400, "device_index is only valid for compute_target 'gpu'")
+        # Cards the GPU backend enumerates (there may be no reading yet right after startup)
+        cards = get_poller().hardware()["gpu_count"]
+        if not 0 <= req.device_index < cards:
+            raise HTTPException(400, f"No GPU card with index {req.device_index} ({cards} found)")
     run_id = f"run_{uuid.uuid4().hex[:8]}"
     intensity = get_cached_intensity_sync()
 
@@ -196,6 +234,7 @@ def start_run(req: WorkloadRunRequest, background_tasks: BackgroundTasks) -> dic
         "compute_target": req.compute_target,
         "batch_size": req.batch_size,
         "num_samples": req.num_samples,
+        "device_index": req.device_index,
         "status": "queued",
         "started_at": int(time.time()),
         "completed_at": None,
@@ -205,6 +244,10 @@ def start_run(req: WorkloadRunRequest, background_tasks: BackgroundTasks) -> dic
         "co2_g": None,
         "grade": None,
         "grid_intensity": intensity,
+        "energy_method": None,
+        "energy_samples": 0,
+        "energy_devices_j": {},
+        "energy_domains_j": {},
         "power_readings": [],
     }
     save_run(run)
@@ -219,7 +262,8 @@ def _execute_run(run_id: str, req: WorkloadRunRequest):
     run["status"] = "running"
     save_run(run)
     poller = get_poller()
-    readings_before = len(poller.get_buffer())
+    start_seq = poller.begin_capture()
+    run_started_ts = time.time()
 
     try:
         from inference.runner import run_inference
@@ -228,7 +272,7 @@ def _execute_run(run_id: str, req: WorkloadRunRequest):
         
         result = run_inference(
             req.model, req.task, req.precision, req.compute_target,
-            req.num_samples, req.batch_size,
+            req.num_samples, req.batch_size, req.device_index,
         )
         duration_s = result["duration_s"]
     except Exception as e:
@@ -237,19 +281,43 @@ def _execute_run(run_id: str, req: WorkloadRunRequest):
         save_run(run)
         return
     finally:
-        poller.set_active_workload(None) # Clear context
+        samples = poller.end_capture(start_seq)
+        poller.release_workload(req.compute_target, req.model)
 
     # Collect readings taken during the run
-    all_readings = poller.get_buffer()
-    run_readings = all_readings[readings_before:]
+    run_readings = poller.get_buffer(since_seq=start_seq)
     if not run_readings:
-        run_readings = all_readings[-5:] if all_readings else []
-
-    avg_watts = (
-        sum(r["total_watts"] for r in run_readings) / len(run_readings)
-        if run_readings else 5.0
+        run_readings = poller.get_buffer()[-5:]
+
+    # Sampled mean watts per device: raw (high-rate) samples in the run window if any
+    devices = ("gpu", "cpu", "npu")
+    if len(samples):
+        sampled_watts = {d: average_watts(samples, run_started_ts, f"{d}_watts") for d in devices}
+    elif run_readings:
+        sampled_watts = {d: sum(r[f"{d}_watts"] for r in run_readings) / len(run_readings) for d in devices}
+    else:
+        sampled_watts = {"gpu": 5.0, "cpu": 0.0, "npu": 0.0}
+
+    # A run pinned to one card is charged for that card's GPU power only, not its
+    # neighbours' workloads; CPU and NPU are charged as for any other run
+    card = req.device_index
+    if card is not None:
+        if len(samples):
+            card_w = average_watts(samples, run_started_ts, "gpu_card_watts", index=card)
+        else:
+            card_w = sum(_card_value(r, card) for r in run_readings) / max(len(run_readings), 1)
+        sampled_watts["gpu"] = card_w
+
+    # Exact joules from cumulative energy counters where they exist, samples elsewhere
+    domains_j = result.get("energy_domains_j", {})
+    device_j, energy_method = attribute_run_energy(
+        duration_s, domains_j, sampled_watts, get_counters(), gpu_index=card,
     )
-    energy_wh = calculate_energy_wh(avg_watts, duration_s)
+    if energy_method == "samples" and not len(samples):
+        energy_method = "buffer"
+    total_j = sum(device_j.values())
+    avg_watts = total_j / duration_s if duration_s > 0 else sum(sampled_watts.values())
+    energy_wh = total_j / 3600.0 if duration_s > 0 else calculate_energy_wh(avg_watts, duration_s)
     grid = run["grid_intensity"]
     co2_g = calculate_co2_grams(energy_wh, grid)
     co2_per_1k = calculate_co2_per_1k_calls(avg_watts, result.get("avg_inference_s", 0.1), grid)
@@ -263,12 +331,21 @@ def _execute_run(run_id: str, req: WorkloadRunRequest):
         "total_energy_wh": round(energy_wh, 6),
         "co2_g": round(co2_g, 4),
         "grade": grade,
+        "energy_method": energy_method,
+        "energy_samples": len(samples),
+        "energy_devices_j": {d: round(j, 4) for d, j in device_j.items()},
+        "energy_domains_j": domains_j,
         "power_readings": run_readings[-60:],
     })
     save_run(run)
     logger.info(f"Run {run_id} complete: {avg_watts:.1f}W, {grade}, {co2_g:.3f}g CO2")
 
 
+def _card_value(reading: dict, card: int) -> float:
+    cards = reading.get("gpu_card_watts", [])
+    return cards[card] if card < len(cards) else 0.0
+
+
 # ── GET /api/run/{run_id} ─────────────────────────────────────────────────────
 @app.get("/api/run/{run_id}")
 def get_run_endpoint(run_id: str) -> dict:
@@ -312,48 +389,31 @@ def get_optimizations(run_id: str) -> list[dict]:
 
 # ── GET /api/run/{run_id}/export ──────────────────────────────────────────────
 @app.get("/api/run/{run_id}/export")
-def export_run(run_id: str, format: str = "json"):
+def export_run(
+    run_id: str,
+    format: str = "json",
+    kind: str = Query("readings", description="readings (stored with the run) or timeseries (raw node samples in its window)"),
+):
     logger.info(f"API CALL: GET /api/run/{run_id}/export")
     try:
         run = get_run(run_id)
         if not run:
             raise HTTPException(404, f"Run not found: {run_id}")
-        
+
         if format == "json":
             return run
-        
-        if format == "csv":
-            # Generate CSV from power readings
-            import csv
-            import io
-            from fastapi.responses import StreamingResponse
-            
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # Header
-            writer.writerow(["timestamp", "gpu_watts", "cpu_watts", "npu_watts", "total_watts", "gpu_util", "cpu_util"])
-            
-            # Data rows
-            for r in run.get("power_readings", []):
-                writer.writerow([
-                    r.get("timestamp", ""),
-                    r.get("gpu_watts", 0),
-                    r.get("cpu_watts", 0),
-                    r.get("npu_watts", 0),
-                    r.get("total_watts", 0),
-                    r.get("gpu_utilization_pct", 0),
-                    r.get("cpu_utilization_pct", 0),
-                ])
-                
-            output.seek(0)
-            return StreamingResponse(
-                io.BytesIO(output.getvalue().encode()),
-                media_type="text/csv",
-                headers={"Content-Disposition": f"attachment; filename={run_id}.csv"}
-            )
-
-        raise HTTPException(400, "Unsupported format. Use 'json' or 'csv'.")
+
+        if kind == "readings":
+            columns, chunks = READING_EXPORT_COLUMNS, run_reading_chunks(run_id, run["started_at"])
+            if format == "csv":
+                # Same header and file name as the original csv export
+                columns, chunks = READING_CSV_COLUMNS, reading_csv_chunks(chunks)
+            return _export_response(format, columns, chunks, run_id)
+        if kind == "timeseries":
+            end = (run.get("completed_at") or time.time()) + 1
+            columns, chunks = TIMESERIES_EXPORT_COLUMNS, timeseries_chunks(run["started_at"] - 1, end)
+            return _export_response(format, columns, chunks, f"{run_id}-{kind}")
+        raise HTTPException(400, "Unsupported kind. Use 'readings' or 'timeseries'.")
     except HTTPException:
         raise
     except Exception as e:
@@ -362,6 +422,44 @@ def export_run(run_id: str, format: str = "json"):
         raise HTTPException(500, detail=str(e))
 
 
+# ── GET /api/runs/export ──────────────────────────────────────────────────────
+@app.get("/api/runs/export")
+def export_runs(
+    format: str = Query("csv", description="csv, ndjson, parquet or arrow"),
+    kind: str = Query("runs", description="runs (one row per run) or readings (every stored reading)"),
+    model: Optional[str] = Query(None),
+    task: Optional[str] = Query(None),
+    precision: Optional[str] = Query(None),
+    compute_target: Optional[str] = Query(None),
+    grade: Optional[str] = Query(None),
+    since: Optional[int] = Query(None, description="started_at lower bound (unix seconds)"),
+    until: Optional[int] = Query(None, description="started_at upper bound (unix seconds)"),
+):
+    """Completed runs matching the history filters, streamed chunk by chunk."""
+    logger.info("API CALL: GET /api/runs/export")
+    filters = {"model": model, "task": task, "precision": precision, "compute_target": compute_target, "grade": grade}
+    if kind == "runs":
+        columns, chunks = RUN_EXPORT_COLUMNS, run_chunks(filters, since, until)
+    elif kind == "readings":
+        columns, chunks = READING_EXPORT_COLUMNS, reading_chunks(filters, since, until)
+    else:
+        raise HTTPException(400, "Unsupported kind. Use 'runs' or 'readings'.")
+    return _export_response(format, columns, chunks, f"energent-{kind}")
+
+
+def _export_response(fmt: str, columns: dict, chunks, name: str) -> StreamingResponse:
+    try:
+        check_format(fmt)
+    except ValueError as e:
+        raise HTTPException(400, detail=str(e))
+    media_type, extension = EXPORT_FORMATS[fmt]
+    return StreamingResponse(
+        stream_export(fmt, columns, chunks),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={name}.{extension}"},
+    )
+
+
 # ── GET /api/predict ──────────────────────────────────────────────────────────
 @app.get("/api/predict")
 def predict_power(
@@ -450,18 +548,23 @@ def get_hardware() -> dict:
     logger.info("API CALL: /api/hardware")
     try:
         import platform
+        # Probed by whichever process owns the sensors (the shared sampler with several workers)
+        devices = get_poller().hardware()
         return {
-            "gpu_model": get_gpu_model(),
+            "gpu_model": devices["gpu_model"],
             "gpu_tdp_w": FALLBACK_GPU_TDP_W,
+            "gpu_count": devices["gpu_count"],
             "gpu_vram_gb": None,
-            "npu_available": is_npu_available(),
-            "npu_model": get_npu_model(),
+            "npu_available": devices["npu_available"],
+            "npu_model": devices["npu_model"],
             "cpu_model": get_cpu_model(),
             "cpu_tdp_w": 45.0,
             "rocm_version": None,
-            "rocm_smi_available": is_rocm_available(),
+            "rocm_smi_available": devices["rocm_smi_available"],
             "rapl_available": is_rapl_available(),
+            "rapl_domains": [d.name for d in get_rapl_domains()],
             "platform": platform.system(),
+            "telemetry": devices["telemetry"],
         }
     except Exception as e:
         logger.error(f"Error in get_hardware: {e}")
@@ -471,14 +574,136 @@ def get_hardware() -> dict:
 
 # ── GET /api/runs/history ─────────────────────────────────────────────────────
 @app.get("/api/runs/history")
-def get_history_endpoint() -> list[dict]:
+def get_history_endpoint(
+    response: Response,
+    limit: int = Query(20, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    model: Optional[str] = Query(None),
+    task: Optional[str] = Query(None),
+    precision: Optional[str] = Query(None),
+    compute_target: Optional[str] = Query(None),
+    grade: Optional[str] = Query(None),
+    since: Optional[int] = Query(None, description="started_at lower bound (unix seconds)"),
+    until: Optional[int] = Query(None, description="started_at upper bound (unix seconds)"),
+    fields: Optional[str] = Query(None, description="Comma-separated run fields; omit power_readings to skip them"),
+) -> list[dict]:
+    """
+    Completed runs, newest first. Pages are keyset-paginated: pass the X-Next-Cursor
+    response header back as `cursor` to get the next page (absent on the last one).
+    """
     logger.info("API CALL: GET /api/runs/history")
+    projection = None
+    if fields:
+        projection = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+        unknown = sorted(set(projection) - set(WorkloadRun.model_fields))
+        if unknown:
+            raise HTTPException(400, detail=f"Unknown fields: {', '.join(unknown)}")
+    filters = {"model": model, "task": task, "precision": precision, "compute_target": compute_target, "grade": grade}
     try:
-        return get_history(20)
+        runs, next_cursor = query_history(limit, cursor, filters, since, until, projection)
+    except ValueError as e:
+        raise HTTPException(400, detail=str(e))
     except Exception as e:
         logger.error(f"Error in get_history_endpoint: {e}")
         logger.error(traceback.format_exc())
         raise HTTPException(500, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return runs
+
+
+# ── GET /api/runs/aggregates ──────────────────────────────────────────────────
+@app.get("/api/runs/aggregates")
+def get_aggregates_endpoint(
+    days: int = Query(30, ge=1, le=3650, description="Look-back window when `since` is not given"),
+    since: Optional[int] = Query(None, description="unix seconds; rounded down to the UTC day"),
+    until: Optional[int] = Query(None, description="unix seconds; rounded down to the UTC day"),
+    group_by: str = Query("model,precision,compute_target", description="Comma-separated subset of model,task,precision,compute_target"),
+    model: Optional[str] = Query(None),
+    task: Optional[str] = Query(None),
+    precision: Optional[str] = Query(None),
+    compute_target: Optional[str] = Query(None),
+) -> list[dict]:
+    """
+    Per-group count, mean watts, mean/p50/p95 energy, CO2 per 1k calls and grade
+    distribution of completed runs, served from day-level rollup tables.
+    """
+    logger.info("API CALL: GET /api/runs/aggregates")
+    groups = tuple(dict.fromkeys(g.strip() for g in group_by.split(",") if g.strip()))
+    if since is None:
+        since = int(time.time()) - days * 86400
+    filters = {"model": model, "task": task, "precision": precision, "compute_target": compute_target}
+    try:
+        return get_aggregates(since, until, groups, filters)
+    except ValueError as e:
+        raise HTTPException(400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in get_aggregates_endpoint: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(500, detail=str(e))
+
+
+# ── GET /api/power/range ──────────────────────────────────────────────────────
+@app.get("/api/power/range")
+def get_power_range(
+    start: Optional[float] = Query(None, description="unix seconds; default end - 1 h"),
+    end: Optional[float] = Query(None, description="unix seconds; default now"),
+    tier: str = Query("auto", description="auto, raw, 10s, 1m or 1h"),
+    max_points: int = Query(2000, ge=10, le=20000, description="auto picks the finest tier under this; an explicit tier must fit in it"),
+) -> dict:
+    """Node power history from the tiered time series; `auto` picks the tier by span and retention."""
+    logger.info("API CALL: GET /api/power/range")
+    end = end if end is not None else time.time()
+    start = start if start is not None else end - 3600
+    if start >= end:
+        raise HTTPException(400, detail="start must be before end")
+    try:
+        return get_timeseries().query(start, end, None if tier == "auto" else tier, max_points)
+    except ValueError as e:
+        raise HTTPException(400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in get_power_range: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(500, detail=str(e))
+
+
+# ── GET /api/power/timeline ───────────────────────────────────────────────────
+@app.get("/api/power/timeline")
+def get_power_timeline(
+    start: Optional[float] = Query(None, description="unix seconds; default end - 1 h, or the run's start"),
+    end: Optional[float] = Query(None, description="unix seconds; default now, or the run's end"),
+    max_points: int = Query(500, ge=3, le=10000),
+    metric: str = Query("total", description="total, gpu, cpu or npu"),
+    method: str = Query("lttb", description="lttb (subset of points) or minmax (per-bucket envelope)"),
+    run_id: Optional[str] = Query(None, description="Limit the range to this run's window"),
+) -> dict:
+    """Chart-ready power series for the node or one run, downsampled server-side to max_points."""
+    logger.info("API CALL: GET /api/power/timeline")
+    run = None
+    if run_id:
+        run = get_run(run_id)
+        if not run:
+            raise HTTPException(404, detail="Run not found")
+        start = start if start is not None else run["started_at"] - 1
+        end = end if end is not None else (run.get("completed_at") or time.time()) + 1
+    end = end if end is not None else time.time()
+    start = start if start is not None else end - 3600
+    if start >= end:
+        raise HTTPException(400, detail="start must be before end")
+    try:
+        result = get_timeseries().timeline(start, end, max_points, metric, method)
+        if run is not None and result["points_in"] < 2 and run.get("power_readings"):
+            # Older runs predate the time series: fall back to the readings stored with the run
+            result = readings_timeline(run["power_readings"], start, end, max_points, metric, method)
+    except ValueError as e:
+        raise HTTPException(400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in get_power_timeline: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(500, detail=str(e))
+    if run_id:
+        result["run_id"] = run_id
+    return result
 
 
 # ── GET /api/validate ─────────────────────────────────────────────────────────
@@ -508,21 +733,38 @@ def get_validation() -> dict:
 def health() -> dict:
     logger.info("API CALL: GET /api/health")
     intensity = get_cached_intensity_sync()
+    poller = get_poller()
+    devices = poller.hardware()
     return {
         "status": "ok",
         "app": "Energent AI",
-        "rocm_smi": is_rocm_available(),
+        "rocm_smi": devices["rocm_smi_available"],
         "rapl": is_rapl_available(),
-        "npu": is_npu_available(),
+        "npu": devices["npu_available"],
         "electricity_maps": True,
         "carbon_intensity_g_kwh": intensity,
         "carbon_source": "cached",
-        "active_ws_clients": len(_ws_clients),
+        "active_ws_clients": len(_broadcaster),
+        "ws_broadcast": _broadcaster.stats(),
+        "db_writer": writer_stats(),
+        "db_maintenance": get_maintenance().last_run,
+        "poller_mode": poller.mode,
+        "poll_interval_s": round(poller.period, 4),
     }
 
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 5001))
-    logger.info(f"🚀 Starting Energent AI on http://0.0.0.0:{port}")
-    uvicorn.run(app, host="0.0.0.0", port=port, log_level="info")
+    workers = int(os.getenv("UVICORN_WORKERS", "1"))
+    logger.info(f"🚀 Starting Energent AI on http://0.0.0.0:{port} ({workers} worker(s))")
+    # permessage-deflate is negotiated with clients that offer it (browsers do)
+    if workers > 1:
+        # Workers share one sampler process instead of each polling the sensors; the
+        # socket path and authkey set here are inherited by every worker
+        from measurement.broker import configure
+        configure()
+        uvicorn.run("main:app", host="0.0.0.0", port=port, log_level="info",
+                    ws_per_message_deflate=True, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port, log_level="info", ws_per_message_deflate=True)
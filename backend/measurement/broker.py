@@ -0,0 +1,566 @@
+"""
+Cross-process fan-out for the power poller, so the API can run with several uvicorn workers.
+One sampler process owns the PowerPoller (and the sensors); API workers talk to it over a
+local Unix socket (POWER_BROKER_SOCKET) through RemotePoller / RemoteCounters, which stand
+in for the in-process PowerPoller / EnergyCounterSet:
+    - a stream connection receives every broadcast reading as it is emitted (and keeps
+      the worker's copy of the broadcast buffer, so the event loop never waits on the socket)
+    - an RPC connection covers workload context, run captures, buffer and counter queries
+Per-connection state (workloads, pinned captures, WebSocket client counts) is released
+when a worker goes away, so a crashed worker can't leave the sampler in high-rate mode.
+
+Connections are authenticated with POWER_BROKER_AUTHKEY (generated by configure() in the
+launching process and inherited by workers and the sampler), and the socket lives in a
+private 0700 runtime directory, since frames are pickles.
+
+Run the sampler explicitly (with POWER_BROKER_AUTHKEY set to the workers' key):
+    python -m measurement.broker --socket $XDG_RUNTIME_DIR/energent/power.sock
+or let the first worker start it (it exits `--linger` seconds after its last client leaves).
+"""
+import os
+import sys
+import time
+import fcntl
+import queue
+import socket
+import secrets
+import argparse
+import logging
+import tempfile
+import subprocess
+import threading
+from collections import deque
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Callable
+
+from measurement.poller import BUFFER_SIZE
+
+logger = logging.getLogger(__name__)
+
+BROKER_SOCKET_ENV = "POWER_BROKER_SOCKET"
+BROKER_AUTHKEY_ENV = "POWER_BROKER_AUTHKEY"
+CONNECT_TIMEOUT_S = 10.0
+LINGER_S = 60.0
+MAX_RECONNECT_DELAY_S = 30.0
+STREAM_QUEUE_SIZE = 256  # readings buffered per worker stream before it counts as stalled
+
+# Methods a worker may call on the sampler's poller / counters
+_POLLER_CALLS = {
+    "get_latest", "get_buffer", "get_readings", "get_samples", "last_seq", "mode", "period",
+    "set_grid_intensity", "reset_co2", "hardware",
+}
+
+
+def broker_address() -> str | None:
+    """Socket of the shared sampler, or None to poll in this process."""
+    return os.getenv(BROKER_SOCKET_ENV) or None
+
+
+def configure() -> None:
+    """
+    Set up the broker environment before the workers are spawned: a socket in the private
+    runtime directory unless POWER_BROKER_SOCKET is set, and a random authkey unless one is.
+    The default socket is per launch, so a restart never meets the previous launch's
+    sampler (still lingering, under the old key) on the same path.
+    """
+    os.environ.setdefault(BROKER_SOCKET_ENV, os.path.join(runtime_dir(), f"power-{os.getpid()}.sock"))
+    os.environ.setdefault(BROKER_AUTHKEY_ENV, secrets.token_hex(32))
+
+
+def runtime_dir() -> str:
+    """This user's private directory for the broker socket and lock, created 0700."""
+    base = os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    path = os.path.join(base, f"energent-{os.getuid()}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+
+def _check_private_dir(path: str) -> None:
+    """Refuse a socket directory other local users could write to (or that isn't ours)."""
+    st = os.lstat(path)
+    if not os.path.isdir(path) or os.path.islink(path) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise RuntimeError(
+            f"Broker socket directory {path} must be a directory owned by this user with mode 0700"
+        )
+
+
+def _authkey() -> bytes:
+    key = os.getenv(BROKER_AUTHKEY_ENV)
+    if not key:
+        raise RuntimeError(f"{BROKER_AUTHKEY_ENV} is not set; call broker.configure() before starting workers")
+    return key.encode()
+
+
+# ── Sampler side ────────────────────────────────────────────────────────────
+class _Peer:
+    """What one worker connection has asked of the shared poller."""
+
+    def __init__(self):
+        self.workloads: list[tuple[str, str | None]] = []
+        self.captures: list[int] = []
+        self.subscribers = 0
+
+
+class BrokerServer:
+    """Serves one PowerPoller to every worker connected on `address`."""
+
+    def __init__(self, address: str, linger_s: float = LINGER_S):
+        from measurement.poller import PowerPoller
+        from measurement.counters import get_counters
+
+        self.address = address
+        self.linger_s = linger_s
+        self.poller = PowerPoller()
+        self.counters = get_counters()
+        self._streams: list[_StreamWriter] = []
+        self._peers: dict[int, _Peer] = {}
+        self._lock = threading.Lock()
+        self._last_client_at = time.monotonic()
+        self._listener: Listener | None = None
+
+    def serve_forever(self) -> None:
+        authkey = _authkey()
+        _check_private_dir(os.path.dirname(os.path.abspath(self.address)))
+        if os.path.exists(self.address):
+            os.unlink(self.address)  # stale socket from a previous sampler
+        umask = os.umask(0o177)  # socket is created 0600, with no window before a chmod
+        try:
+            self._listener = Listener(self.address, family="AF_UNIX", authkey=authkey)
+        finally:
+            os.umask(umask)
+        self.poller.register_callback(self._publish)
+        self.poller.start()
+        threading.Thread(target=self._accept_loop, daemon=True, name="broker-accept").start()
+        logger.info(f"Power broker serving on {self.address}")
+        try:
+            while True:
+                time.sleep(1.0)
+                with self._lock:
+                    idle = not self._peers and not self._streams
+                if self.linger_s and idle and time.monotonic() - self._last_client_at > self.linger_s:
+                    logger.info("Power broker idle; exiting")
+                    break
+        finally:
+            self.poller.stop()
+            self._listener.close()
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+
+    def _accept_loop(self) -> None:
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                return
+            except Exception as e:  # failed auth handshake etc.
+                logger.warning(f"Rejected broker connection: {e}")
+                continue
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: Connection) -> None:
+        try:
+            role = conn.recv()
+        except (EOFError, OSError):
+            return
+        if role == "ping":
+            conn.close()
+            return
+        if role == "stream":
+            stream = _StreamWriter(conn, self._drop_stream)
+            latest = self.poller.get_latest()
+            if latest:
+                stream.offer(latest)
+            with self._lock:
+                self._streams.append(stream)
+            return  # readings are queued by _publish and sent by the stream's own thread
+        self._serve_rpc(conn)
+
+    def _serve_rpc(self, conn: Connection) -> None:
+        peer = _Peer()
+        with self._lock:
+            self._peers[id(conn)] = peer
+        try:
+            while True:
+                method, args = conn.recv()
+                try:
+                    conn.send(("ok", self._call(peer, method, args)))
+                except Exception as e:
+                    conn.send(("error", f"{type(e).__name__}: {e}"))
+        except (EOFError, OSError):
+            pass
+        finally:
+            self._release(peer)
+            with self._lock:
+                self._peers.pop(id(conn), None)
+                self._last_client_at = time.monotonic()
+            conn.close()
+
+    def _call(self, peer: _Peer, method: str, args: tuple):
+        poller = self.poller
+        if method == "set_active_workload":
+            target, model_id = args
+            if target is None:
+                for workload in peer.workloads:
+                    poller.release_workload(*workload)
+                peer.workloads.clear()
+            else:
+                peer.workloads.append((target, model_id))
+                poller.set_active_workload(target, model_id)
+            return None
+        if method == "release_workload":
+            if tuple(args) in peer.workloads:
+                peer.workloads.remove(tuple(args))
+            return poller.release_workload(*args)
+        if method == "begin_capture":
+            start_seq = poller.begin_capture()
+            peer.captures.append(start_seq)
+            return start_seq
+        if method == "end_capture":
+            (start_seq,) = args
+            if start_seq in peer.captures:
+                peer.captures.remove(start_seq)
+            return poller.end_capture(start_seq)
+        if method == "set_subscriber_count":
+            (peer.subscribers,) = args
+            with self._lock:
+                total = sum(p.subscribers for p in self._peers.values())
+            return poller.set_subscriber_count(total)
+        if method == "counters_snapshot":
+            return self.counters.snapshot()
+        if method == "counter_devices":
+            return self.counters.devices(*args)
+        if method in _POLLER_CALLS:
+            attr = getattr(poller, method)
+            return attr(*args) if callable(attr) else attr
+        raise ValueError(f"unknown broker call '{method}'")
+
+    def _release(self, peer: _Peer) -> None:
+        for workload in peer.workloads:
+            self.poller.release_workload(*workload)
+        for start_seq in peer.captures:
+            self.poller.samples.unpin(start_seq)
+        if peer.subscribers:
+            peer.subscribers = 0
+            with self._lock:
+                total = sum(p.subscribers for p in self._peers.values())
+            self.poller.set_subscriber_count(total)
+
+    def _publish(self, reading: dict) -> None:
+        """Runs on the poller thread: only queues, never touches a socket."""
+        with self._lock:
+            streams = list(self._streams)
+        for stream in streams:
+            stream.offer(reading)
+
+    def _drop_stream(self, stream: "_StreamWriter") -> None:
+        with self._lock:
+            if stream in self._streams:
+                self._streams.remove(stream)
+            self._last_client_at = time.monotonic()
+
+
+class _StreamWriter:
+    """
+    Sole writer of one worker's stream connection. Readings are queued and sent from
+    this stream's thread; a worker that falls STREAM_QUEUE_SIZE readings behind is
+    disconnected (it reconnects and resumes from the latest reading).
+    """
+
+    def __init__(self, conn: Connection, on_close: Callable[["_StreamWriter"], None]):
+        self.conn = conn
+        self._on_close = on_close
+        self._queue: queue.Queue = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self._aborted = False
+        threading.Thread(target=self._loop, daemon=True, name="broker-stream-writer").start()
+
+    def offer(self, reading: dict) -> None:
+        if self._aborted:
+            return
+        try:
+            self._queue.put_nowait(reading)
+        except queue.Full:
+            logger.warning("Power broker stream fell behind; disconnecting the worker")
+            self._aborted = True
+            self._abort()
+
+    def _abort(self) -> None:
+        # Shutting the socket down fails a send blocked on a stalled peer, ending _loop
+        try:
+            sock = socket.socket(fileno=os.dup(self.conn.fileno()))
+        except (OSError, ValueError):
+            return
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        finally:
+            sock.close()
+
+    def _loop(self) -> None:
+        try:
+            while True:
+                self.conn.send(self._queue.get())
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.conn.close()
+            self._on_close(self)
+
+
+# ── Worker side ─────────────────────────────────────────────────────────────
+class _RpcChannel:
+    """One request/response connection to the sampler, shared by a worker's threads."""
+
+    def __init__(self, address: str):
+        self.address = address
+        self._conn: Connection | None = None
+        self._lock = threading.Lock()
+
+    def call(self, method: str, *args):
+        with self._lock:
+            if self._conn is None:
+                ensure_broker(self.address)
+                self._conn = _connect(self.address, "rpc")
+            try:
+                self._conn.send((method, args))
+                status, result = self._conn.recv()
+            except (EOFError, OSError):
+                self._conn = None  # sampler restarted; reconnect on the next call
+                raise
+        if status != "ok":
+            raise RuntimeError(f"broker {method} failed: {result}")
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class RemotePoller:
+    """
+    PowerPoller stand-in for API workers: same calls, served by the shared sampler.
+    Calls the event loop makes (the latest reading, the broadcast history, subscriber
+    counts) never wait on the socket: readings and history are kept locally from the
+    stream, and subscriber counts are sent by a background thread.
+    """
+
+    def __init__(self, address: str):
+        self.address = address
+        self._rpc = _RpcChannel(address)
+        self._latest: dict | None = None
+        self._history: deque[dict] = deque(maxlen=BUFFER_SIZE)
+        self._history_lock = threading.Lock()
+        self._callbacks: list[Callable[[dict], None]] = []
+        self._stream: Connection | None = None
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._subscribers = 0
+        self._subscribers_changed = threading.Event()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._stream_loop, daemon=True, name="broker-stream")
+        self._thread.start()
+        threading.Thread(target=self._subscriber_loop, daemon=True, name="broker-subscribers").start()
+        logger.info(f"PowerPoller attached to broker {self.address}")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._subscribers_changed.set()
+        if self._stream is not None:
+            self._stream.close()
+        self._rpc.close()
+
+    def register_callback(self, cb: Callable[[dict], None]) -> None:
+        self._callbacks.append(cb)
+
+    def _stream_loop(self) -> None:
+        delay = 1.0
+        while not self._stop_event.is_set():
+            try:
+                ensure_broker(self.address)
+                self._stream = _connect(self.address, "stream")
+                # Seed after the stream is open so no reading falls between the two
+                self._seed_history(self._rpc.call("get_buffer"))
+                self._subscribers_changed.set()  # a restarted sampler has lost our count
+                delay = 1.0
+                while True:
+                    self._receive(self._stream.recv())
+            except Exception as e:  # lost connection, restarted sampler, rejected authkey, ...
+                if self._stop_event.is_set():
+                    return
+                level = logging.ERROR if isinstance(e, AuthenticationError) else logging.WARNING
+                logger.log(level, f"Lost power broker stream ({type(e).__name__}: {e}); retrying in {delay:.0f}s")
+                self._stop_event.wait(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY_S)
+
+    def _seed_history(self, readings: list[dict]) -> None:
+        with self._history_lock:
+            self._history.clear()
+            self._history.extend(readings)
+
+    def _receive(self, reading: dict) -> None:
+        with self._history_lock:
+            if not self._history or reading.get("seq", 0) > self._history[-1].get("seq", -1):
+                self._history.append(reading)
+        self._latest = reading
+        for cb in self._callbacks:
+            try:
+                cb(reading)
+            except Exception as e:
+                logger.warning(f"Callback error: {e}")
+
+    def _subscriber_loop(self) -> None:
+        """Send the newest subscriber count whenever it changes (coalescing bursts)."""
+        while not self._stop_event.is_set():
+            self._subscribers_changed.wait()
+            self._subscribers_changed.clear()
+            if self._stop_event.is_set():
+                return
+            try:
+                self._rpc.call("set_subscriber_count", self._subscribers)
+            except Exception as e:
+                logger.warning(f"Could not send subscriber count to the power broker: {e}")
+                # The stream loop sets the event again once it has reconnected
+
+    def get_latest(self) -> dict | None:
+        return self._latest
+
+    def get_buffer(self, since_seq: int | None = None) -> list[dict]:
+        """The whole buffer comes from the local copy; a run's window is asked of the sampler."""
+        if since_seq is None:
+            with self._history_lock:
+                return list(self._history)
+        return self._rpc.call("get_buffer", since_seq)
+
+    def get_readings(self, start_seq: int, end_seq: int | None = None):
+        return self._rpc.call("get_readings", start_seq, end_seq)
+
+    def get_samples(self, since_ts: float, until_ts: float | None = None):
+        return self._rpc.call("get_samples", since_ts, until_ts)
+
+    @property
+    def last_seq(self) -> int:
+        return self._rpc.call("last_seq")
+
+    @property
+    def mode(self) -> str:
+        return self._rpc.call("mode")
+
+    @property
+    def period(self) -> float:
+        return self._rpc.call("period")
+
+    def hardware(self) -> dict:
+        return self._rpc.call("hardware")
+
+    def set_grid_intensity(self, intensity: float) -> None:
+        self._rpc.call("set_grid_intensity", intensity)
+
+    def reset_co2(self) -> None:
+        self._rpc.call("reset_co2")
+
+    def set_active_workload(self, target: str | None, model_id: str | None = None) -> None:
+        self._rpc.call("set_active_workload", target, model_id)
+
+    def release_workload(self, target: str, model_id: str | None = None) -> None:
+        self._rpc.call("release_workload", target, model_id)
+
+    def set_subscriber_count(self, count: int) -> None:
+        """Non-blocking (called from the event loop); the count is sent in the background."""
+        self._subscribers = count
+        self._subscribers_changed.set()
+
+    def begin_capture(self) -> int:
+        return self._rpc.call("begin_capture")
+
+    def end_capture(self, start_seq: int):
+        return self._rpc.call("end_capture", start_seq)
+
+
+class RemoteCounters:
+    """EnergyCounterSet stand-in: snapshots come from the sampler's wrap-tracked counters."""
+
+    def __init__(self, address: str):
+        self._rpc = _RpcChannel(address)
+
+    def __bool__(self) -> bool:
+        return True
+
+    def update(self) -> None:
+        pass  # the sampler's poller keeps its counters updated
+
+    def snapshot(self) -> dict[str, float]:
+        return self._rpc.call("counters_snapshot")
+
+    def devices(self, gpu_index: int | None = None) -> dict[str, list[str]]:
+        return self._rpc.call("counter_devices", gpu_index)
+
+    def close(self) -> None:
+        self._rpc.close()
+
+
+def _connect(address: str, role: str) -> Connection:
+    conn = Client(address, family="AF_UNIX", authkey=_authkey())
+    conn.send(role)
+    return conn
+
+
+def ensure_broker(address: str, timeout_s: float = CONNECT_TIMEOUT_S) -> None:
+    """Make sure a sampler is listening on `address`, starting one if none is (one worker wins)."""
+    if _reachable(address):
+        return
+    _check_private_dir(os.path.dirname(os.path.abspath(address)))
+    # No truncation and no following a planted symlink
+    lock_fd = os.open(f"{address}.lock", os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW | os.O_CLOEXEC, 0o600)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX)  # other workers wait here, then find it running
+        if _reachable(address):
+            return
+        # The sampler inherits POWER_BROKER_AUTHKEY; only the socket variable is dropped
+        env = {k: v for k, v in os.environ.items() if k != BROKER_SOCKET_ENV}
+        env[BROKER_AUTHKEY_ENV] = _authkey().decode()
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        subprocess.Popen(
+            [sys.executable, "-m", "measurement.broker", "--socket", address],
+            cwd=backend_dir, env=env, start_new_session=True,
+        )
+        logger.info(f"Started power broker on {address}")
+        deadline = time.monotonic() + timeout_s
+        while time.monotonic() < deadline:
+            if _reachable(address):
+                return
+            time.sleep(0.1)
+    finally:
+        os.close(lock_fd)
+    raise RuntimeError(f"Power broker did not come up on {address}")
+
+
+def _reachable(address: str) -> bool:
+    if not os.path.exists(address):
+        return False
+    try:
+        _connect(address, "ping").close()
+        return True
+    except AuthenticationError:
+        raise  # a sampler is listening under another key; starting a second one would steal its socket
+    except (OSError, EOFError):
+        return False
+    except Exception:
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared power sampler for multi-worker API deployments")
+    parser.add_argument("--socket", default=broker_address() or os.path.join(runtime_dir(), "power.sock"))
+    parser.add_argument("--linger", type=float, default=LINGER_S,
+                        help="seconds to keep running after the last worker disconnects (0 = forever)")
+    args = parser.parse_args()
+    os.environ.pop(BROKER_SOCKET_ENV, None)  # this process is the sampler: poll locally
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    BrokerServer(args.socket, args.linger).serve_forever()
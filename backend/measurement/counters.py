@@ -0,0 +1,201 @@
+"""
+Cumulative hardware energy counters (RAPL powercap zones, hwmon energy*_input).
+Each counter is kept open and accumulated into a wrap-free 64-bit total, so a run only
+needs two O(1) snapshots to get exact joules per domain. The poller calls `update()`
+every tick, which keeps the totals correct even if a counter wraps several times during
+a long run (a wrap period is tens of seconds at full package power).
+"""
+import glob
+import os
+import threading
+import logging
+
+from measurement.cpu import get_rapl_domains
+from measurement.gpu import get_amdgpu_card_devices
+from measurement.telemetry import SysfsValue
+
+logger = logging.getLogger(__name__)
+
+HWMON_GLOB = "/sys/class/hwmon/hwmon*"
+HWMON_MAX_RANGE_UJ = 2**64
+
+# hwmon chips whose energy counter is the whole-device figure for that device
+_HWMON_DEVICE = {"amdgpu": "gpu"}
+
+
+class EnergyCounter:
+    """One cumulative µJ counter with wrap handling."""
+
+    def __init__(
+        self, domain: str, path: str, device: str | None, max_range_uj: float, primary: bool,
+        card: int | None = None,
+    ):
+        self.domain = domain
+        self.device = device        # "cpu" / "gpu" / "npu" or None if unattributed
+        self.card = card            # GPU[N] index for per-card counters
+        self.primary = primary      # counts towards the device total (avoids double-counting sub-domains)
+        self.max_range_uj = max_range_uj
+        self._value = SysfsValue(path)
+        self._last_raw: float | None = self._value.read_float()
+        self.total_uj = 0.0
+
+    def update(self) -> float:
+        raw = self._value.read_float()
+        if raw is not None and self._last_raw is not None:
+            delta = raw - self._last_raw
+            if delta < 0:
+                delta += self.max_range_uj
+            self.total_uj += delta
+        if raw is not None:
+            self._last_raw = raw
+        return self.total_uj
+
+    def close(self) -> None:
+        self._value.close()
+
+
+class EnergyCounterSet:
+    """All energy counters found on this host."""
+
+    def __init__(self, counters: list[EnergyCounter]):
+        self.counters = counters
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.counters)
+
+    def update(self) -> None:
+        with self._lock:
+            for counter in self.counters:
+                counter.update()
+
+    def snapshot(self) -> dict[str, float]:
+        """Current accumulated µJ per domain."""
+        with self._lock:
+            return {c.domain: c.update() for c in self.counters}
+
+    def devices(self, gpu_index: int | None = None) -> dict[str, list[str]]:
+        """
+        Primary domains per device, e.g. {"cpu": ["rapl:package-0"]}.
+        With `gpu_index`, the "gpu" entry only lists that card's counters.
+        """
+        out: dict[str, list[str]] = {}
+        for c in self.counters:
+            if not (c.primary and c.device):
+                continue
+            if c.device == "gpu" and gpu_index is not None and c.card != gpu_index:
+                continue
+            out.setdefault(c.device, []).append(c.domain)
+        return out
+
+    def close(self) -> None:
+        for counter in self.counters:
+            counter.close()
+
+
+def energy_delta_j(start: dict[str, float], end: dict[str, float]) -> dict[str, float]:
+    """Joules per domain between two snapshots."""
+    return {d: (end[d] - start[d]) / 1_000_000 for d in start if d in end}
+
+
+def attribute_run_energy(
+    duration_s: float,
+    domains_j: dict[str, float],
+    sampled_watts: dict[str, float],
+    counters: EnergyCounterSet,
+    gpu_index: int | None = None,
+) -> tuple[dict[str, float], str]:
+    """
+    Joules per device for one run: exact counter deltas where a device has primary
+    counters covering it, sampled mean watts × duration otherwise.
+    `gpu_index` restricts GPU counters to one card (for runs pinned to it).
+    Returns (device_joules, method) with method "counters", "counters+samples" or "samples".
+    """
+    device_domains = counters.devices(gpu_index)
+    device_j: dict[str, float] = {}
+    from_counters = 0
+    for device, watts in sampled_watts.items():
+        domains = device_domains.get(device)
+        if domains and all(d in domains_j for d in domains):
+            device_j[device] = sum(domains_j[d] for d in domains)
+            from_counters += 1
+        else:
+            device_j[device] = watts * duration_s
+
+    if from_counters == len(sampled_watts):
+        method = "counters"
+    elif from_counters:
+        method = "counters+samples"
+    else:
+        method = "samples"
+    return device_j, method
+
+
+def _read_text(path: str) -> str | None:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _discover_rapl() -> list[EnergyCounter]:
+    """One counter per powercap zone; only package zones count towards the CPU total."""
+    counters = []
+    for d in get_rapl_domains():
+        try:
+            counters.append(EnergyCounter(f"rapl:{d.name}", d.path, "cpu", d.max_range_uj, primary=d.primary))
+        except OSError as e:
+            logger.debug(f"RAPL counter {d.path} unavailable: {e}")
+    return counters
+
+
+def _discover_hwmon() -> list[EnergyCounter]:
+    counters = []
+    gpu_devices = get_amdgpu_card_devices()
+    for hwmon in sorted(glob.glob(HWMON_GLOB)):
+        chip = _read_text(os.path.join(hwmon, "name")) or os.path.basename(hwmon)
+        device = _HWMON_DEVICE.get(chip)
+        card = None
+        prefix = f"hwmon:{chip}"
+        if device == "gpu":
+            pci = os.path.realpath(os.path.join(hwmon, "device"))
+            card = gpu_devices.index(pci) if pci in gpu_devices else None
+            prefix = f"hwmon:{chip}:gpu{card if card is not None else '?'}"
+        for path in sorted(glob.glob(os.path.join(hwmon, "energy*_input"))):
+            if not os.access(path, os.R_OK):
+                continue
+            channel = os.path.basename(path)[:-len("_input")]
+            label = _read_text(os.path.join(hwmon, f"{channel}_label")) or channel
+            try:
+                counters.append(EnergyCounter(
+                    f"{prefix}:{label}", path, device, HWMON_MAX_RANGE_UJ,
+                    primary=device is not None, card=card,
+                ))
+            except OSError as e:
+                logger.debug(f"hwmon counter {path} unavailable: {e}")
+    return counters
+
+
+def discover_counters() -> EnergyCounterSet:
+    rapl = _discover_rapl()
+    counters = EnergyCounterSet(rapl + _discover_hwmon())
+    if counters:
+        logger.info(f"Energy counters: {', '.join(c.domain for c in counters.counters)}")
+    return counters
+
+
+# Global singleton
+_counters: EnergyCounterSet | None = None
+
+
+def get_counters() -> EnergyCounterSet:
+    """This host's counters, or the shared sampler's (RemoteCounters) under POWER_BROKER_SOCKET."""
+    global _counters
+    if _counters is None:
+        from measurement.broker import RemoteCounters, broker_address
+        if broker_address():
+            _counters = RemoteCounters(broker_address())
+            return _counters
+        _counters = discover_counters()
+    return _counters
@@ -1,38 +1,117 @@
 """
-CPU power measurement via Linux RAPL interface.
+CPU power measurement via Linux RAPL (powercap) interface.
+Every powercap zone and sub-zone (package-N per socket, dram, core, uncore, psys) is
+discovered once; their energy_uj counters stay open and are re-read with pread() in
+one batched pass, cheap enough for the poller's high-rate mode. Each domain wraps at
+its own max_energy_range_uj.
 Falls back to psutil CPU% × TDP estimate on non-Linux or systems without RAPL.
 """
+import glob
 import os
+import re
 import time
 import psutil
 import platform
 import logging
 
+from measurement.telemetry import SysfsValue
+
 logger = logging.getLogger(__name__)
 
-RAPL_BASE = "/sys/class/powercap/intel-rapl/intel-rapl:0/energy_uj"
+POWERCAP_ROOT = "/sys/class/powercap"
 FALLBACK_CPU_TDP_W = 45.0
+DEFAULT_MAX_ENERGY_RANGE_UJ = 2**32
 
-_last_energy_uj: float | None = None
+_last_energy_uj: dict[str, float] = {}
 _last_energy_time: float | None = None
+_rapl_domains: list["RaplDomain"] | None = None
 
 # ── Metadata Cache ──────────────────────────────────────────────────────────
 _cpu_model_cache: str | None = None
 _rapl_available_cache: bool | None = None
 
 
-def _read_rapl_energy_uj() -> float | None:
-    """Read current CPU energy in microjoules from RAPL sysfs."""
+class RaplDomain:
+    """
+    One powercap zone, e.g. intel-rapl:1 ("package-1") or intel-rapl:0:2 ("package-0/dram").
+    `primary` domains are summed into cpu_watts: the package zones (one per socket),
+    or every top-level zone when the platform exposes no package zone.
+    """
+
+    def __init__(self, zone_dir: str, name: str, top_level: bool):
+        self.zone = os.path.basename(zone_dir)
+        self.name = name
+        self.top_level = top_level
+        self.primary = False
+        self.path = os.path.join(zone_dir, "energy_uj")
+        self.max_range_uj = _read_float(os.path.join(zone_dir, "max_energy_range_uj")) or DEFAULT_MAX_ENERGY_RANGE_UJ
+        self.counter = SysfsValue(self.path)
+
+
+def _read_float(path: str) -> float | None:
     try:
-        with open(RAPL_BASE, "r") as f:
+        with open(path) as f:
             return float(f.read().strip())
-    except (FileNotFoundError, PermissionError, OSError):
+    except (OSError, ValueError):
         return None
 
 
-def read_cpu_power() -> tuple[float, float, bool]:
+def _zone_key(zone_dir: str) -> tuple[int, ...]:
+    return tuple(int(p) for p in os.path.basename(zone_dir).split(":")[1:])
+
+
+def _discover_rapl_domains() -> list[RaplDomain]:
+    zones = [
+        z for z in glob.glob(os.path.join(POWERCAP_ROOT, "intel-rapl:*"))
+        if re.fullmatch(r"intel-rapl(:\d+)+", os.path.basename(z))
+    ]
+    names: dict[tuple[int, ...], str] = {}
+    domains: list[RaplDomain] = []
+    for zone_dir in sorted(zones, key=_zone_key):
+        key = _zone_key(zone_dir)
+        try:
+            with open(os.path.join(zone_dir, "name")) as f:
+                raw_name = f.read().strip()
+        except OSError:
+            raw_name = os.path.basename(zone_dir)
+        parent = names.get(key[:-1])
+        name = f"{parent}/{raw_name}" if parent else raw_name
+        names[key] = name
+        try:
+            domains.append(RaplDomain(zone_dir, name, top_level=len(key) == 1))
+        except (FileNotFoundError, PermissionError, OSError) as e:
+            logger.debug(f"RAPL zone {zone_dir} unreadable: {e}")
+
+    packages = [d for d in domains if d.top_level and d.name.startswith("package")]
+    for d in packages or [d for d in domains if d.top_level]:
+        d.primary = True
+    if domains:
+        logger.info(f"RAPL domains: {', '.join(d.name for d in domains)}")
+    return domains
+
+
+def get_rapl_domains() -> list[RaplDomain]:
+    """All readable powercap zones, discovered once. (Cached)"""
+    global _rapl_domains
+    if _rapl_domains is None:
+        _rapl_domains = _discover_rapl_domains() if platform.system() == "Linux" else []
+    return _rapl_domains
+
+
+def _read_rapl_energy_uj() -> dict[str, float]:
+    """One batched pread() pass over every open RAPL counter: {domain name: µJ}."""
+    readings = {}
+    for d in get_rapl_domains():
+        value = d.counter.read_float()
+        if value is not None:
+            readings[d.name] = value
+    return readings
+
+
+def read_cpu_power_domains() -> tuple[float, float, bool, dict[str, float]]:
     """
-    Returns (cpu_watts, cpu_utilization_pct, is_live).
+    Returns (cpu_watts, cpu_utilization_pct, is_live, watts_per_domain).
+    cpu_watts sums the primary (package) domains across every socket.
     Uses RAPL delta method for accurate power; falls back to TDP estimate.
     """
     global _last_energy_uj, _last_energy_time
@@ -40,29 +119,42 @@ def read_cpu_power() -> tuple[float, float, bool]:
     cpu_pct = psutil.cpu_percent(interval=None)
 
     # Try RAPL (Linux only)
-    if platform.system() == "Linux":
-        current_energy = _read_rapl_energy_uj()
+    current_energy = _read_rapl_energy_uj()
+    if current_energy:
         current_time = time.monotonic()
-
-        if current_energy is not None:
-            if _last_energy_uj is not None and _last_energy_time is not None:
-                delta_uj = current_energy - _last_energy_uj
-                # Handle counter wrap-around
+        delta_s = current_time - _last_energy_time if _last_energy_time is not None else 0.0
+        previous = _last_energy_uj
+        _last_energy_uj = current_energy
+        _last_energy_time = current_time
+
+        if previous and delta_s > 0:
+            domain_watts: dict[str, float] = {}
+            cpu_watts = 0.0
+            for d in get_rapl_domains():
+                if d.name not in current_energy or d.name not in previous:
+                    continue
+                delta_uj = current_energy[d.name] - previous[d.name]
+                # Handle counter wrap-around at this domain's own range
                 if delta_uj < 0:
-                    delta_uj += 2**32
-                delta_s = current_time - _last_energy_time
-                if delta_s > 0:
-                    watts = (delta_uj / 1_000_000) / delta_s  # µJ → J → W
-                    _last_energy_uj = current_energy
-                    _last_energy_time = current_time
-                    return round(watts, 1), cpu_pct, True
-
-            _last_energy_uj = current_energy
-            _last_energy_time = current_time
+                    delta_uj += d.max_range_uj
+                watts = (delta_uj / 1_000_000) / delta_s  # µJ → J → W
+                domain_watts[d.name] = round(watts, 1)
+                if d.primary:
+                    cpu_watts += watts
+            return round(cpu_watts, 1), cpu_pct, True, domain_watts
 
     # Fallback: TDP × utilization
     estimated_watts = FALLBACK_CPU_TDP_W * (cpu_pct / 100.0)
-    return round(estimated_watts, 1), cpu_pct, False
+    return round(estimated_watts, 1), cpu_pct, False, {}
+
+
+def read_cpu_power() -> tuple[float, float, bool]:
+    """
+    Returns (cpu_watts, cpu_utilization_pct, is_live).
+    Uses RAPL delta method for accurate power; falls back to TDP estimate.
+    """
+    cpu_watts, cpu_pct, is_live, _ = read_cpu_power_domains()
+    return cpu_watts, cpu_pct, is_live
 
 
 def get_cpu_model() -> str:
@@ -91,5 +183,5 @@ def is_rapl_available() -> bool:
     if _rapl_available_cache is not None:
         return _rapl_available_cache
 
-    _rapl_available_cache = os.path.exists(RAPL_BASE) and os.access(RAPL_BASE, os.R_OK)
+    _rapl_available_cache = bool(get_rapl_domains())
     return _rapl_available_cache
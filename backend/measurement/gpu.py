@@ -1,12 +1,19 @@
 """
-GPU power measurement via rocm-smi.
-Falls back to TDP × utilization estimate if rocm-smi is unavailable (e.g., Windows dev).
+GPU power measurement via amdsmi, amdgpu sysfs, or rocm-smi — per card on multi-GPU nodes.
+The first two keep a handle/fd open for the process lifetime; rocm-smi forks per sample
+and is kept as the fallback. Select with GPU_TELEMETRY_BACKEND (see measurement/telemetry.py).
+Falls back to TDP × utilization estimate if no backend works (e.g., Windows dev).
 """
+import glob
+import os
 import subprocess
 import re
+import time
 import psutil
 import logging
 
+from measurement.telemetry import ReadStats, SysfsValue, backend_preference, run_command_async
+
 logger = logging.getLogger(__name__)
 
 # Typical AMD GPU TDP for estimation fallback (watts)
@@ -15,6 +22,7 @@ FALLBACK_GPU_TDP_W = 165.0
 # ── Metadata Cache ──────────────────────────────────────────────────────────
 _gpu_model_cache: str | None = None
 _rocm_available_cache: bool | None = None
+_gpu_backend = None
 
 
 def _parse_rocm_smi_power(output: str) -> float | None:
@@ -38,24 +46,268 @@ def _parse_rocm_smi_utilization(output: str) -> float:
     return 0.0
 
 
+def _parse_rocm_smi_cards(output: str) -> list[tuple[float, float]]:
+    """
+    Parse per-card (watts, util) from rocm-smi output with "GPU[N] : ..." prefixes.
+    Falls back to the single-card parsers for output without card prefixes.
+    """
+    power: dict[int, float] = {}
+    util: dict[int, float] = {}
+    for line in output.splitlines():
+        card = re.match(r"\s*GPU\[(\d+)\]\s*:\s*(.*)", line)
+        if not card:
+            continue
+        index, rest = int(card.group(1)), card.group(2)
+        if index not in power:
+            watts = re.search(r"Power.*?:\s*([\d.]+)", rest)
+            if watts:
+                power[index] = float(watts.group(1))
+        use = re.search(r"GPU use \(%\)\s*:\s*(\d+)", rest)
+        if use:
+            util[index] = float(use.group(1))
+
+    if not power:
+        watts = _parse_rocm_smi_power(output)
+        return [(watts, _parse_rocm_smi_utilization(output))] if watts is not None else []
+    return [(power[i], util.get(i, 0.0)) for i in sorted(power)]
+
+
+# ── Telemetry backends ──────────────────────────────────────────────────────
+class SubprocessGpuBackend:
+    """Forks `rocm-smi --showpower --showuse` for every sample (original path)."""
+    name = "subprocess"
+    fast = False  # forks per sample; high-rate mode limits it to the nominal interval
+
+    def __init__(self):
+        self.stats = ReadStats()
+        self._card_count: int | None = None  # learnt from the first successful read
+
+    def read(self) -> list[tuple[float, float]] | None:
+        try:
+            result = subprocess.run(
+                ["rocm-smi", "--showpower", "--showuse"],
+                capture_output=True, text=True, timeout=3
+            )
+            if result.returncode == 0 and result.stdout:
+                cards = _parse_rocm_smi_cards(result.stdout)
+                if cards:
+                    self._card_count = len(cards)
+                    return cards
+        except (FileNotFoundError, subprocess.TimeoutExpired, Exception) as e:
+            logger.debug(f"rocm-smi unavailable: {e}")
+        return None
+
+    async def read_async(self) -> list[tuple[float, float]] | None:
+        output = await run_command_async(["rocm-smi", "--showpower", "--showuse"], timeout=3)
+        cards = _parse_rocm_smi_cards(output) if output else []
+        if cards:
+            self._card_count = len(cards)
+        return cards or None
+
+    def card_count(self) -> int:
+        if self._card_count is None:
+            self.read()
+        return self._card_count or 0
+
+    def close(self) -> None:
+        pass
+
+
+class SysfsGpuBackend:
+    """Reads every amdgpu card's hwmon power and gpu_busy_percent through fds opened once."""
+    name = "sysfs"
+    fast = True  # cheap enough for high-rate sampling
+
+    def __init__(self):
+        self.stats = ReadStats()
+        self._cards: list[tuple[SysfsValue, SysfsValue | None]] = []
+        for card in _find_amdgpu_cards():
+            hwmons = sorted(glob.glob(os.path.join(card, "device", "hwmon", "hwmon*")))
+            if not hwmons:
+                continue
+            power_path = os.path.join(hwmons[0], "power1_average")
+            if not os.path.exists(power_path):
+                power_path = os.path.join(hwmons[0], "power1_input")
+            busy_path = os.path.join(card, "device", "gpu_busy_percent")
+            busy = SysfsValue(busy_path) if os.path.exists(busy_path) else None
+            self._cards.append((SysfsValue(power_path), busy))
+        if not self._cards:
+            raise RuntimeError("no amdgpu hwmon power sensors")
+
+    def card_count(self) -> int:
+        return len(self._cards)
+
+    def read(self) -> list[tuple[float, float]] | None:
+        cards = []
+        for power, busy in self._cards:
+            micro_watts = power.read_float()
+            if micro_watts is None:
+                return None
+            util = busy.read_float() if busy else None
+            cards.append((round(micro_watts / 1_000_000, 1), util or 0.0))
+        return cards
+
+    def close(self) -> None:
+        for power, busy in self._cards:
+            power.close()
+            if busy:
+                busy.close()
+
+
+class AmdSmiGpuBackend:
+    """Uses the amdsmi Python binding (ships with ROCm 6+); one init per process."""
+    name = "amdsmi"
+    fast = True  # cheap enough for high-rate sampling
+
+    def __init__(self):
+        import amdsmi  # optional dependency
+        self.stats = ReadStats()
+        self._amdsmi = amdsmi
+        amdsmi.amdsmi_init()
+        self._handles = amdsmi.amdsmi_get_processor_handles()
+        if not self._handles:
+            raise RuntimeError("amdsmi found no GPUs")
+
+    def card_count(self) -> int:
+        return len(self._handles)
+
+    def read(self) -> list[tuple[float, float]] | None:
+        try:
+            cards = []
+            for handle in self._handles:
+                power = self._amdsmi.amdsmi_get_power_info(handle)
+                watts = power.get("average_socket_power", power.get("current_socket_power"))
+                activity = self._amdsmi.amdsmi_get_gpu_activity(handle)
+                util = activity.get("gfx_activity", 0.0)
+                cards.append((float(watts), float(util if util != "N/A" else 0.0)))
+            return cards
+        except Exception as e:
+            logger.debug(f"amdsmi read failed: {e}")
+            return None
+
+    def close(self) -> None:
+        try:
+            self._amdsmi.amdsmi_shut_down()
+        except Exception:
+            pass
+
+
+_GPU_BACKENDS = {
+    "amdsmi": AmdSmiGpuBackend,
+    "sysfs": SysfsGpuBackend,
+    "subprocess": SubprocessGpuBackend,
+}
+
+
+def _find_amdgpu_cards() -> list[str]:
+    """
+    Return /sys/class/drm/cardN paths whose PCI vendor is AMD (0x1002), in PCI bus
+    order — the order rocm-smi and HIP use for GPU[N] / cuda:N indices.
+    """
+    cards = []
+    for card in glob.glob("/sys/class/drm/card[0-9]*"):
+        if not re.fullmatch(r"card\d+", os.path.basename(card)):
+            continue  # skip connectors like card0-DP-1
+        try:
+            with open(os.path.join(card, "device", "vendor")) as f:
+                if f.read().strip() == "0x1002":
+                    cards.append(card)
+        except OSError:
+            continue
+    return sorted(cards, key=lambda c: os.path.realpath(os.path.join(c, "device")))
+
+
+def get_amdgpu_card_devices() -> list[str]:
+    """Resolved PCI device paths of the AMD cards, indexed like GPU[N]."""
+    return [os.path.realpath(os.path.join(c, "device")) for c in _find_amdgpu_cards()]
+
+
+def select_gpu_backend(name: str | None = None):
+    """
+    (Re)select the GPU telemetry backend. `name` overrides GPU_TELEMETRY_BACKEND.
+    "auto" tries amdsmi → sysfs → subprocess; an unusable explicit choice falls back to subprocess.
+    """
+    global _gpu_backend
+    if _gpu_backend is not None:
+        _gpu_backend.close()
+
+    preference = (name or backend_preference("gpu")).lower()
+    candidates = list(_GPU_BACKENDS) if preference == "auto" else [preference, "subprocess"]
+    for candidate in candidates:
+        cls = _GPU_BACKENDS.get(candidate)
+        if cls is None:
+            logger.warning(f"Unknown GPU telemetry backend '{candidate}'")
+            continue
+        try:
+            _gpu_backend = cls()
+            break
+        except Exception as e:
+            logger.debug(f"GPU backend {candidate} unavailable: {e}")
+
+    logger.info(f"GPU telemetry backend: {_gpu_backend.name}")
+    return _gpu_backend
+
+
+def get_gpu_backend():
+    return _gpu_backend or select_gpu_backend()
+
+
+def gpu_card_count() -> int:
+    """Cards the GPU backend enumerates; 1 without any, like the estimated single-card reading."""
+    return get_gpu_backend().card_count() or 1
+
+
+def close_gpu_backend() -> None:
+    """Release the backend's fds / handles / monitor process (called on shutdown)."""
+    global _gpu_backend
+    if _gpu_backend is not None:
+        _gpu_backend.close()
+        _gpu_backend = None
+
+
+def read_gpu_power_cards() -> tuple[float, float, bool, list[tuple[float, float]]]:
+    """
+    Returns (gpu_watts, gpu_utilization_pct, is_live, [(card_watts, card_util), ...]).
+    gpu_watts is the node total over every card; utilization is the mean across cards.
+    is_live=True means real hardware reading; False means TDP estimate (reported as one card).
+    """
+    backend = get_gpu_backend()
+    start = time.perf_counter()
+    cards = backend.read()
+    backend.stats.record(time.perf_counter() - start)
+    return _card_totals(cards)
+
+
+async def read_gpu_power_cards_async() -> tuple[float, float, bool, list[tuple[float, float]]]:
+    """read_gpu_power_cards() for the asyncio poller; only forking backends actually await."""
+    backend = get_gpu_backend()
+    start = time.perf_counter()
+    cards = backend.read() if backend.fast else await backend.read_async()
+    backend.stats.record(time.perf_counter() - start)
+    return _card_totals(cards)
+
+
+def _card_totals(cards: list[tuple[float, float]] | None) -> tuple[float, float, bool, list[tuple[float, float]]]:
+    if cards:
+        total = sum(w for w, _ in cards)
+        util = sum(u for _, u in cards) / len(cards)
+        return round(total, 1), util, True, cards
+
+    watts, util, live = _estimate_gpu_power()
+    return watts, util, live, [(watts, util)]
+
+
 def read_gpu_power() -> tuple[float, float, bool]:
     """
     Returns (gpu_watts, gpu_utilization_pct, is_live).
     is_live=True means real hardware reading; False means TDP estimate.
     """
-    try:
-        result = subprocess.run(
-            ["rocm-smi", "--showpower", "--showuse"],
-            capture_output=True, text=True, timeout=3
-        )
-        if result.returncode == 0 and result.stdout:
-            watts = _parse_rocm_smi_power(result.stdout)
-            util = _parse_rocm_smi_utilization(result.stdout)
-            if watts is not None:
-                return watts, util, True
-    except (FileNotFoundError, subprocess.TimeoutExpired, Exception) as e:
-        logger.debug(f"rocm-smi unavailable: {e}")
+    watts, util, live, _ = read_gpu_power_cards()
+    return watts, util, live
+
 
+def _estimate_gpu_power() -> tuple[float, float, bool]:
+    """Simulated single-card reading used when no GPU telemetry source is available."""
     # Fallback: Simulate "live" idle power if rocm-smi is missing
     # Baseline 15W + small random jitter + CPU load factor
     try:
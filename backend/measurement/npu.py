@@ -1,16 +1,143 @@
 """
 AMD NPU power monitoring via ryzen_monitor.
+Either keeps one ryzen_monitor process streaming (NPU_TELEMETRY_BACKEND=stream, tried
+first by auto) or forks it per sample (subprocess, the fallback).
 Returns None on all non-NPU hardware — UI hides NPU bar gracefully.
 """
+import shutil
 import subprocess
 import re
+import time
 import logging
 
+from measurement.telemetry import (
+    ReadStats, StreamingProcess, backend_preference, run_command_async, stream_argv,
+)
+
 logger = logging.getLogger(__name__)
 
+# Streamed values older than this are treated as missing
+STREAM_MAX_AGE_S = 3.0
+
 # ── Metadata Cache ──────────────────────────────────────────────────────────
 _npu_model_cache: str | None = None
 _npu_available_cache: bool | None = None
+_npu_backend = None
+
+
+# ── Telemetry backends ──────────────────────────────────────────────────────
+class SubprocessNpuBackend:
+    """Forks `ryzen_monitor --npu` for every sample (original path)."""
+    name = "subprocess"
+    fast = False  # forks per sample; high-rate mode limits it to the nominal interval
+    failed = False
+
+    def __init__(self):
+        self.stats = ReadStats()
+
+    def read(self) -> tuple[float, float | None] | None:
+        try:
+            result = subprocess.run(
+                ["ryzen_monitor", "--npu"],
+                capture_output=True, text=True, timeout=3
+            )
+            if result.returncode == 0 and result.stdout:
+                watts = _parse_npu_power(result.stdout)
+                util = _parse_npu_util(result.stdout)
+                if watts is not None:
+                    return watts, util
+        except (FileNotFoundError, subprocess.TimeoutExpired, Exception) as e:
+            logger.debug(f"ryzen_monitor unavailable: {e}")
+        return None
+
+    async def read_async(self) -> tuple[float, float | None] | None:
+        output = await run_command_async(["ryzen_monitor", "--npu"], timeout=3)
+        if not output:
+            return None
+        watts = _parse_npu_power(output)
+        return (watts, _parse_npu_util(output)) if watts is not None else None
+
+    def close(self) -> None:
+        pass
+
+
+class StreamingNpuBackend:
+    """
+    One long-lived monitor process (NPU_STREAM_CMD, default `ryzen_monitor --npu --follow`)
+    whose output is parsed as it arrives; reads just return the latest values.
+    """
+    name = "stream"
+    fast = True  # cheap enough for high-rate sampling
+
+    def __init__(self):
+        self.stats = ReadStats()
+        argv = stream_argv("NPU_STREAM_CMD", "ryzen_monitor --npu --follow")
+        if not argv or shutil.which(argv[0]) is None:
+            # Fail here so select_npu_backend falls back instead of retrying a missing tool
+            raise FileNotFoundError(f"NPU stream command not found: {argv[0] if argv else '(empty)'}")
+        self._stream = StreamingProcess(argv, _parse_npu_line, name="npu")
+        self._stream.start()
+
+    @property
+    def failed(self) -> bool:
+        """The monitor could not be kept running (missing, or no streaming support)."""
+        return self._stream.gave_up
+
+    def read(self) -> tuple[float, float | None] | None:
+        latest = self._stream.latest(STREAM_MAX_AGE_S)
+        if not latest or "watts" not in latest:
+            return None
+        return latest["watts"], latest.get("util")
+
+    def close(self) -> None:
+        self._stream.stop()
+
+
+_NPU_BACKENDS = {
+    "stream": StreamingNpuBackend,
+    "subprocess": SubprocessNpuBackend,
+}
+
+
+def select_npu_backend(name: str | None = None):
+    """
+    (Re)select the NPU telemetry backend. `name` overrides NPU_TELEMETRY_BACKEND.
+    "auto" tries stream → subprocess; an unusable explicit choice falls back to subprocess.
+    """
+    global _npu_backend
+    if _npu_backend is not None:
+        _npu_backend.close()
+
+    preference = (name or backend_preference("npu")).lower()
+    candidates = list(_NPU_BACKENDS) if preference == "auto" else [preference, "subprocess"]
+    for candidate in candidates:
+        cls = _NPU_BACKENDS.get(candidate)
+        if cls is None:
+            logger.warning(f"Unknown NPU telemetry backend '{candidate}'")
+            continue
+        try:
+            _npu_backend = cls()
+            break
+        except Exception as e:
+            logger.debug(f"NPU backend {candidate} unavailable: {e}")
+
+    logger.info(f"NPU telemetry backend: {_npu_backend.name}")
+    return _npu_backend
+
+
+def get_npu_backend():
+    if _npu_backend is not None and _npu_backend.failed:
+        logger.warning(f"NPU backend {_npu_backend.name} stopped working; forking per sample instead")
+        return select_npu_backend("subprocess")
+    return _npu_backend or select_npu_backend()
+
+
+def close_npu_backend() -> None:
+    """Release the backend's fds / handles / monitor process (called on shutdown)."""
+    global _npu_backend
+    if _npu_backend is not None:
+        _npu_backend.close()
+        _npu_backend = None
 
 
 def read_npu_power() -> tuple[float | None, float | None, bool]:
@@ -18,22 +145,42 @@ def read_npu_power() -> tuple[float | None, float | None, bool]:
     Returns (npu_watts, npu_utilization_pct, is_live).
     Returns (None, None, False) if NPU not available.
     """
-    try:
-        result = subprocess.run(
-            ["ryzen_monitor", "--npu"],
-            capture_output=True, text=True, timeout=3
-        )
-        if result.returncode == 0 and result.stdout:
-            watts = _parse_npu_power(result.stdout)
-            util = _parse_npu_util(result.stdout)
-            if watts is not None:
-                return watts, util, True
-    except (FileNotFoundError, subprocess.TimeoutExpired, Exception) as e:
-        logger.debug(f"ryzen_monitor unavailable: {e}")
+    backend = get_npu_backend()
+    start = time.perf_counter()
+    sample = backend.read()
+    backend.stats.record(time.perf_counter() - start)
+    return _npu_result(sample)
+
+
+async def read_npu_power_async() -> tuple[float | None, float | None, bool]:
+    """read_npu_power() for the asyncio poller; only the forking backend actually awaits."""
+    backend = get_npu_backend()
+    start = time.perf_counter()
+    sample = backend.read() if backend.fast else await backend.read_async()
+    backend.stats.record(time.perf_counter() - start)
+    return _npu_result(sample)
+
+
+def _npu_result(sample: tuple[float, float | None] | None) -> tuple[float | None, float | None, bool]:
+    if sample is not None:
+        watts, util = sample
+        return watts, util, True
 
     return None, None, False
 
 
+def _parse_npu_line(line: str) -> dict:
+    """Extract whichever NPU fields appear on one line of streamed output."""
+    fields = {}
+    watts = _parse_npu_power(line)
+    if watts is not None:
+        fields["watts"] = watts
+    util = _parse_npu_util(line)
+    if util is not None:
+        fields["util"] = util
+    return fields
+
+
 def _parse_npu_power(output: str) -> float | None:
     match = re.search(r"NPU.*?Power.*?:\s*([\d.]+)", output, re.IGNORECASE)
     if match:
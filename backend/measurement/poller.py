@@ -1,46 +1,194 @@
 """
-Background poller — polls GPU, CPU, and NPU every 1 second.
-Maintains a rolling 60-second buffer and pushes readings to a WebSocket queue.
+Background poller — polls GPU, CPU, and NPU every 1 second while anyone is watching.
+The rate adapts to activity: high-rate while a workload is active, 1 s while WebSocket
+clients are connected, and a slow heartbeat (POLL_IDLE_INTERVAL_S) when nothing is.
+Devices are sampled concurrently with a per-device deadline; a device that misses it
+keeps its last value and is listed in the reading's `stale` field.
+While a workload is active the poller switches to a high-rate mode (HF_SAMPLE_RATE_HZ,
+10–100 Hz) for the cheap sensors; broadcasts stay at 1 Hz as time-weighted averages.
+Readings live in columnar NumPy rings (measurement/ringbuffer.py): a rolling 60-second
+buffer of broadcast readings and a longer log of raw samples, every one carrying a global `seq`.
+Runs pin their start seq (begin_capture / end_capture) so none of their samples are lost.
+Readings are pushed to a WebSocket queue.
+POLLER_MODE=asyncio runs the same loop as a task on the server's event loop instead of a
+thread: forking sensors become asyncio subprocesses and callbacks run on the loop itself.
 """
 import asyncio
+import os
 import time
 import threading
 import logging
-from collections import deque
-from typing import Callable
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable
 
-from measurement.gpu import read_gpu_power
-from measurement.cpu import read_cpu_power
-from measurement.npu import read_npu_power
+import numpy as np
+
+from measurement.gpu import (
+    read_gpu_power_cards, read_gpu_power_cards_async, get_gpu_backend, get_gpu_model, gpu_card_count,
+    is_rocm_available,
+)
+from measurement.cpu import read_cpu_power_domains, get_rapl_domains
+from measurement.npu import read_npu_power, read_npu_power_async, get_npu_backend, get_npu_model, is_npu_available
+from measurement.counters import get_counters
+from measurement.ringbuffer import DEVICES, ReadingLog, ReadingRing, to_dicts, window_mean
 
 logger = logging.getLogger(__name__)
 
 BUFFER_SIZE = 60  # seconds of rolling history
+DEVICE_DEADLINE_S = 0.5  # max time one tick waits on any single device
+HF_SAMPLE_RATE_HZ = min(100.0, max(10.0, float(os.getenv("HF_SAMPLE_RATE_HZ", "50"))))
+SAMPLE_HISTORY_S = 600  # seconds of raw samples at the high rate (hours at the idle 1 Hz rate)
+SPILL_LOG_ROWS = 200_000  # evicted raw samples kept beyond the ring (more while a run pins them)
+# Idle heartbeat; capped so a 32-bit RAPL counter (~4.3 kJ) cannot wrap twice between reads
+MAX_IDLE_INTERVAL_S = 15.0
+POLLER_MODE = os.getenv("POLLER_MODE", "thread").strip().lower()  # thread | asyncio
+IDLE_INTERVAL_S = min(MAX_IDLE_INTERVAL_S, max(1.0, float(os.getenv("POLL_IDLE_INTERVAL_S", "10"))))
+
+_SENSORS: dict[str, Callable[[], tuple]] = {
+    "gpu": read_gpu_power_cards,
+    "cpu": read_cpu_power_domains,
+    "npu": read_npu_power,
+}
+
+# Coroutine readers for the asyncio poller (RAPL reads are sysfs preads and never block)
+_ASYNC_SENSORS: dict[str, Callable[[], Awaitable[tuple]]] = {
+    "gpu": read_gpu_power_cards_async,
+    "cpu": lambda: _as_coroutine(read_cpu_power_domains),
+    "npu": read_npu_power_async,
+}
+
+# Whether a device's current backend is cheap enough to read on every high-rate tick.
+# RAPL is a pread() on an open fd; forking backends stay at the nominal interval.
+_FAST_SENSORS: dict[str, Callable[[], bool]] = {
+    "gpu": lambda: get_gpu_backend().fast,
+    "cpu": lambda: True,
+    "npu": lambda: get_npu_backend().fast,
+}
+
+# Fields averaged (time-weighted) when high-rate samples are folded into one broadcast
+_AVERAGED_FIELDS = (
+    "gpu_watts", "cpu_watts", "npu_watts", "total_watts",
+    "gpu_utilization_pct", "cpu_utilization_pct", "npu_utilization_pct",
+)
 
 
 class PowerPoller:
     """
-    Runs a background thread that polls hardware every `interval` seconds.
-    Maintains a rolling deque of PowerReading dicts.
-    Calls registered callbacks with each new reading.
+    Runs a background thread that polls hardware every `interval` seconds while
+    subscribers are connected, every 1/`hf_rate_hz` seconds while a workload is
+    active, and every `idle_interval` seconds otherwise.
+    Maintains a rolling ring of 1 Hz readings plus a ring of raw samples, both
+    columnar and indexed by a monotonic `seq`.
+    Calls registered callbacks with each new 1 Hz reading (as a PowerReading dict).
     """
 
-    def __init__(self, interval: float = 1.0):
+    def __init__(
+        self,
+        interval: float = 1.0,
+        device_deadline_s: float = DEVICE_DEADLINE_S,
+        hf_rate_hz: float = HF_SAMPLE_RATE_HZ,
+        idle_interval: float = IDLE_INTERVAL_S,
+    ):
         self.interval = interval
-        self.buffer: deque[dict] = deque(maxlen=BUFFER_SIZE)
+        self.idle_interval = max(interval, idle_interval)
+        self.device_deadline_s = device_deadline_s
+        self.hf_rate_hz = hf_rate_hz
+        self.cpu_domains = tuple(d.name for d in get_rapl_domains())
+        self.buffer = ReadingRing(BUFFER_SIZE, self.cpu_domains)
+        self.samples = ReadingLog(
+            int(SAMPLE_HISTORY_S * max(hf_rate_hz, 1.0 / interval)), SPILL_LOG_ROWS, self.cpu_domains,
+        )
+        self._latest: dict | None = None
+        self._seq = 0
         self._callbacks: list[Callable[[dict], None]] = []
         self._thread: threading.Thread | None = None
         self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
         self._co2_cumulative: float = 0.0
         self._grid_intensity_g_kwh: float = 820.0  # updated by carbon module
         self._active_target: str | None = None
         self._active_model_id: str | None = None
+        self._workloads: list[tuple[str, str | None]] = []  # concurrently active runs
+        self._subscribers = 0
+        self._due: float | None = None  # monotonic time the current tick was scheduled for
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending: dict[str, tuple[Future | asyncio.Future, float]] = {}  # device → (read, started_at)
+        self._last_values: dict[str, tuple] = {
+            "gpu": (0.0, 0.0, False, []),
+            "cpu": (0.0, 0.0, False, {}),
+            "npu": (None, None, False),
+        }
+        self._last_tick: float | None = None
+        self._last_submit: dict[str, float] = {}
+        self._window_start_seq: int | None = None  # first raw sample not yet folded into a broadcast
+        self._last_emit = 0.0
 
     def set_active_workload(self, target: str | None, model_id: str | None = None) -> None:
-        self._active_target = target
-        self._active_model_id = model_id
+        """Register an active run; `None` clears every registered run."""
+        if target is None:
+            self._workloads.clear()
+        else:
+            self._workloads.append((target, model_id))
+        self._refresh_workload()
         logger.info(f"Poller workload context: {target} ({model_id})")
 
+    def _wake(self) -> None:
+        """Cut the current sleep short (safe from any thread)."""
+        self._wake_event.set()
+
+    def release_workload(self, target: str, model_id: str | None = None) -> None:
+        """Unregister one run; the context stays active while other runs are still going."""
+        try:
+            self._workloads.remove((target, model_id))
+        except ValueError:
+            pass
+        self._refresh_workload()
+
+    def _refresh_workload(self) -> None:
+        self._active_target, self._active_model_id = self._workloads[-1] if self._workloads else (None, None)
+        self._wake()  # switch sampling rate now rather than at the next 1 s tick
+
+    @property
+    def high_rate_active(self) -> bool:
+        return self._active_target is not None and self.hf_rate_hz > 0
+
+    def set_subscriber_count(self, count: int) -> None:
+        """Number of live consumers (WebSocket clients); 0 lets the poller idle."""
+        was_idle = self.mode == "idle"
+        self._subscribers = max(0, count)
+        if was_idle and self.mode != "idle":
+            self._wake()  # first client: don't make it wait out the heartbeat
+
+    @property
+    def mode(self) -> str:
+        """Current sampling mode: "workload", "watched" or "idle"."""
+        if self._active_target is not None:
+            return "workload"
+        return "watched" if self._subscribers else "idle"
+
+    @property
+    def period(self) -> float:
+        """Seconds between ticks in the current mode."""
+        mode = self.mode
+        if mode == "workload":
+            return 1.0 / self.hf_rate_hz if self.high_rate_active else self.interval
+        return self.interval if mode == "watched" else self.idle_interval
+
+    def hardware(self) -> dict:
+        """GPU/NPU details from the sensors this poller reads (probed once per process, then cached)."""
+        gpu, npu = get_gpu_backend(), get_npu_backend()
+        return {
+            "gpu_model": get_gpu_model(),
+            "gpu_count": gpu_card_count(),
+            "rocm_smi_available": is_rocm_available(),
+            "npu_available": is_npu_available(),
+            "npu_model": get_npu_model(),
+            "telemetry": {
+                "gpu": {"backend": gpu.name, **gpu.stats.as_dict()},
+                "npu": {"backend": npu.name, **npu.stats.as_dict()},
+            },
+        }
+
     def set_grid_intensity(self, intensity: float) -> None:
         self._grid_intensity_g_kwh = intensity
 
@@ -51,42 +199,253 @@ class PowerPoller:
         if self._thread and self._thread.is_alive():
             return
         self._stop_event.clear()
+        self._executor = ThreadPoolExecutor(max_workers=len(_SENSORS), thread_name_prefix="sensor")
+        self._wake_event.clear()
+        self._pending.clear()
+        self._last_tick = None
+        self._due = None
+        self._counters = get_counters()
         self._thread = threading.Thread(target=self._poll_loop, daemon=True)
         self._thread.start()
         logger.info("PowerPoller started")
 
     def stop(self) -> None:
         self._stop_event.set()
+        self._wake_event.set()
         if self._thread:
             self._thread.join(timeout=5)
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
         logger.info("PowerPoller stopped")
 
     def get_latest(self) -> dict | None:
-        return self.buffer[-1] if self.buffer else None
+        return self._latest
+
+    def get_buffer(self, since_seq: int | None = None) -> list[dict]:
+        # Copies: callers run on other threads while the poller keeps overwriting the ring
+        rows = self.buffer.snapshot() if since_seq is None else self.buffer.snapshot_between_seq(since_seq)
+        return to_dicts(rows, self.cpu_domains)
 
-    def get_buffer(self) -> list[dict]:
-        return list(self.buffer)
+    def get_buffer_view(self, n: int | None = None) -> np.ndarray:
+        """Newest `n` broadcast readings as a columnar copy."""
+        return self.buffer.snapshot(n)
+
+    def get_samples(self, since_ts: float, until_ts: float | None = None) -> np.ndarray:
+        """Raw samples (high-rate while a workload is active) with since_ts < ts <= until_ts."""
+        return self.samples.between_ts(since_ts, until_ts)
+
+    def get_readings(self, start_seq: int, end_seq: int | None = None) -> np.ndarray:
+        """Raw samples with start_seq <= seq <= end_seq, including spilled ones still retained."""
+        return self.samples.between_seq(start_seq, end_seq)
+
+    @property
+    def last_seq(self) -> int:
+        """Seq of the newest raw sample (-1 before the first one)."""
+        return self._seq - 1
+
+    def begin_capture(self) -> int:
+        """Pin the log from the next sample on; returns the capture's start seq."""
+        start_seq = self._seq
+        self.samples.pin(start_seq)
+        return start_seq
+
+    def end_capture(self, start_seq: int) -> np.ndarray:
+        """Every raw sample since `start_seq`, then release the pin."""
+        rows = self.samples.between_seq(start_seq, self.last_seq)
+        self.samples.unpin(start_seq)
+        return rows
+
+    def _emit(self, reading: dict) -> None:
+        self.buffer.append(reading)
+        self._latest = reading
+        for cb in self._callbacks:
+            try:
+                cb(reading)
+            except Exception as e:
+                logger.warning(f"Callback error: {e}")
 
     def _poll_loop(self) -> None:
+        self._last_emit = time.monotonic()
         while not self._stop_event.is_set():
             start = time.monotonic()
-            reading = self._take_reading()
-            self.buffer.append(reading)
-            for cb in self._callbacks:
-                try:
-                    cb(reading)
-                except Exception as e:
-                    logger.warning(f"Callback error: {e}")
-            elapsed = time.monotonic() - start
-            sleep_for = max(0.0, self.interval - elapsed)
-            self._stop_event.wait(timeout=sleep_for)
-
-    def _take_reading(self) -> dict:
-        ts = int(time.time())
-
-        gpu_w, gpu_util, gpu_live = read_gpu_power()
-        cpu_w, cpu_util, cpu_live = read_cpu_power()
-        npu_w, npu_util, npu_live = read_npu_power()
+            self._wake_event.clear()  # this tick already runs in the current mode
+            high_rate = self.high_rate_active
+            try:
+                self._record(self._take_reading(high_rate), high_rate, start)
+            except Exception as e:
+                logger.warning(f"Poll tick failed: {e}")
+
+            period = self.period
+            woken = self._wake_event.wait(timeout=max(0.0, start + period - time.monotonic()))
+            self._schedule_next(start + period, woken)
+
+    def _schedule_next(self, due: float, woken: bool) -> None:
+        """Record when the next tick was due; a woken tick is early on purpose, so it is due now."""
+        self._due = time.monotonic() if woken else due
+
+    def _record(self, reading: dict, high_rate: bool, start: float) -> None:
+        """Log one raw sample; emit a broadcast reading when one is due."""
+        self._counters.update()  # keeps counter totals wrap-safe between run snapshots
+        self.samples.append(reading)
+        if self._window_start_seq is None:
+            self._window_start_seq = reading["seq"]
+
+        due = start - self._last_emit >= self.interval
+        if not high_rate or due:
+            # Not due: the high-rate window was cut short by leaving workload mode
+            window = self.samples.between_seq(self._window_start_seq)
+            self._emit(self._downsample(window, reading, cut_short=not due))
+            self._window_start_seq = None
+            self._last_emit = start
+
+    def _downsample(self, window: np.ndarray, last: dict, cut_short: bool = False) -> dict:
+        """
+        Fold consecutive raw samples into one reading, weighting each by its interval.
+        Jitter is the span's deviation from the broadcast interval (0 for a window cut short).
+        """
+        if len(window) <= 1:
+            return last
+        reading = dict(last)
+        for field in _AVERAGED_FIELDS:
+            reading[field] = round(window_mean(window, field), 1)
+        latency_ms: dict[str, float] = {}
+        for device in DEVICES:
+            column = window[f"{device}_latency_ms"]
+            if not np.isnan(column).all():
+                latency_ms[device] = round(float(np.nanmax(column)), 2)
+        span = float(window["interval_s"].sum())
+        weights = np.maximum(window["interval_s"].astype(np.float64), 1e-6)
+        if self.cpu_domains:
+            n = len(self.cpu_domains)
+            means = np.average(window["cpu_domain_watts"][:, :n], axis=0, weights=weights)
+            reading["cpu_domain_watts"] = {
+                name: round(float(w), 1) for name, w in zip(self.cpu_domains, means) if not np.isnan(w)
+            }
+        cards = len(last["gpu_card_watts"])
+        for field in ("gpu_card_watts", "gpu_card_utilization_pct"):
+            means = np.average(window[field][:, :cards], axis=0, weights=weights)
+            reading[field] = [round(float(v), 1) for v in means]
+        reading.update({
+            "interval_s": round(span, 4),
+            "jitter_ms": 0.0 if cut_short else round((span - self.interval) * 1000, 2),
+            "latency_ms": latency_ms,
+            "samples": int(window["samples"].sum()),
+        })
+        return reading
+
+    @staticmethod
+    def _timed_read(read: Callable[[], tuple]) -> tuple[tuple | None, float]:
+        start = time.perf_counter()
+        try:
+            result = read()
+        except Exception as e:
+            logger.warning(f"Sensor read error: {e}")
+            result = None
+        return result, time.perf_counter() - start
+
+    def _sample_devices(self, high_rate: bool = False) -> tuple[dict[str, tuple], dict[str, float], list[str]]:
+        """
+        Read every device concurrently, waiting at most `device_deadline_s`.
+        A read still in flight at the deadline is left running (never re-submitted
+        while pending) and that device reuses its last value for this tick.
+        In high-rate mode only fast sensors are read every tick and waited on;
+        the others are submitted at most once per nominal interval.
+        Returns (values, latency_ms, stale_devices).
+        """
+        now = time.monotonic()
+        fast = self._fast_sensors(high_rate)
+        for device in self._due_devices(high_rate, fast, now):
+            self._pending[device] = (self._executor.submit(self._timed_read, _SENSORS[device]), now)
+
+        wait(self._awaited(high_rate, fast), timeout=self._deadline(high_rate))
+        return self._collect_pending()
+
+    async def _sample_devices_async(self, high_rate: bool = False) -> tuple[dict[str, tuple], dict[str, float], list[str]]:
+        """_sample_devices() for the asyncio poller: reads are tasks on the event loop."""
+        now = time.monotonic()
+        fast = self._fast_sensors(high_rate)
+        for device in self._due_devices(high_rate, fast, now):
+            task = asyncio.ensure_future(self._timed_read_async(_ASYNC_SENSORS[device]))
+            self._pending[device] = (task, now)
+
+        awaited = self._awaited(high_rate, fast)
+        if awaited:
+            await asyncio.wait(awaited, timeout=self._deadline(high_rate))
+        return self._collect_pending()
+
+    @staticmethod
+    async def _timed_read_async(read: Callable[[], Awaitable[tuple]]) -> tuple[tuple | None, float]:
+        start = time.perf_counter()
+        try:
+            result = await read()
+        except Exception as e:
+            logger.warning(f"Sensor read error: {e}")
+            result = None
+        return result, time.perf_counter() - start
+
+    @staticmethod
+    def _fast_sensors(high_rate: bool) -> dict[str, bool]:
+        return {device: _FAST_SENSORS[device]() for device in _SENSORS} if high_rate else {}
+
+    def _due_devices(self, high_rate: bool, fast: dict[str, bool], now: float) -> list[str]:
+        """Devices to read this tick: not already in flight, slow ones at most once per interval."""
+        due = []
+        for device in _SENSORS:
+            if device in self._pending:
+                continue
+            if high_rate and not fast[device] and now - self._last_submit.get(device, 0.0) < self.interval:
+                continue
+            self._last_submit[device] = now
+            due.append(device)
+        return due
+
+    def _awaited(self, high_rate: bool, fast: dict[str, bool]) -> list:
+        return [fut for device, (fut, _) in self._pending.items() if not high_rate or fast[device]]
+
+    def _deadline(self, high_rate: bool) -> float:
+        return min(self.device_deadline_s, 1.0 / self.hf_rate_hz) if high_rate else self.device_deadline_s
+
+    def _collect_pending(self) -> tuple[dict[str, tuple], dict[str, float], list[str]]:
+        latency_ms: dict[str, float] = {}
+        stale: list[str] = []
+        for device in list(self._pending):
+            fut, started_at = self._pending[device]
+            if fut.done():
+                result, elapsed = fut.result()
+                del self._pending[device]
+                if result is not None:
+                    self._last_values[device] = result
+                latency_ms[device] = round(elapsed * 1000, 2)
+            else:
+                stale.append(device)
+                latency_ms[device] = round((time.monotonic() - started_at) * 1000, 2)
+
+        return dict(self._last_values), latency_ms, stale
+
+    def _take_reading(self, high_rate: bool = False) -> dict:
+        tick = self._begin_tick()
+        return self._build_reading(tick, *self._sample_devices(high_rate))
+
+    def _begin_tick(self) -> tuple[float, int, float, float]:
+        """(wall-clock time, seq, measured seconds since the previous tick, seconds late)."""
+        now = time.time()
+        seq = self._seq
+        self._seq += 1
+        tick = time.monotonic()
+        interval_s = tick - self._last_tick if self._last_tick is not None else self.interval
+        late_s = tick - self._due if self._due is not None else 0.0
+        self._last_tick = tick
+        return now, seq, interval_s, late_s
+
+    def _build_reading(
+        self, tick: tuple[float, int, float, float],
+        values: dict[str, tuple], latency_ms: dict[str, float], stale: list[str],
+    ) -> dict:
+        now, seq, interval_s, late_s = tick
+        ts = int(now)
+        gpu_w, gpu_util, gpu_live, gpu_cards = values["gpu"]
+        cpu_w, cpu_util, cpu_live, cpu_domains = values["cpu"]
+        npu_w, npu_util, npu_live = values["npu"]
         if npu_w is None:
             npu_w = 0.0
 
@@ -106,8 +465,8 @@ class PowerPoller:
 
         total_w = (gpu_w or 0.0) + (cpu_w or 0.0) + (npu_w or 0.0)
 
-        # Accumulate CO2: energy in Wh for this 1-second interval
-        energy_wh = total_w * (self.interval / 3600.0)
+        # Accumulate CO2: energy in Wh over the measured tick interval
+        energy_wh = total_w * (interval_s / 3600.0)
         co2_g = energy_wh * self._grid_intensity_g_kwh
         self._co2_cumulative += co2_g
 
@@ -124,18 +483,116 @@ class PowerPoller:
             "timestamp": ts,
             "co2_g_cumulative": round(self._co2_cumulative, 4),
             "source": source,
+            "interval_s": round(interval_s, 4),
+            "jitter_ms": round(late_s * 1000, 2),
+            "latency_ms": latency_ms,
+            "stale": stale,
+            "ts": round(now, 4),
+            "samples": 1,
+            "seq": seq,
+            "cpu_domain_watts": cpu_domains,
+            "gpu_card_watts": [round(w, 1) for w, _ in gpu_cards],
+            "gpu_card_utilization_pct": [round(u or 0.0, 1) for _, u in gpu_cards],
         }
 
     def reset_co2(self) -> None:
         self._co2_cumulative = 0.0
 
 
+class AsyncPowerPoller(PowerPoller):
+    """
+    PowerPoller driven by a task on the running event loop (POLLER_MODE=asyncio).
+    Forking sensors run as asyncio subprocesses, the rest inline; callbacks are invoked
+    on the loop thread, so broadcasts need no cross-thread hop and the rings have a
+    single writer on the same thread as the WebSocket handlers.
+    `start()` must be called from the event loop (e.g. the app's lifespan).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        self._wake_async: asyncio.Event | None = None
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake_async = asyncio.Event()
+        self._stop_event.clear()
+        self._pending.clear()
+        self._last_tick = None
+        self._due = None
+        self._counters = get_counters()
+        self._task = self._loop.create_task(self._poll_loop_async())
+        logger.info("PowerPoller started (asyncio)")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._task:
+            self._task.cancel()
+        for task, _ in self._pending.values():
+            task.cancel()
+        self._pending.clear()
+        logger.info("PowerPoller stopped")
+
+    def _wake(self) -> None:
+        if self._loop and self._wake_async and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake_async.set)
+
+    async def _poll_loop_async(self) -> None:
+        self._last_emit = time.monotonic()
+        while not self._stop_event.is_set():
+            start = time.monotonic()
+            self._wake_async.clear()  # this tick already runs in the current mode
+            high_rate = self.high_rate_active
+            tick = self._begin_tick()
+            try:
+                reading = self._build_reading(tick, *await self._sample_devices_async(high_rate))
+                self._record(reading, high_rate, start)
+            except Exception as e:
+                logger.warning(f"Poll tick failed: {e}")
+
+            period = self.period
+            try:
+                await asyncio.wait_for(self._wake_async.wait(), timeout=max(0.0, start + period - time.monotonic()))
+                woken = True
+            except asyncio.TimeoutError:
+                woken = False
+            self._schedule_next(start + period, woken)
+
+
+async def _as_coroutine(read: Callable[[], tuple]) -> tuple:
+    return read()
+
+
+def average_watts(
+    samples: np.ndarray, since_ts: float, field: str = "total_watts", index: int | None = None,
+) -> float:
+    """
+    Time-weighted mean of a watts column over ring rows (`index` selects one slot of a
+    per-card / per-domain column). Each sample covers (ts - interval_s, ts]; the part
+    before `since_ts` is clipped off. Missing values (NaN) count as 0 W.
+    """
+    values = np.nan_to_num(samples[field] if index is None else samples[field][:, index])
+    weights = np.clip(np.minimum(samples["interval_s"], samples["ts"] - since_ts), 0.0, None)
+    span = weights.sum()
+    if span <= 0:
+        return float(values.mean())
+    return float(np.dot(values, weights) / span)
+
+
 # Global singleton
 _poller: PowerPoller | None = None
 
 
 def get_poller() -> PowerPoller:
+    """The process poller, or a RemotePoller when POWER_BROKER_SOCKET points at a shared sampler."""
     global _poller
     if _poller is None:
-        _poller = PowerPoller()
+        from measurement.broker import RemotePoller, broker_address
+        if broker_address():
+            _poller = RemotePoller(broker_address())
+            return _poller
+        _poller = AsyncPowerPoller() if POLLER_MODE == "asyncio" else PowerPoller()
     return _poller
@@ -0,0 +1,278 @@
+"""
+Columnar ring buffer for poller readings.
+One preallocated NumPy structured array, one column per metric, keyed by the poller's
+monotonic sequence number. Every row is written twice (slot i and i + capacity), so any
+window of up to `capacity` newest rows is a contiguous zero-copy view for the writer;
+other threads read copies taken under the write lock (snapshot / snapshot_between_seq).
+ReadingLog adds a spill-over log of evicted rows so seq-range queries can reach further back.
+"""
+import math
+import threading
+from collections import Counter
+
+import numpy as np
+
+DEVICES = ("gpu", "cpu", "npu")
+MAX_CPU_DOMAINS = 16  # RAPL zones per host (package/dram/core/uncore × sockets)
+MAX_GPUS = 8          # cards per node
+
+READING_DTYPE = np.dtype([
+    ("seq", "i8"),
+    ("ts", "f8"),
+    ("timestamp", "i8"),
+    ("gpu_watts", "f4"),
+    ("cpu_watts", "f4"),
+    ("npu_watts", "f4"),
+    ("total_watts", "f4"),
+    ("gpu_utilization_pct", "f4"),
+    ("cpu_utilization_pct", "f4"),
+    ("npu_utilization_pct", "f4"),
+    ("co2_g_cumulative", "f8"),
+    ("live", "?"),
+    ("interval_s", "f4"),
+    ("jitter_ms", "f4"),
+    ("gpu_latency_ms", "f4"),   # NaN when the device was not sampled on that tick
+    ("cpu_latency_ms", "f4"),
+    ("npu_latency_ms", "f4"),
+    ("stale_mask", "u1"),       # bit i set → DEVICES[i] reused its last value
+    ("samples", "u2"),
+    ("cpu_domain_watts", "f4", (MAX_CPU_DOMAINS,)),  # ordered like the ring's cpu_domains; NaN = unused
+    ("gpu_card_watts", "f4", (MAX_GPUS,)),           # indexed by GPU[N]; NaN = no such card
+    ("gpu_card_utilization_pct", "f4", (MAX_GPUS,)),
+])
+
+_ONE_DECIMAL = (
+    "gpu_watts", "cpu_watts", "npu_watts", "total_watts",
+    "gpu_utilization_pct", "cpu_utilization_pct", "npu_utilization_pct",
+)
+
+
+class ReadingRing:
+    """
+    Fixed-capacity ring of readings. Single writer (the poller), which may use views.
+    A view aliases the ring's storage: the writer overwrites its oldest rows after
+    `capacity - len(view)` further appends, possibly while another thread is still
+    reading it, so other threads use the snapshot methods, which copy under the lock.
+    `cpu_domains` names the slots of the cpu_domain_watts column.
+    """
+
+    def __init__(self, capacity: int, cpu_domains: tuple[str, ...] = ()):
+        self.capacity = capacity
+        self.cpu_domains = cpu_domains[:MAX_CPU_DOMAINS]
+        self._data = np.zeros(2 * capacity, dtype=READING_DTYPE)
+        self._count = 0  # rows ever appended
+        self._lock = threading.Lock()  # held while a row is written and while a snapshot is copied
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    def append(self, reading: dict) -> None:
+        row = _to_row(reading, self.cpu_domains)
+        with self._lock:
+            slot = self._count % self.capacity
+            self._data[slot] = row
+            self._data[slot + self.capacity] = row
+            self._count += 1  # publish only after both copies are written
+
+    def view(self, n: int | None = None) -> np.ndarray:
+        """The newest `n` rows (all retained rows by default), oldest first, zero-copy."""
+        count = self._count
+        size = min(count, self.capacity)
+        n = size if n is None else max(0, min(n, size))
+        end = (count - 1) % self.capacity + self.capacity + 1 if count else 0
+        return self._data[end - n:end]
+
+    def between_seq(self, start_seq: int, end_seq: int | None = None) -> np.ndarray:
+        """Retained rows with start_seq <= seq <= end_seq, zero-copy."""
+        rows = self.view()
+        lo = np.searchsorted(rows["seq"], start_seq, side="left")
+        hi = len(rows) if end_seq is None else np.searchsorted(rows["seq"], end_seq, side="right")
+        return rows[lo:hi]
+
+    def between_ts(self, since_ts: float, until_ts: float | None = None) -> np.ndarray:
+        """Retained rows with since_ts < ts <= until_ts, zero-copy."""
+        rows = self.view()
+        lo = np.searchsorted(rows["ts"], since_ts, side="right")
+        hi = len(rows) if until_ts is None else np.searchsorted(rows["ts"], until_ts, side="right")
+        return rows[lo:hi]
+
+    def snapshot(self, n: int | None = None) -> np.ndarray:
+        """Copy of view(n) that no later append can change; safe from any thread."""
+        with self._lock:
+            return self.view(n).copy()
+
+    def snapshot_between_seq(self, start_seq: int, end_seq: int | None = None) -> np.ndarray:
+        """Copy of between_seq(); safe from any thread."""
+        with self._lock:
+            return self.between_seq(start_seq, end_seq).copy()
+
+
+class ReadingLog:
+    """
+    A ReadingRing whose rows are copied into a spill-over log, one block at a time,
+    just before the ring overwrites them. The spill log keeps `spill_rows` rows;
+    rows at or after a pinned seq (see `pin`) are kept however old they get, so a
+    run can always fetch every reading since it started. Range queries return copies
+    taken under the lock that append holds, so they are safe from any thread.
+    """
+
+    def __init__(self, capacity: int, spill_rows: int, cpu_domains: tuple[str, ...] = ()):
+        self.ring = ReadingRing(capacity, cpu_domains)
+        self.spill_rows = spill_rows
+        self._block = max(1, capacity // 4)
+        self._spill: list[np.ndarray] = []
+        self._spilled_to: int = -1  # highest seq copied into the spill log
+        self._pins: Counter[int] = Counter()
+        self._lock = threading.Lock()  # guards _spill / _pins and ring appends against range copies
+
+    def __len__(self) -> int:
+        return len(self.ring)
+
+    @property
+    def last_seq(self) -> int:
+        rows = self.ring.view(1)
+        return int(rows["seq"][0]) if len(rows) else -1
+
+    def append(self, reading: dict) -> None:
+        ring = self.ring
+        with self._lock:
+            if ring._count >= ring.capacity and (ring._count - ring.capacity) % self._block == 0:
+                # The next `_block` appends evict exactly the oldest `_block` rows: spill them first
+                oldest = ring.view()[:self._block]
+                fresh = oldest[oldest["seq"] > self._spilled_to]
+                if len(fresh):
+                    self._spill.append(fresh.copy())
+                    self._spilled_to = int(fresh["seq"][-1])
+                    self._trim()
+            ring.append(reading)
+
+    def pin(self, seq: int) -> None:
+        """Keep every row with seq >= `seq` until the matching `unpin`."""
+        with self._lock:
+            self._pins[seq] += 1
+
+    def unpin(self, seq: int) -> None:
+        with self._lock:
+            self._pins[seq] -= 1
+            if self._pins[seq] <= 0:
+                del self._pins[seq]
+            self._trim()
+
+    def between_seq(self, start_seq: int, end_seq: int | None = None) -> np.ndarray:
+        """Copy of the rows with start_seq <= seq <= end_seq, spilled ones included."""
+        with self._lock:
+            rows = self.ring.between_seq(start_seq, end_seq)
+            if len(rows) and rows["seq"][0] <= start_seq:
+                return rows.copy()
+            hi = end_seq if end_seq is not None else np.iinfo(np.int64).max
+            return self._with_spill(rows, "seq", lambda c: (c >= start_seq) & (c <= hi))
+
+    def between_ts(self, since_ts: float, until_ts: float | None = None) -> np.ndarray:
+        """Copy of the rows with since_ts < ts <= until_ts, reaching into the spill log if needed."""
+        with self._lock:
+            rows = self.ring.between_ts(since_ts, until_ts)
+            retained = self.ring.view()
+            if not len(retained) or retained["ts"][0] <= since_ts:
+                return rows.copy()
+            hi = until_ts if until_ts is not None else np.inf
+            return self._with_spill(rows, "ts", lambda c: (c > since_ts) & (c <= hi))
+
+    def _with_spill(self, rows: np.ndarray, field: str, match) -> np.ndarray:
+        """Spilled rows matching `match`, then `rows` not already spilled (caller holds the lock)."""
+        spilled = [chunk[match(chunk[field])] for chunk in self._spill]
+        spilled = [chunk for chunk in spilled if len(chunk)]
+        if not spilled:
+            return rows.copy()
+        return np.concatenate([*spilled, rows[rows["seq"] > self._spilled_to]])
+
+    def _trim(self) -> None:
+        keep_from = min(self._pins) if self._pins else None
+        total = sum(len(chunk) for chunk in self._spill)
+        while self._spill and total - len(self._spill[0]) >= self.spill_rows:
+            if keep_from is not None and self._spill[0]["seq"][-1] >= keep_from:
+                break
+            total -= len(self._spill.pop(0))
+
+
+def _to_row(reading: dict, cpu_domains: tuple[str, ...]) -> tuple:
+    latency = reading.get("latency_ms", {})
+    stale = reading.get("stale", [])
+    domain_watts = reading.get("cpu_domain_watts", {})
+    domain_column = [domain_watts.get(name, math.nan) for name in cpu_domains]
+    values = {
+        **reading,
+        "live": reading.get("source") == "live",
+        "gpu_latency_ms": latency.get("gpu", math.nan),
+        "cpu_latency_ms": latency.get("cpu", math.nan),
+        "npu_latency_ms": latency.get("npu", math.nan),
+        "stale_mask": sum(1 << i for i, d in enumerate(DEVICES) if d in stale),
+        "cpu_domain_watts": domain_column + [math.nan] * (MAX_CPU_DOMAINS - len(domain_column)),
+        "gpu_card_watts": _pad(reading.get("gpu_card_watts", []), MAX_GPUS),
+        "gpu_card_utilization_pct": _pad(reading.get("gpu_card_utilization_pct", []), MAX_GPUS),
+    }
+    return tuple(values.get(name, 0) for name in READING_DTYPE.names)
+
+
+def _pad(values: list[float], size: int) -> list[float]:
+    values = list(values[:size])
+    return values + [math.nan] * (size - len(values))
+
+
+def _unpad(values) -> list[float]:
+    return [round(float(v), 1) for v in values if not math.isnan(v)]
+
+
+def to_dicts(rows: np.ndarray, cpu_domains: tuple[str, ...] = ()) -> list[dict]:
+    """Rebuild PowerReading-shaped dicts from ring rows."""
+    names = READING_DTYPE.names
+    out = []
+    for values in rows.tolist():
+        r = dict(zip(names, values))
+        reading = {field: round(r[field], 1) for field in _ONE_DECIMAL}
+        reading.update({
+            "timestamp": r["timestamp"],
+            "co2_g_cumulative": round(r["co2_g_cumulative"], 4),
+            "source": "live" if r["live"] else "estimated",
+            "interval_s": round(r["interval_s"], 4),
+            "jitter_ms": round(r["jitter_ms"], 2),
+            "latency_ms": {
+                d: round(r[f"{d}_latency_ms"], 2) for d in DEVICES if not math.isnan(r[f"{d}_latency_ms"])
+            },
+            "stale": [d for i, d in enumerate(DEVICES) if r["stale_mask"] & (1 << i)],
+            "ts": round(r["ts"], 4),
+            "samples": r["samples"],
+            "seq": r["seq"],
+            "cpu_domain_watts": {
+                name: round(float(w), 1) for name, w in zip(cpu_domains, r["cpu_domain_watts"]) if not math.isnan(w)
+            },
+            "gpu_card_watts": _unpad(r["gpu_card_watts"]),
+            "gpu_card_utilization_pct": _unpad(r["gpu_card_utilization_pct"]),
+        })
+        out.append(reading)
+    return out
+
+
+# ── Vectorized window aggregates ────────────────────────────────────────────
+def window_mean(rows: np.ndarray, field: str = "total_watts") -> float:
+    """Time-weighted mean of `field` (each row weighted by its interval_s)."""
+    if not len(rows):
+        return 0.0
+    weights = rows["interval_s"].astype(np.float64)
+    if weights.sum() <= 0:
+        return float(rows[field].mean())
+    return float(np.average(rows[field], weights=weights))
+
+
+def window_integral(rows: np.ndarray, field: str = "total_watts") -> float:
+    """Σ field × interval_s — joules when `field` is a watts column."""
+    if not len(rows):
+        return 0.0
+    return float(np.dot(rows[field].astype(np.float64), rows["interval_s"].astype(np.float64)))
+
+
+def window_percentile(rows: np.ndarray, field: str = "total_watts", q: float | list[float] = 50) -> float | list[float]:
+    """Unweighted percentile(s) of `field` over the window."""
+    if not len(rows):
+        return 0.0 if np.isscalar(q) else [0.0 for _ in q]
+    result = np.percentile(rows[field], q)
+    return float(result) if np.isscalar(q) else [float(v) for v in result]
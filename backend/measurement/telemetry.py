@@ -0,0 +1,230 @@
+"""
+Long-lived telemetry plumbing shared by the sensor modules.
+Lets gpu.py / npu.py keep a sensor open (sysfs fd, library handle, or a
+persistent monitor process) instead of forking a CLI tool on every sample.
+
+Backends are chosen per device through env vars:
+    GPU_TELEMETRY_BACKEND = auto | amdsmi | sysfs | subprocess
+    NPU_TELEMETRY_BACKEND = auto | stream | subprocess
+
+Subprocess backends also have an asyncio path (`read_async`, via `run_command_async`)
+used by the asyncio poller (POLLER_MODE=asyncio); fast backends are read inline.
+
+Benchmark per-sample overhead of a backend:
+    python -m measurement.telemetry --device gpu --backend subprocess --samples 20
+"""
+import os
+import shlex
+import asyncio
+import argparse
+import logging
+import subprocess
+import threading
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+def backend_preference(device: str) -> str:
+    """Return the configured backend name for `device` ("auto" if unset)."""
+    return os.getenv(f"{device.upper()}_TELEMETRY_BACKEND", "auto").strip().lower() or "auto"
+
+
+class ReadStats:
+    """Per-backend sampling cost, so backends can be compared on real hardware."""
+
+    def __init__(self):
+        self.samples = 0
+        self.total_s = 0.0
+        self.last_s = 0.0
+        self.max_s = 0.0
+
+    def record(self, elapsed_s: float) -> None:
+        self.samples += 1
+        self.total_s += elapsed_s
+        self.last_s = elapsed_s
+        self.max_s = max(self.max_s, elapsed_s)
+
+    def reset(self) -> None:
+        self.__init__()
+
+    def as_dict(self) -> dict:
+        mean = self.total_s / self.samples if self.samples else 0.0
+        return {
+            "samples": self.samples,
+            "mean_ms": round(mean * 1000, 3),
+            "last_ms": round(self.last_s * 1000, 3),
+            "max_ms": round(self.max_s * 1000, 3),
+        }
+
+
+class SysfsValue:
+    """A sysfs attribute kept open for the process lifetime and re-read with pread()."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY)
+
+    def read(self) -> str:
+        return os.pread(self._fd, 64, 0).decode().strip()
+
+    def read_float(self) -> float | None:
+        try:
+            return float(self.read())
+        except (OSError, ValueError):
+            return None
+
+    def close(self) -> None:
+        try:
+            os.close(self._fd)
+        except OSError:
+            pass
+
+
+class StreamingProcess:
+    """
+    Keeps one monitor process alive and parses its stdout line by line.
+    `parse(line)` returns a dict of fields found on that line (may be empty);
+    fields are merged into the latest snapshot together with their arrival time.
+    The process is restarted if it exits, with a back-off that doubles (up to
+    MAX_RESTART_DELAY_S) while it keeps exiting without output; after
+    MAX_LAUNCH_FAILURES launches in a row fail or produce nothing, it gives up
+    and sets `gave_up` (e.g. a tool that doesn't support streaming).
+    """
+
+    RESTART_DELAY_S = 2.0
+    MAX_RESTART_DELAY_S = 60.0
+    MAX_LAUNCH_FAILURES = 5
+
+    def __init__(self, argv: list[str], parse: Callable[[str], dict], name: str):
+        self.argv = argv
+        self.parse = parse
+        self.name = name
+        self._latest: dict = {}
+        self._latest_at: float = 0.0
+        self._lock = threading.Lock()
+        self._proc: subprocess.Popen | None = None
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self.gave_up = False
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._reader_loop, daemon=True, name=f"{self.name}-reader")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._proc and self._proc.poll() is None:
+            self._proc.terminate()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def latest(self, max_age_s: float) -> dict | None:
+        """Return the most recent parsed fields, or None if nothing fresh arrived."""
+        with self._lock:
+            if not self._latest or time.monotonic() - self._latest_at > max_age_s:
+                return None
+            return dict(self._latest)
+
+    def _reader_loop(self) -> None:
+        delay = self.RESTART_DELAY_S
+        failures = 0  # launches in a row that failed or exited without output
+        while not self._stop_event.is_set():
+            try:
+                self._proc = subprocess.Popen(
+                    self.argv, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                    text=True, bufsize=1,
+                )
+            except (FileNotFoundError, OSError) as e:
+                failures += 1
+                if failures >= self.MAX_LAUNCH_FAILURES:
+                    logger.warning(f"{self.name} stream unavailable ({e}); giving up")
+                    self.gave_up = True
+                    return
+                logger.debug(f"{self.name} stream unavailable: {e}")
+                self._stop_event.wait(delay)
+                delay = min(delay * 2, self.MAX_RESTART_DELAY_S)
+                continue
+
+            produced = False
+            for line in self._proc.stdout:
+                fields = self.parse(line)
+                if fields:
+                    produced = True
+                    with self._lock:
+                        self._latest.update(fields)
+                        self._latest_at = time.monotonic()
+                if self._stop_event.is_set():
+                    break
+
+            self._proc.wait()
+            if not self._stop_event.is_set():
+                # A monitor that ran fine restarts quickly; one that keeps failing backs off
+                failures = 0 if produced else failures + 1
+                if failures >= self.MAX_LAUNCH_FAILURES:
+                    logger.warning(f"{self.name} stream keeps exiting without output; giving up")
+                    self.gave_up = True
+                    return
+                delay = self.RESTART_DELAY_S if produced else min(delay * 2, self.MAX_RESTART_DELAY_S)
+                logger.debug(f"{self.name} stream exited ({self._proc.returncode}); restarting in {delay:.0f}s")
+                self._stop_event.wait(delay)
+
+
+async def run_command_async(argv: list[str], timeout: float) -> str | None:
+    """
+    asyncio counterpart of subprocess.run(argv, capture_output=True, timeout=...):
+    stdout on exit code 0, None if the tool is missing, fails or times out.
+    """
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+        )
+    except (FileNotFoundError, OSError) as e:
+        logger.debug(f"{argv[0]} unavailable: {e}")
+        return None
+    try:
+        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        logger.debug(f"{argv[0]} timed out after {timeout}s")
+        return None
+    if proc.returncode != 0:
+        return None
+    return stdout.decode(errors="replace")
+
+
+def stream_argv(env_var: str, default: str) -> list[str]:
+    """Command line for a persistent monitor process, overridable via env."""
+    return shlex.split(os.getenv(env_var, default))
+
+
+def _benchmark(device: str, backend: str | None, samples: int) -> None:
+    if device == "gpu":
+        from measurement.gpu import select_gpu_backend as select, read_gpu_power as read
+    else:
+        from measurement.npu import select_npu_backend as select, read_npu_power as read
+
+    chosen = select(backend)
+    chosen.stats.reset()
+    for _ in range(samples):
+        read()
+        time.sleep(0.05)
+
+    stats = chosen.stats.as_dict()
+    print(f"{device} backend={chosen.name} samples={stats['samples']} "
+          f"mean={stats['mean_ms']}ms max={stats['max_ms']}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--device", choices=["gpu", "npu"], default="gpu")
+    parser.add_argument("--backend", default=None)
+    parser.add_argument("--samples", type=int, default=20)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    _benchmark(args.device, args.backend, args.samples)
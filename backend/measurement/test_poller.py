@@ -0,0 +1,112 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from measurement import poller as poller_module
+from measurement.poller import PowerPoller
+
+
+@pytest.fixture
+def sensors(monkeypatch):
+    """Fake sensor readers: gpu blocks until `release` is set, cpu and npu answer at once."""
+    release = threading.Event()
+    calls = {"gpu": 0}
+
+    def slow_gpu():
+        calls["gpu"] += 1
+        release.wait(5)
+        return 30.0, 50.0, True, [(30.0, 50.0)]
+
+    monkeypatch.setitem(poller_module._SENSORS, "gpu", slow_gpu)
+    monkeypatch.setitem(poller_module._SENSORS, "cpu", lambda: (12.0, 20.0, True, {}))
+    monkeypatch.setitem(poller_module._SENSORS, "npu", lambda: (1.0, 5.0, True))
+    yield release, calls
+    release.set()
+
+
+@pytest.fixture
+def poller():
+    p = PowerPoller(device_deadline_s=0.05)
+    p._executor = ThreadPoolExecutor(max_workers=3)
+    yield p
+    p._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def test_device_past_its_deadline_keeps_last_value_and_is_stale(sensors, poller):
+    release, calls = sensors
+    reading = poller._take_reading()
+    assert reading["stale"] == ["gpu"]
+    assert reading["gpu_watts"] == 0.0
+    assert reading["cpu_watts"] == 12.0
+    assert reading["latency_ms"]["gpu"] >= 50.0
+    assert reading["seq"] == 0
+
+    reading = poller._take_reading()
+    assert reading["stale"] == ["gpu"]
+    assert calls["gpu"] == 1  # still in flight: not submitted again
+
+    release.set()
+    poller._pending["gpu"][0].result(timeout=5)
+    reading = poller._take_reading()
+    assert reading["stale"] == []
+    assert reading["gpu_watts"] == 30.0
+    assert reading["gpu_card_watts"] == [30.0]
+    assert reading["total_watts"] == 43.0
+    assert reading["seq"] == 2
+
+
+def test_jitter_is_measured_against_the_deadline_waited_for(poller):
+    poller._schedule_next(time.monotonic() - 0.25, woken=False)
+    _, _, _, late_s = poller._begin_tick()
+    assert late_s == pytest.approx(0.25, abs=0.05)
+
+    poller._schedule_next(time.monotonic() + 5.0, woken=True)  # woken early on purpose
+    _, _, _, late_s = poller._begin_tick()
+    assert 0.0 <= late_s < 0.05
+
+
+def raw_sample(seq: int, watts: float, interval_s: float) -> dict:
+    return {
+        "seq": seq, "ts": 1000.0 + seq, "timestamp": 1000 + seq, "total_watts": watts, "gpu_watts": watts,
+        "interval_s": interval_s, "samples": 1, "latency_ms": {"cpu": float(seq)}, "gpu_card_watts": [watts],
+        "gpu_card_utilization_pct": [0.0], "cpu_domain_watts": {},
+    }
+
+
+@pytest.fixture
+def emitted(poller):
+    poller._counters = SimpleNamespace(update=lambda: None)
+    poller._last_emit = 0.0
+    readings = []
+    poller.register_callback(readings.append)
+    return readings
+
+
+def test_high_rate_samples_fold_into_one_time_weighted_reading(poller, emitted):
+    for seq, (watts, interval_s) in enumerate([(10.0, 0.25), (10.0, 0.25), (20.0, 0.5)]):
+        poller._record(raw_sample(seq, watts, interval_s), high_rate=True, start=0.25 * (seq + 1))
+    assert emitted == []
+    poller._record(raw_sample(3, 40.0, 0.1), high_rate=True, start=1.1)
+
+    [reading] = emitted
+    assert reading["seq"] == 3
+    assert reading["samples"] == 4
+    assert reading["interval_s"] == pytest.approx(1.1)
+    assert reading["jitter_ms"] == pytest.approx(100.0)
+    assert reading["total_watts"] == pytest.approx((2.5 + 2.5 + 10.0 + 4.0) / 1.1, abs=0.05)
+    assert reading["gpu_card_watts"] == [reading["total_watts"]]
+    assert reading["latency_ms"] == {"cpu": 3.0}
+    assert poller.buffer.view()["seq"].tolist() == [3]
+
+
+def test_window_cut_short_by_leaving_workload_mode_has_no_jitter(poller, emitted):
+    poller._record(raw_sample(0, 10.0, 0.02), high_rate=True, start=0.02)
+    poller._record(raw_sample(1, 30.0, 0.02), high_rate=False, start=0.04)
+
+    [reading] = emitted
+    assert reading["samples"] == 2
+    assert reading["total_watts"] == 20.0
+    assert reading["jitter_ms"] == 0.0
@@ -0,0 +1,92 @@
+import numpy as np
+
+from measurement.ringbuffer import ReadingLog, ReadingRing, to_dicts, window_integral, window_mean
+
+
+def reading(seq: int, watts: float = 10.0, **extra) -> dict:
+    return {"seq": seq, "ts": 1000.0 + seq, "timestamp": 1000 + seq, "total_watts": watts, "interval_s": 1.0, **extra}
+
+
+def seqs(rows: np.ndarray) -> list[int]:
+    return rows["seq"].tolist()
+
+
+def test_ring_keeps_newest_rows_as_a_contiguous_view():
+    ring = ReadingRing(4)
+    for seq in range(6):
+        ring.append(reading(seq))
+    view = ring.view()
+    assert len(ring) == 4
+    assert seqs(view) == [2, 3, 4, 5]
+    assert np.shares_memory(view, ring._data)
+    assert seqs(ring.view(2)) == [4, 5]
+    assert seqs(ring.between_seq(3, 4)) == [3, 4]
+    assert seqs(ring.between_ts(1003.0)) == [4, 5]
+
+
+def test_ring_snapshot_is_not_changed_by_later_appends():
+    ring = ReadingRing(3)
+    for seq in range(3):
+        ring.append(reading(seq))
+    snapshot = ring.snapshot()
+    for seq in range(3, 6):
+        ring.append(reading(seq))
+    assert seqs(snapshot) == [0, 1, 2]
+
+
+def test_to_dicts_restores_nested_fields():
+    ring = ReadingRing(2, cpu_domains=("package-0", "dram-0"))
+    ring.append(reading(
+        7, 42.0, source="live", latency_ms={"gpu": 1.5}, stale=["npu"],
+        cpu_domain_watts={"dram-0": 3.0}, gpu_card_watts=[20.0, 22.0],
+    ))
+    [restored] = to_dicts(ring.view(), ring.cpu_domains)
+    assert restored["seq"] == 7
+    assert restored["total_watts"] == 42.0
+    assert restored["source"] == "live"
+    assert restored["latency_ms"] == {"gpu": 1.5}
+    assert restored["stale"] == ["npu"]
+    assert restored["cpu_domain_watts"] == {"dram-0": 3.0}
+    assert restored["gpu_card_watts"] == [20.0, 22.0]
+
+
+def test_log_spills_evicted_rows_for_seq_and_ts_queries():
+    log = ReadingLog(capacity=8, spill_rows=8)
+    for seq in range(20):
+        log.append(reading(seq))
+    assert seqs(log.ring.view())[0] == 12
+    rows = log.between_seq(6, 15)
+    assert seqs(rows) == list(range(6, 16))
+    assert seqs(log.between_ts(1005.0, 1008.0)) == [6, 7, 8]
+    assert log.last_seq == 19
+
+
+def test_log_trims_spill_to_its_budget():
+    log = ReadingLog(capacity=8, spill_rows=8)
+    for seq in range(200):
+        log.append(reading(seq))
+    spilled = sum(len(chunk) for chunk in log._spill)
+    assert 8 <= spilled < 8 + log._block
+    assert seqs(log.between_seq(0))[0] == 200 - 8 - spilled
+    assert seqs(log.between_seq(0))[-1] == 199
+
+
+def test_pinned_rows_survive_until_unpinned():
+    log = ReadingLog(capacity=8, spill_rows=8)
+    for seq in range(5):
+        log.append(reading(seq))
+    log.pin(3)
+    for seq in range(5, 200):
+        log.append(reading(seq))
+    assert seqs(log.between_seq(3)) == list(range(3, 200))
+    log.unpin(3)
+    assert seqs(log.between_seq(3))[0] > 100
+
+
+def test_window_aggregates_weight_by_interval():
+    ring = ReadingRing(4)
+    ring.append({**reading(0, 10.0), "interval_s": 1.0})
+    ring.append({**reading(1, 40.0), "interval_s": 3.0})
+    rows = ring.view()
+    assert window_mean(rows) == 32.5
+    assert window_integral(rows) == 130.0
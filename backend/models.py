@@ -24,6 +24,16 @@ class PowerReading(BaseModel):
     timestamp: int = 0
     co2_g_cumulative: float = 0.0
     source: Literal["live", "estimated"] = "estimated"
+    interval_s: float = 1.0                    # measured time since the previous tick
+    jitter_ms: float = 0.0                     # how late the tick ran against its schedule
+    latency_ms: dict[str, float] = {}          # per-device sampling latency
+    stale: list[str] = []                      # devices that missed the deadline and reused their last value
+    ts: float = 0.0                            # sub-second wall-clock timestamp
+    samples: int = 1                           # raw samples averaged into this reading (>1 in high-rate mode)
+    seq: int = 0                               # poller sequence number of the (last) raw sample
+    cpu_domain_watts: dict[str, float] = {}    # per RAPL domain, e.g. "package-1", "package-0/dram"
+    gpu_card_watts: list[float] = []           # per card, indexed like GPU[N]; gpu_watts is their sum
+    gpu_card_utilization_pct: list[float] = []
 
 
 class HardwareProfile(BaseModel):
@@ -102,6 +112,7 @@ class WorkloadRunRequest(BaseModel):
     compute_target: Literal["gpu", "cpu", "npu"] = "gpu"
     batch_size: int = 1
     num_samples: int = 100
+    device_index: Optional[int] = None   # pin a GPU run to card N; it is charged only that card's energy
 
 
 class WorkloadRun(BaseModel):
@@ -113,6 +124,7 @@ class WorkloadRun(BaseModel):
     compute_target: str
     batch_size: int
     num_samples: int
+    device_index: Optional[int] = None
     status: Literal["queued", "running", "complete", "failed"] = "queued"
     started_at: int = 0
     completed_at: Optional[int] = None
@@ -122,6 +134,10 @@ class WorkloadRun(BaseModel):
     co2_g: Optional[float] = None
     grade: Optional[str] = None
     grid_intensity: float = 820.0
+    energy_method: Optional[str] = None   # "counters", "counters+samples", "samples" (raw/high-rate) or "buffer"
+    energy_samples: int = 0
+    energy_devices_j: dict[str, float] = {}   # joules per device (gpu/cpu/npu)
+    energy_domains_j: dict[str, float] = {}   # exact joules per energy-counter domain, e.g. "rapl:package-0"
     power_readings: list[PowerReading] = []
 
 
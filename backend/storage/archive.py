@@ -0,0 +1,84 @@
+"""
+Cold archive for the power readings of old runs.
+
+Readings older than the retention window leave the hot database and are appended
+to one gzip file per UTC day of the run's start:
+    <ARCHIVE_DIR>/readings/2026/10/2026-10-03.ndjson.gz
+one line per run: {"run_id": ..., "readings": [...]}. Each append is a new gzip
+member, so files are never rewritten; if a run appears twice (a pass interrupted
+between the append and the delete) the last line wins.
+"""
+import gzip
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+READINGS_DIR = "readings"
+
+
+def partition_path(base_dir: str, started_at: int) -> str:
+    day = time.strftime("%Y-%m-%d", time.gmtime(started_at or 0))
+    return os.path.join(base_dir, READINGS_DIR, day[:4], day[5:7], f"{day}.ndjson.gz")
+
+
+def append(base_dir: str, runs: list[tuple[str, int, list[dict]]]) -> int:
+    """Append (run_id, started_at, readings) to their day files and fsync; returns bytes written."""
+    by_path: dict[str, list[str]] = {}
+    for run_id, started_at, readings in runs:
+        line = json.dumps({"run_id": run_id, "readings": readings}, separators=(",", ":"))
+        by_path.setdefault(partition_path(base_dir, started_at), []).append(line)
+    written = 0
+    for path, lines in by_path.items():
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+                gz.write(("\n".join(lines) + "\n").encode())
+            raw.flush()
+            os.fsync(raw.fileno())
+            written += raw.tell()
+    return written
+
+
+def load(base_dir: str, runs: list[tuple[str, int]]) -> dict[str, list[dict]]:
+    """Archived readings for (run_id, started_at) pairs; runs not in the archive are omitted."""
+    wanted: dict[str, set[str]] = {}
+    for run_id, started_at in runs:
+        wanted.setdefault(partition_path(base_dir, started_at), set()).add(run_id)
+    found: dict[str, list[dict]] = {}
+    for path, run_ids in wanted.items():
+        if not os.path.exists(path):
+            continue
+        # Cheap prefix test before parsing: lines are written as {"run_id":"...",...
+        prefixes = {f'{{"run_id":{json.dumps(rid)},'.encode(): rid for rid in run_ids}
+        try:
+            with gzip.open(path, "rb") as f:
+                for line in f:
+                    head = line[:line.find(b",") + 1]
+                    if head in prefixes:
+                        found[prefixes[head]] = json.loads(line)["readings"]
+        except (OSError, EOFError, ValueError) as e:
+            logger.error(f"Archive read error in {path}: {e}")
+    return found
+
+
+def prune(base_dir: str, before: int) -> int:
+    """Delete day files for days entirely before `before` (unix seconds); returns files removed."""
+    cutoff = time.strftime("%Y-%m-%d", time.gmtime(before))
+    removed = 0
+    root = os.path.join(base_dir, READINGS_DIR)
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.endswith(".ndjson.gz") and name[:10] < cutoff:
+                os.remove(os.path.join(dirpath, name))
+                removed += 1
+    return removed
+
+
+def size_bytes(base_dir: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(os.path.join(base_dir, READINGS_DIR)):
+        total += sum(os.path.getsize(os.path.join(dirpath, name)) for name in filenames)
+    return total
@@ -0,0 +1,124 @@
+"""
+Storage codecs for the free-form payload columns, runs.data and readings.extra.
+    json          JSON text, stored as TEXT (every row written before codecs existed)
+    msgpack       MessagePack, stored as BLOB
+    packed        MessagePack [mask, values, rest]: the values of the known fields
+                  (PACKED_KEYS) in table order behind a bitmask of which are present,
+                  so field names are not repeated in every row; other fields go in rest
+    *+zstd        msgpack/packed values of ZSTD_MIN_BYTES or more compressed with zstd
+Binary values start with a one-byte tag (format | ZSTD_FLAG), so decode() reads any
+mix of rows and changing STORAGE_CODEC only affects new writes.
+"""
+import json
+import logging
+import threading
+from functools import lru_cache
+
+try:
+    import msgpack  # optional dependency; storage falls back to JSON without it
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard  # optional dependency; only needed by the *+zstd codecs
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+JSON = "json"
+MSGPACK = "msgpack"
+PACKED = "packed"
+CODECS = (JSON, MSGPACK, f"{MSGPACK}+zstd", PACKED, f"{PACKED}+zstd")
+
+TAG_MSGPACK, TAG_PACKED = 0x01, 0x02
+ZSTD_FLAG = 0x80
+ZSTD_LEVEL = 3
+ZSTD_MIN_BYTES = 256  # smaller values barely shrink and only pay the frame overhead
+
+# Append-only: a field's position is its bit in the stored mask, so never reorder or remove entries
+PACKED_KEYS = (
+    # run fields outside RUN_COLUMNS
+    "device_index", "energy_method", "energy_samples", "energy_devices_j", "energy_domains_j",
+    # reading fields outside READING_COLUMNS
+    "interval_s", "jitter_ms", "latency_ms", "stale", "ts", "samples", "seq",
+    "cpu_domain_watts", "gpu_card_watts", "gpu_card_utilization_pct",
+)
+_KNOWN = frozenset(PACKED_KEYS)
+
+_local = threading.local()  # zstd (de)compressors are not safe to share between threads
+
+
+def available(codec: str) -> bool:
+    if codec == JSON:
+        return True
+    return msgpack is not None and (not codec.endswith("+zstd") or zstandard is not None)
+
+
+def resolve(codec: str) -> str:
+    """Validate a codec name, falling back to json when its libraries are missing."""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown storage codec '{codec}'; expected {', '.join(CODECS)}")
+    if not available(codec):
+        logger.warning(f"Storage codec '{codec}' needs msgpack/zstandard, which are not installed; using json")
+        return JSON
+    return codec
+
+
+def encode(value, codec: str) -> str | bytes:
+    """JSON text for the json codec, otherwise tagged bytes."""
+    if codec == JSON:
+        return json.dumps(value)
+    if codec.startswith(PACKED) and isinstance(value, dict):
+        tag, body = TAG_PACKED, msgpack.packb(_pack_fields(value))
+    else:
+        tag, body = TAG_MSGPACK, msgpack.packb(value)
+    if codec.endswith("+zstd") and len(body) >= ZSTD_MIN_BYTES:
+        return bytes((tag | ZSTD_FLAG,)) + _compressor().compress(body)
+    return bytes((tag,)) + body
+
+
+def decode(data: str | bytes):
+    """Decode a value written by encode() with any codec; TEXT is always JSON."""
+    if isinstance(data, str):
+        return json.loads(data)
+    if msgpack is None:
+        raise ValueError("Binary storage value but msgpack is not installed")
+    tag, body = data[0], memoryview(data)[1:]
+    if tag & ZSTD_FLAG:
+        if zstandard is None:
+            raise ValueError("zstd-compressed storage value but zstandard is not installed")
+        body = _decompressor().decompress(body)
+    value = msgpack.unpackb(body)
+    if tag & ~ZSTD_FLAG == TAG_PACKED:
+        mask, values, rest = value
+        value = dict(zip(_fields(mask), values))
+        value.update(rest)
+    return value
+
+
+def _pack_fields(value: dict) -> list:
+    mask = 0
+    for i, key in enumerate(PACKED_KEYS):
+        if key in value:
+            mask |= 1 << i
+    rest = {k: v for k, v in value.items() if k not in _KNOWN}
+    return [mask, [value[k] for k in _fields(mask)], rest]
+
+
+@lru_cache(maxsize=256)
+def _fields(mask: int) -> tuple[str, ...]:
+    """Known field names present in `mask`, in table order (a handful of distinct masks occur)."""
+    return tuple(key for i, key in enumerate(PACKED_KEYS) if mask >> i & 1)
+
+
+def _compressor():
+    if getattr(_local, "compressor", None) is None:
+        _local.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    return _local.compressor
+
+
+def _decompressor():
+    if getattr(_local, "decompressor", None) is None:
+        _local.decompressor = zstandard.ZstdDecompressor()
+    return _local.decompressor
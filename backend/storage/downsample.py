@@ -0,0 +1,77 @@
+"""
+Series downsampling for chart-sized payloads, in NumPy.
+    lttb     Largest-Triangle-Three-Buckets: picks the max_points most visually
+             significant points (keeps spikes; output is a subset of the input)
+    minmax   per-bucket envelope (start time, min, mean, max), fully vectorised
+"""
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the n points LTTB keeps (always the first and the last)."""
+    size = len(x)
+    if n >= size or n < 3:
+        return np.arange(size)
+    # n - 2 buckets over the interior points; bucket i is [edges[i], edges[i + 1])
+    edges = np.floor(np.linspace(1, size - 1, n - 1)).astype(np.int64)
+    counts = np.diff(edges)
+    # Each bucket is scored against the mean of the bucket after it (the last point for the final one)
+    avg_x = np.add.reduceat(x[:size - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:size - 1], edges[:-1]) / counts
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(n, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        xs, ys = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - next_x[i]) * (ys - y[a]) - (x[a] - xs) * (next_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(
+    x: np.ndarray, y: np.ndarray, n: int,
+    lo: np.ndarray | None = None, hi: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (t, min, mean, max) over n equal-count buckets; t is each bucket's first x.
+    lo/hi are per-point minima/maxima when the input is already bucketed (default y).
+    """
+    lo = y if lo is None else lo
+    hi = y if hi is None else hi
+    size = len(x)
+    if n >= size:
+        return x, lo, y, hi
+    starts = np.unique(np.floor(np.linspace(0, size, n + 1)[:-1]).astype(np.int64))
+    counts = np.diff(np.append(starts, size))
+    return (
+        x[starts],
+        np.minimum.reduceat(lo, starts),
+        np.add.reduceat(y, starts) / counts,
+        np.maximum.reduceat(hi, starts),
+    )
+
+
+def series(
+    x: np.ndarray, y: np.ndarray, max_points: int, method: str = "lttb",
+    lo: np.ndarray | None = None, hi: np.ndarray | None = None,
+) -> dict:
+    """Downsample one series into the columnar payload the timeline endpoint returns."""
+    if method == "lttb":
+        keep = lttb(x, y, max_points)
+        return {"t": x[keep].tolist(), "watts": np.round(y[keep], 2).tolist()}
+    if method == "minmax":
+        t, mins, means, maxs = minmax(x, y, max_points, lo, hi)
+        return {
+            "t": t.tolist(),
+            "min": np.round(mins, 2).tolist(),
+            "mean": np.round(means, 2).tolist(),
+            "max": np.round(maxs, 2).tolist(),
+        }
+    raise ValueError(f"Unknown method '{method}'; expected {' or '.join(METHODS)}")
@@ -0,0 +1,241 @@
+"""
+Streaming export of runs, their readings and the node time series.
+
+Rows come from the database in keyset-paginated chunks of EXPORT_CHUNK and each
+format encoder turns one chunk at a time into bytes, so memory stays flat however
+much is exported. Runs still in the write-behind queue are read from it, as get_run()
+and query_history() do, so a just-finished run exports in full:
+    csv      header, then one line per row (nested values as JSON text)
+    ndjson   one JSON object per line (readings keep their nested fields)
+    parquet  row groups of PARQUET_ROW_GROUP rows (needs pyarrow)
+    arrow    Arrow IPC stream, one record batch per chunk (needs pyarrow)
+"""
+import csv
+import io
+import json
+import logging
+import os
+from typing import Iterable, Iterator
+
+import database
+from storage.timeseries import RAW_FIELDS, get_timeseries
+
+try:
+    import pyarrow as pa  # optional dependency; csv/ndjson work without it
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK = int(os.getenv("EXPORT_CHUNK", "500"))
+PARQUET_ROW_GROUP = 65536  # rows buffered per Parquet row group (the only buffering)
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+COLUMNAR = ("parquet", "arrow")
+
+_ARROW_TYPES = {"TEXT": "string", "INTEGER": "int64", "REAL": "float64"}
+
+# Column layouts for csv/parquet/arrow; JSON columns hold nested values as text
+RUN_EXPORT_COLUMNS = {
+    "run_id": "TEXT", **database.RUN_COLUMNS,
+    "device_index": "INTEGER", "energy_method": "TEXT", "energy_samples": "INTEGER",
+    "energy_devices_j": "JSON", "energy_domains_j": "JSON",
+}
+READING_EXPORT_COLUMNS = {
+    "run_id": "TEXT", "seq": "INTEGER", **database.READING_COLUMNS,
+    "interval_s": "REAL", "cpu_domain_watts": "JSON", "gpu_card_watts": "JSON",
+}
+TIMESERIES_EXPORT_COLUMNS = {name: "REAL" for name in RAW_FIELDS}
+
+# A run's readings as csv keep the original export's leading columns and names
+# (gpu_util / cpu_util), so existing consumers keep working; newer fields follow.
+_LEGACY_READING_CSV = {
+    "timestamp": "timestamp", "gpu_watts": "gpu_watts", "cpu_watts": "cpu_watts", "npu_watts": "npu_watts",
+    "total_watts": "total_watts", "gpu_util": "gpu_utilization_pct", "cpu_util": "cpu_utilization_pct",
+}
+_READING_CSV_SOURCES = {
+    **_LEGACY_READING_CSV,
+    **{c: c for c in READING_EXPORT_COLUMNS if c != "run_id" and c not in _LEGACY_READING_CSV.values()},
+}
+READING_CSV_COLUMNS = {
+    name: READING_EXPORT_COLUMNS[source] for name, source in _READING_CSV_SOURCES.items()
+}
+
+
+def check_format(fmt: str) -> None:
+    """Raise ValueError for an unknown format or a columnar one without pyarrow."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'; expected {', '.join(FORMATS)}")
+    if fmt in COLUMNAR and pa is None:
+        raise ValueError(f"Format '{fmt}' needs pyarrow, which is not installed")
+
+
+# ── Sources ───────────────────────────────────────────────────────────────────
+def run_chunks(filters: dict, since: int | None, until: int | None) -> Iterator[list[dict]]:
+    """Completed runs matching the history filters, newest first, without readings."""
+    fields = tuple(f for f in RUN_EXPORT_COLUMNS if f != "run_id")
+    cursor = None
+    while True:
+        page, cursor = database.query_history(EXPORT_CHUNK, cursor, filters, since, until, fields)
+        yield page
+        if cursor is None:
+            return
+
+
+def reading_chunks(filters: dict, since: int | None, until: int | None) -> Iterator[list[dict]]:
+    """Readings of every matching run, a few runs (~EXPORT_CHUNK readings) per chunk."""
+    runs_per_chunk = max(1, EXPORT_CHUNK // 60)
+    cursor = None
+    while True:
+        page, cursor = database.query_history(runs_per_chunk, cursor, filters, since, until, ("started_at",))
+        yield [
+            reading for run in page
+            for reading in database.iter_run_readings(run["run_id"], EXPORT_CHUNK, run["started_at"])
+        ]
+        if cursor is None:
+            return
+
+
+def run_reading_chunks(run_id: str, started_at: int | None = None) -> Iterator[list[dict]]:
+    chunk: list[dict] = []
+    for reading in database.iter_run_readings(run_id, EXPORT_CHUNK, started_at):
+        chunk.append(reading)
+        if len(chunk) >= EXPORT_CHUNK:
+            yield chunk
+            chunk = []
+    yield chunk
+
+
+def reading_csv_chunks(chunks: Iterable[list[dict]]) -> Iterator[list[dict]]:
+    """Rename reading rows to the READING_CSV_COLUMNS layout."""
+    for chunk in chunks:
+        yield [{name: row.get(source) for name, source in _READING_CSV_SOURCES.items()} for row in chunk]
+
+
+def timeseries_chunks(start: float, end: float) -> Iterator[list[dict]]:
+    """Raw node power samples in [start, end), oldest first."""
+    yield from get_timeseries().iter_raw(start, end, EXPORT_CHUNK)
+
+
+def stream(fmt: str, columns: dict[str, str], chunks: Iterable[list[dict]]) -> Iterator[bytes]:
+    """encode(), skipping the empty pieces a chunk can produce."""
+    for data in encode(fmt, columns, chunks):
+        if data:
+            yield data
+
+
+# ── Encoders ──────────────────────────────────────────────────────────────────
+def encode(fmt: str, columns: dict[str, str], chunks: Iterable[list[dict]]) -> Iterator[bytes]:
+    """
+    Encode an iterable of row chunks. `columns` maps column name to its SQLite type
+    (TEXT/INTEGER/REAL/JSON) and fixes the csv/columnar layout; ndjson writes rows as-is.
+    """
+    if fmt == "csv":
+        return _csv(columns, chunks)
+    if fmt == "ndjson":
+        return _ndjson(chunks)
+    if fmt == "parquet":
+        return _parquet(columns, chunks)
+    return _arrow(columns, chunks)
+
+
+def _csv(columns: dict[str, str], chunks: Iterable[list[dict]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in chunks:
+        for row in chunk:
+            writer.writerow([_flat(row.get(c)) for c in columns])
+        yield _drain_text(buffer)
+    yield _drain_text(buffer)
+
+
+def _ndjson(chunks: Iterable[list[dict]]) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield "".join(json.dumps(row) + "\n" for row in chunk).encode()
+
+
+def _schema(columns: dict[str, str]):
+    return pa.schema([(name, _ARROW_TYPES.get(sql_type, "string")) for name, sql_type in columns.items()])
+
+
+def _batch(schema, chunk: list[dict]):
+    arrays = {}
+    for field in schema:
+        values = [row.get(field.name) for row in chunk]
+        if pa.types.is_string(field.type):
+            values = [_flat(v) if v is not None else None for v in values]
+        arrays[field.name] = values
+    return pa.RecordBatch.from_pydict(arrays, schema=schema)
+
+
+def _parquet(columns: dict[str, str], chunks: Iterable[list[dict]]) -> Iterator[bytes]:
+    schema = _schema(columns)
+    sink = _ChunkSink()
+    batches, rows = [], 0
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for chunk in chunks:
+            if chunk:
+                batches.append(_batch(schema, chunk))
+                rows += len(chunk)
+            if rows >= PARQUET_ROW_GROUP:
+                writer.write_table(pa.Table.from_batches(batches, schema=schema))
+                batches, rows = [], 0
+                yield sink.drain()
+        if batches:
+            writer.write_table(pa.Table.from_batches(batches, schema=schema))
+    yield sink.drain()
+
+
+def _arrow(columns: dict[str, str], chunks: Iterable[list[dict]]) -> Iterator[bytes]:
+    schema = _schema(columns)
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for chunk in chunks:
+            if chunk:
+                writer.write_batch(_batch(schema, chunk))
+            yield sink.drain()
+    yield sink.drain()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def _drain_text(buffer: io.StringIO) -> bytes:
+    data = buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+def _flat(value):
+    """Scalar for csv/string columns; dicts and lists become JSON text."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
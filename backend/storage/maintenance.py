@@ -0,0 +1,243 @@
+"""
+Scheduled housekeeping that keeps runs.db small:
+  1. readings of runs older than RUN_READINGS_RETENTION_D move to the day-partitioned
+     archive (storage/archive.py); run summaries stay in the hot database
+  2. with RUN_RETENTION_D > 0, whole runs (and their archive days) older than that go
+  3. freed pages are returned with incremental vacuum, the WAL is truncated and
+     the query planner statistics refreshed
+A pass runs shortly after startup and then every MAINTENANCE_INTERVAL_H, in one process
+only: with several API workers, the one holding an flock on <DB_PATH>.maintenance.lock
+runs it, and the others take over if that process goes away.
+A database created before incremental vacuum is switched over by the first pass (one
+full VACUUM) if it is small; a larger one needs the explicit step, with the API stopped:
+    python -m storage.maintenance --enable-incremental-vacuum
+"""
+import argparse
+import fcntl
+import logging
+import os
+import threading
+import time
+
+import database
+from storage import archive
+
+logger = logging.getLogger(__name__)
+
+RUN_RETENTION_S = float(os.getenv("RUN_RETENTION_D", "0")) * 86400  # 0 = keep summaries forever
+INTERVAL_S = float(os.getenv("MAINTENANCE_INTERVAL_H", "6")) * 3600
+STARTUP_DELAY_S = 60.0
+ARCHIVE_BATCH = 200       # runs archived per transaction
+VACUUM_STEP_PAGES = 2000  # pages freed per incremental_vacuum call (~8 MB at 4 KiB)
+# Largest file the scheduled pass rewrites to enable incremental vacuum (a full VACUUM
+# holds the write lock for the whole rewrite; seconds at this size)
+AUTO_VACUUM_SWITCH_MAX_BYTES = 256 * 1024 * 1024
+INCREMENTAL = 2  # PRAGMA auto_vacuum value
+
+_SELECT_COLD_RUNS = '''
+    SELECT run_id, started_at FROM runs
+    WHERE status IN ('complete', 'failed') AND started_at < ?
+      AND EXISTS (SELECT 1 FROM readings WHERE readings.run_id = runs.run_id)
+    ORDER BY started_at
+    LIMIT ?
+'''
+
+
+def archive_cold_readings(now: float | None = None) -> int:
+    """Move the readings of runs past the retention window to the archive; returns runs moved."""
+    cutoff = (now or time.time()) - database.READINGS_RETENTION_S
+    conn = database.get_db()
+    moved = 0
+    while True:
+        # Select, read, archive and delete a batch under one write lock, so no other
+        # connection can remove these readings in between and leave an empty archive line
+        conn.execute('BEGIN IMMEDIATE;')
+        try:
+            runs = []
+            for row in conn.execute(_SELECT_COLD_RUNS, (cutoff, ARCHIVE_BATCH)).fetchall():
+                readings = [
+                    {k: v for k, v in r.items() if k != "run_id"}
+                    for r in database.iter_run_readings(row["run_id"])
+                ]
+                if readings:  # an empty line would shadow earlier ones ("last line wins")
+                    runs.append((row["run_id"], row["started_at"], readings))
+            if runs:
+                # Archive first and fsync; a crash before the commit re-archives the batch
+                archive.append(database.ARCHIVE_DIR, runs)
+                conn.executemany('DELETE FROM readings WHERE run_id = ?', [(run_id,) for run_id, _, _ in runs])
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        if not runs:
+            return moved
+        moved += len(runs)
+
+
+def expire_runs(now: float | None = None) -> int:
+    """Delete runs (summaries included) past RUN_RETENTION_D; aggregates keep their rollups."""
+    if RUN_RETENTION_S <= 0:
+        return 0
+    cutoff = (now or time.time()) - RUN_RETENTION_S
+    conn = database.get_db()
+    with conn:
+        # Same status filter as the runs below: a stuck queued/running run keeps its readings
+        conn.execute(
+            "DELETE FROM readings WHERE run_id IN "
+            "(SELECT run_id FROM runs WHERE started_at < ? AND status IN ('complete', 'failed'))", (cutoff,),
+        )
+        removed = conn.execute(
+            "DELETE FROM runs WHERE started_at < ? AND status IN ('complete', 'failed')", (cutoff,),
+        ).rowcount
+    archive.prune(database.ARCHIVE_DIR, int(cutoff))
+    return removed
+
+
+def enable_incremental_vacuum(force: bool = False) -> bool:
+    """
+    Switch a database created without incremental auto_vacuum over, with one full VACUUM.
+    Skipped (with a warning) above AUTO_VACUUM_SWITCH_MAX_BYTES unless `force`; returns
+    whether the database is incremental.
+    """
+    conn = database.get_db()
+    if conn.execute('PRAGMA auto_vacuum;').fetchone()[0] == INCREMENTAL:
+        return True
+    size = _db_bytes()
+    if not force and size > AUTO_VACUUM_SWITCH_MAX_BYTES:
+        logger.warning(
+            f"{database.DB_PATH} ({size // 2**20} MB) still uses auto_vacuum=NONE, so freed pages are not "
+            f"returned; stop the API and run: python -m storage.maintenance --enable-incremental-vacuum"
+        )
+        return False
+    logger.info(f"Switching {database.DB_PATH} to incremental auto_vacuum (full VACUUM of {size // 2**20} MB)")
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL;')
+    conn.execute('VACUUM;')
+    return conn.execute('PRAGMA auto_vacuum;').fetchone()[0] == INCREMENTAL
+
+
+def compact() -> int:
+    """Give free pages back to the filesystem a step at a time; returns pages freed."""
+    conn = database.get_db()
+    freed = 0
+    while True:
+        free = conn.execute('PRAGMA freelist_count;').fetchone()[0]
+        if not free:
+            break
+        # executescript steps the pragma to completion; execute() would free a single page
+        conn.executescript(f'PRAGMA incremental_vacuum({min(free, VACUUM_STEP_PAGES)});')
+        step = free - conn.execute('PRAGMA freelist_count;').fetchone()[0]
+        if step <= 0:
+            break  # nothing could be released (e.g. a long-lived reader); retry next pass
+        freed += step
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE);').fetchall()
+    conn.execute('PRAGMA optimize;')
+    return freed
+
+
+class Maintenance:
+    """Background thread running archive → expire → compact on a fixed interval."""
+
+    def __init__(self, interval_s: float = INTERVAL_S, startup_delay_s: float = STARTUP_DELAY_S):
+        self.interval_s = interval_s
+        self.startup_delay_s = startup_delay_s
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock_fd: int | None = None
+        self.last_run: dict = {}
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="db-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=30.0)
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)  # releases the flock; another worker takes over
+            self._lock_fd = None
+
+    def _loop(self) -> None:
+        delay = self.startup_delay_s
+        while not self._stop.wait(delay):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"DB maintenance failed: {e}")
+            delay = self.interval_s
+
+    def owns_lock(self) -> bool:
+        """Whether this process runs maintenance; retried each pass so a survivor takes over."""
+        if self._lock_fd is None:
+            self._lock_fd = _try_lock(f"{database.DB_PATH}.maintenance.lock")
+        return self._lock_fd is not None
+
+    def run_once(self) -> dict:
+        if not self.owns_lock():
+            logger.debug("DB maintenance runs in another process; skipping")
+            return {}
+        start = time.time()
+        database.flush_runs(timeout=10.0)
+        archived = archive_cold_readings(start)
+        expired = expire_runs(start)
+        enable_incremental_vacuum()
+        freed = compact()
+        self.last_run = {
+            "at": int(start),
+            "duration_s": round(time.time() - start, 3),
+            "runs_archived": archived,
+            "runs_expired": expired,
+            "pages_freed": freed,
+            "db_bytes": _db_bytes(),
+            "archive_bytes": archive.size_bytes(database.ARCHIVE_DIR),
+        }
+        logger.info(f"DB maintenance: {self.last_run}")
+        return self.last_run
+
+
+def _try_lock(path: str) -> int | None:
+    """Non-blocking exclusive flock on `path`; the open descriptor holds it, None if taken."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW | os.O_CLOEXEC, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _db_bytes() -> int:
+    return sum(
+        os.path.getsize(path) for path in (database.DB_PATH, f"{database.DB_PATH}-wal")
+        if os.path.exists(path)
+    )
+
+
+# ── Singleton ─────────────────────────────────────────────────────────────────
+_maintenance: Maintenance | None = None
+
+
+def get_maintenance() -> Maintenance:
+    global _maintenance
+    if _maintenance is None:
+        _maintenance = Maintenance()
+    return _maintenance
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run one DB maintenance pass on ENERGENT_DB_PATH")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="only switch an existing database to incremental auto_vacuum, whatever its size "
+                             "(one full VACUUM; stop the API first)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        if args.enable_incremental_vacuum:
+            enable_incremental_vacuum(force=True)
+        else:
+            Maintenance().run_once()
+    finally:
+        database.close_db()
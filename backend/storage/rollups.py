@@ -0,0 +1,197 @@
+"""
+Incremental per-day rollups of completed runs, so aggregate statistics never
+scan the runs table.
+
+Each run is folded in once, in the same transaction that first stores it as
+complete, under its UTC day and (model, task, precision, compute_target):
+    rollup_runs       count and sums (energy, watts, CO2, calls, duration)
+    rollup_energy     log-scale energy histogram, for p50/p95 estimates
+    rollup_grades     grade counts
+Rollups outlive raw runs, so aggregates still cover runs removed by retention.
+"""
+import math
+import sqlite3
+
+DAY_S = 86400
+GROUP_KEYS = ("model", "task", "precision", "compute_target")
+
+# Energy histogram: BINS_PER_DECADE log-spaced bins from ENERGY_FLOOR_WH upwards, so
+# a percentile read from it is within ~6% of the true value.
+ENERGY_FLOOR_WH = 1e-7
+BINS_PER_DECADE = 20
+MAX_BIN = 12 * BINS_PER_DECADE  # up to 100 kWh
+
+_KEY_COLUMNS = "day INTEGER NOT NULL, model TEXT, task TEXT, precision TEXT, compute_target TEXT"
+_KEY = "day, model, task, precision, compute_target"
+
+SCHEMA = (
+    f'''CREATE TABLE IF NOT EXISTS rollup_runs (
+        {_KEY_COLUMNS},
+        runs INTEGER NOT NULL,
+        energy_wh REAL NOT NULL,
+        watts REAL NOT NULL,
+        co2_g REAL NOT NULL,
+        calls INTEGER NOT NULL,
+        duration_s REAL NOT NULL,
+        UNIQUE ({_KEY})
+    )''',
+    f'''CREATE TABLE IF NOT EXISTS rollup_energy (
+        {_KEY_COLUMNS},
+        bin INTEGER NOT NULL,
+        runs INTEGER NOT NULL,
+        UNIQUE ({_KEY}, bin)
+    )''',
+    f'''CREATE TABLE IF NOT EXISTS rollup_grades (
+        {_KEY_COLUMNS},
+        grade TEXT NOT NULL,
+        runs INTEGER NOT NULL,
+        UNIQUE ({_KEY}, grade)
+    )''',
+)
+
+_ADD_RUN = f'''
+    INSERT INTO rollup_runs ({_KEY}, runs, energy_wh, watts, co2_g, calls, duration_s)
+    VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?)
+    ON CONFLICT ({_KEY}) DO UPDATE SET
+        runs = runs + 1,
+        energy_wh = energy_wh + excluded.energy_wh,
+        watts = watts + excluded.watts,
+        co2_g = co2_g + excluded.co2_g,
+        calls = calls + excluded.calls,
+        duration_s = duration_s + excluded.duration_s
+'''
+_ADD_ENERGY = f'''
+    INSERT INTO rollup_energy ({_KEY}, bin, runs) VALUES (?, ?, ?, ?, ?, ?, 1)
+    ON CONFLICT ({_KEY}, bin) DO UPDATE SET runs = runs + 1
+'''
+_ADD_GRADE = f'''
+    INSERT INTO rollup_grades ({_KEY}, grade, runs) VALUES (?, ?, ?, ?, ?, ?, 1)
+    ON CONFLICT ({_KEY}, grade) DO UPDATE SET runs = runs + 1
+'''
+
+
+def energy_bin(energy_wh: float) -> int:
+    if energy_wh <= ENERGY_FLOOR_WH:
+        return 0
+    return min(int(math.log10(energy_wh / ENERGY_FLOOR_WH) * BINS_PER_DECADE), MAX_BIN)
+
+
+def bin_value(index: int) -> float:
+    """Geometric centre of an energy bin."""
+    return ENERGY_FLOOR_WH * 10 ** ((index + 0.5) / BINS_PER_DECADE)
+
+
+def create(conn: sqlite3.Connection):
+    for ddl in SCHEMA:
+        conn.execute(ddl)
+
+
+def record_completion(conn: sqlite3.Connection, run: dict):
+    """Fold one newly completed run into the rollups (caller owns the transaction)."""
+    key = ((run.get("started_at") or 0) // DAY_S, *(run.get(k) for k in GROUP_KEYS))
+    energy_wh = run.get("total_energy_wh") or 0.0
+    conn.execute(_ADD_RUN, (
+        *key, energy_wh, run.get("avg_watts") or 0.0, run.get("co2_g") or 0.0,
+        run.get("num_samples") or 0, run.get("duration_s") or 0.0,
+    ))
+    conn.execute(_ADD_ENERGY, (*key, energy_bin(energy_wh)))
+    if run.get("grade"):
+        conn.execute(_ADD_GRADE, (*key, run["grade"]))
+
+
+def backfill(conn: sqlite3.Connection, run_columns: tuple[str, ...]):
+    """Rebuild the rollups from every complete run (used once, by the schema migration)."""
+    for table in ("rollup_runs", "rollup_energy", "rollup_grades"):
+        conn.execute(f"DELETE FROM {table}")
+    cursor = conn.execute(f"SELECT {', '.join(run_columns)} FROM runs WHERE status = 'complete'")
+    count = 0
+    for row in cursor:
+        record_completion(conn, dict(zip(run_columns, row)))
+        count += 1
+    return count
+
+
+def query(
+    conn: sqlite3.Connection,
+    since: int | None = None,
+    until: int | None = None,
+    group_by: tuple[str, ...] = ("model", "precision", "compute_target"),
+    filters: dict | None = None,
+) -> list[dict]:
+    """
+    Aggregate statistics per group over the UTC days overlapping [since, until]:
+    count, mean watts, mean/p50/p95 energy (percentiles from the histogram), total
+    CO2, CO2 per 1k inference calls and grade distribution.
+    """
+    filters = {k: v for k, v in (filters or {}).items() if v is not None}
+    unknown = (set(group_by) | set(filters)) - set(GROUP_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown group or filter keys: {', '.join(sorted(unknown))}")
+    where, params = [], []
+    if since is not None:
+        where.append("day >= ?")
+        params.append(since // DAY_S)
+    if until is not None:
+        where.append("day <= ?")
+        params.append(until // DAY_S)
+    for column, value in filters.items():
+        where.append(f"{column} = ?")
+        params.append(value)
+    clause = f"WHERE {' AND '.join(where)}" if where else ""
+    groups = ", ".join(group_by)
+    select_groups = f"{groups}, " if group_by else ""
+    group_clause = f"GROUP BY {groups}" if group_by else ""
+
+    results: dict[tuple, dict] = {}
+    totals = conn.execute(f'''
+        SELECT {select_groups}SUM(runs), SUM(energy_wh), SUM(watts), SUM(co2_g), SUM(calls), SUM(duration_s)
+        FROM rollup_runs {clause} {group_clause}
+    ''', params)
+    for row in totals:
+        key, (runs, energy_wh, watts, co2_g, calls, duration_s) = tuple(row[:len(group_by)]), row[len(group_by):]
+        if not runs:
+            continue
+        results[key] = {
+            **dict(zip(group_by, key)),
+            "count": runs,
+            "mean_watts": round(watts / runs, 2),
+            "mean_energy_wh": round(energy_wh / runs, 6),
+            "total_energy_wh": round(energy_wh, 6),
+            "total_co2_g": round(co2_g, 4),
+            "co2_per_1k_calls": round(co2_g / calls * 1000, 4) if calls else None,
+            "mean_duration_s": round(duration_s / runs, 3),
+            "grade_distribution": {},
+            "_bins": {},
+        }
+
+    bins = conn.execute(f"SELECT {select_groups}bin, SUM(runs) FROM rollup_energy {clause} GROUP BY {select_groups}bin", params)
+    for row in bins:
+        key = tuple(row[:len(group_by)])
+        if key in results:
+            results[key]["_bins"][row[-2]] = row[-1]
+    grades = conn.execute(f"SELECT {select_groups}grade, SUM(runs) FROM rollup_grades {clause} GROUP BY {select_groups}grade", params)
+    for row in grades:
+        key = tuple(row[:len(group_by)])
+        if key in results:
+            results[key]["grade_distribution"][row[-2]] = row[-1]
+
+    out = []
+    for group in results.values():
+        histogram = group.pop("_bins")
+        group["p50_energy_wh"] = _percentile(histogram, 0.50)
+        group["p95_energy_wh"] = _percentile(histogram, 0.95)
+        out.append(group)
+    out.sort(key=lambda g: g["count"], reverse=True)
+    return out
+
+
+def _percentile(histogram: dict[int, int], q: float) -> float | None:
+    total = sum(histogram.values())
+    if not total:
+        return None
+    target, seen = q * total, 0
+    for index in sorted(histogram):
+        seen += histogram[index]
+        if seen >= target:
+            return float(f"{bin_value(index):.4g}")
+    return None
@@ -0,0 +1,34 @@
+import os
+
+from storage import archive
+
+DAY = 86400
+STARTED = 1_790_000_000  # 2026-09-21 UTC
+
+
+def test_runs_land_in_their_day_partition(tmp_path):
+    base = str(tmp_path)
+    archive.append(base, [("a", STARTED, [{"gpu_watts": 1.0}]), ("b", STARTED + DAY, [{"gpu_watts": 2.0}])])
+    assert archive.partition_path(base, STARTED) == os.path.join(base, "readings", "2026", "09", "2026-09-21.ndjson.gz")
+    assert os.path.exists(archive.partition_path(base, STARTED + DAY))
+    assert archive.load(base, [("a", STARTED), ("b", STARTED + DAY)]) == {
+        "a": [{"gpu_watts": 1.0}], "b": [{"gpu_watts": 2.0}],
+    }
+
+
+def test_last_appended_line_wins_and_missing_runs_are_omitted(tmp_path):
+    base = str(tmp_path)
+    archive.append(base, [("a", STARTED, [{"seq": 0}]), ("ab", STARTED, [{"seq": 9}])])
+    archive.append(base, [("a", STARTED, [{"seq": 0}, {"seq": 1}])])  # a re-archived batch
+    found = archive.load(base, [("a", STARTED), ("ab", STARTED), ("zz", STARTED), ("a2", STARTED + 9 * DAY)])
+    assert found == {"a": [{"seq": 0}, {"seq": 1}], "ab": [{"seq": 9}]}
+
+
+def test_prune_removes_whole_days_before_the_cutoff(tmp_path):
+    base = str(tmp_path)
+    archive.append(base, [(f"r{i}", STARTED + i * DAY, [{"seq": i}]) for i in range(3)])
+    assert archive.prune(base, STARTED + DAY + 3600) == 1
+    assert archive.load(base, [(f"r{i}", STARTED + i * DAY) for i in range(3)]) == {
+        "r1": [{"seq": 1}], "r2": [{"seq": 2}],
+    }
+    assert archive.size_bytes(base) > 0
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from storage import codec
+
+VALUE = {
+    "interval_s": 1.0, "seq": 42, "latency_ms": {"gpu": 1.5}, "stale": [],
+    "gpu_card_watts": [10.0, 11.5], "custom_note": "kept in rest",
+}
+
+
+@pytest.mark.parametrize("name", codec.CODECS)
+def test_every_codec_round_trips(name):
+    if not codec.available(name):
+        pytest.skip(f"{name} needs libraries that are not installed")
+    assert codec.decode(codec.encode(VALUE, name)) == VALUE
+
+
+def test_packed_stores_known_fields_behind_a_bitmask():
+    pytest.importorskip("msgpack")
+    data = codec.encode(VALUE, codec.PACKED)
+    assert data[0] == codec.TAG_PACKED
+    mask, values, rest = codec.msgpack.unpackb(data[1:])
+    assert [codec.PACKED_KEYS[i] for i in range(len(codec.PACKED_KEYS)) if mask >> i & 1] == [
+        "interval_s", "latency_ms", "stale", "seq", "gpu_card_watts",
+    ]
+    assert values == [1.0, {"gpu": 1.5}, [], 42, [10.0, 11.5]]
+    assert rest == {"custom_note": "kept in rest"}
+    assert b"interval_s" not in data
+
+
+def test_zstd_flag_is_set_only_on_values_worth_compressing():
+    if not codec.available("packed+zstd"):
+        pytest.skip("needs msgpack and zstandard")
+    small = codec.encode(VALUE, "packed+zstd")
+    assert small[0] == codec.TAG_PACKED
+    large_value = {**VALUE, "custom_note": "x" * 4 * codec.ZSTD_MIN_BYTES}
+    large = codec.encode(large_value, "packed+zstd")
+    assert large[0] == codec.TAG_PACKED | codec.ZSTD_FLAG
+    assert len(large) < codec.ZSTD_MIN_BYTES
+    assert codec.decode(large) == large_value
+    assert codec.encode([1, 2, 3] * 200, "packed+zstd")[0] == codec.TAG_MSGPACK | codec.ZSTD_FLAG
+
+
+def test_json_text_and_unknown_codecs():
+    assert codec.decode(json.dumps(VALUE)) == VALUE
+    assert codec.encode(VALUE, codec.JSON) == json.dumps(VALUE)
+    with pytest.raises(ValueError, match="Unknown storage codec"):
+        codec.resolve("gzip")
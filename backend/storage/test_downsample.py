@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from storage.downsample import lttb, minmax, series
+
+
+def test_lttb_keeps_the_endpoints_and_a_lone_spike():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 50)
+    y[437] = 25.0
+    keep = lttb(x, y, 50)
+    assert len(keep) == 50
+    assert keep[0] == 0 and keep[-1] == 999
+    assert np.all(np.diff(keep) > 0)
+    assert 437 in keep
+
+
+def test_lttb_returns_everything_when_already_small_enough():
+    x = np.arange(10, dtype=np.float64)
+    assert lttb(x, x, 10).tolist() == list(range(10))
+    assert lttb(x, x, 2).tolist() == list(range(10))
+
+
+def test_minmax_buckets_carry_the_exact_envelope():
+    x = np.arange(100, dtype=np.float64)
+    y = np.zeros(100)
+    y[13], y[71] = -4.0, 9.0
+    t, lo, mean, hi = minmax(x, y, 10)
+    assert t.tolist() == list(range(0, 100, 10))
+    assert lo[1] == -4.0 and hi[7] == 9.0
+    assert mean[1] == pytest.approx(-0.4)
+    assert hi.max() == 9.0 and lo.min() == -4.0
+
+
+def test_minmax_uses_bucket_extremes_when_given():
+    x = np.arange(4, dtype=np.float64)
+    y = np.array([1.0, 2.0, 3.0, 4.0])
+    _, lo, mean, hi = minmax(x, y, 2, lo=y - 1, hi=y + 10)
+    assert lo.tolist() == [0.0, 2.0]
+    assert mean.tolist() == [1.5, 3.5]
+    assert hi.tolist() == [12.0, 14.0]
+
+
+def test_series_payloads():
+    x = np.arange(5, dtype=np.float64)
+    y = np.array([1.234, 2.0, 3.0, 4.0, 5.0])
+    assert series(x, y, 10) == {"t": [0.0, 1.0, 2.0, 3.0, 4.0], "watts": [1.23, 2.0, 3.0, 4.0, 5.0]}
+    assert set(series(x, y, 2, "minmax")) == {"t", "min", "mean", "max"}
+    with pytest.raises(ValueError, match="Unknown method"):
+        series(x, y, 2, "median")
@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+
+import pytest
+
+from storage import export
+
+
+@pytest.fixture
+def stored_run(db):
+    db.save_run({
+        "run_id": "r1", "status": "complete", "started_at": 1_000, "model": "bert", "precision": "FP16",
+        "device_index": 1, "energy_devices_j": {"gpu": 12.5},
+        "power_readings": [
+            {"timestamp": 1_000 + i, "gpu_watts": 50.0 + i, "gpu_utilization_pct": 80.0, "cpu_utilization_pct": 10.0,
+             "seq": i, "gpu_card_watts": [1.0, 50.0 + i]}
+            for i in range(3)
+        ],
+    })
+    assert db.flush_runs(5)
+    return db
+
+
+def collect(fmt: str, columns: dict, chunks) -> bytes:
+    return b"".join(export.stream(fmt, columns, chunks))
+
+
+def test_reading_csv_keeps_the_original_leading_columns(stored_run):
+    chunks = export.reading_csv_chunks(export.run_reading_chunks("r1", 1_000))
+    rows = list(csv.DictReader(io.StringIO(collect("csv", export.READING_CSV_COLUMNS, chunks).decode())))
+    assert list(rows[0])[:7] == [
+        "timestamp", "gpu_watts", "cpu_watts", "npu_watts", "total_watts", "gpu_util", "cpu_util",
+    ]
+    assert "gpu_utilization_pct" not in rows[0]
+    assert [row["gpu_watts"] for row in rows] == ["50.0", "51.0", "52.0"]
+    assert rows[0]["gpu_util"] == "80.0"
+    assert json.loads(rows[2]["gpu_card_watts"]) == [1.0, 52.0]
+
+
+def test_ndjson_keeps_nested_fields(stored_run):
+    lines = collect("ndjson", export.READING_EXPORT_COLUMNS, export.reading_chunks({}, None, None)).splitlines()
+    readings = [json.loads(line) for line in lines]
+    assert [r["seq"] for r in readings] == [0, 1, 2]
+    assert readings[0]["run_id"] == "r1"
+    assert readings[0]["gpu_card_watts"] == [1.0, 50.0]
+
+
+def test_run_csv_has_one_row_per_run_with_json_columns(stored_run):
+    rows = list(csv.DictReader(io.StringIO(
+        collect("csv", export.RUN_EXPORT_COLUMNS, export.run_chunks({"model": "bert"}, None, None)).decode(),
+    )))
+    assert [(row["run_id"], row["precision"], row["device_index"]) for row in rows] == [("r1", "FP16", "1")]
+    assert json.loads(rows[0]["energy_devices_j"]) == {"gpu": 12.5}
+
+
+def test_columnar_formats_round_trip(stored_run):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    parquet = collect("parquet", export.READING_EXPORT_COLUMNS, export.run_reading_chunks("r1", 1_000))
+    table = pq.read_table(io.BytesIO(parquet))
+    assert table.column("gpu_watts").to_pylist() == [50.0, 51.0, 52.0]
+    assert table.schema.field("seq").type == pa.int64()
+    arrow = collect("arrow", export.READING_EXPORT_COLUMNS, export.run_reading_chunks("r1", 1_000))
+    stream = pa.ipc.open_stream(arrow).read_all()
+    assert stream.column("gpu_card_watts").to_pylist()[0] == "[1.0, 50.0]"
+
+
+def test_check_format_rejects_unknown_formats():
+    with pytest.raises(ValueError, match="Unsupported format 'xlsx'"):
+        export.check_format("xlsx")
+    export.check_format("csv")
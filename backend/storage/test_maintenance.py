@@ -0,0 +1,93 @@
+import sqlite3
+import time
+
+import pytest
+
+from storage import maintenance
+from storage.maintenance import Maintenance
+
+DAY = 86400
+
+
+@pytest.fixture(autouse=True)
+def no_run_retention(monkeypatch):
+    monkeypatch.setattr(maintenance, "RUN_RETENTION_S", 0.0)
+
+
+def save(db, run_id: str, age_days: float, readings: int = 2, status: str = "complete"):
+    started_at = int(time.time() - age_days * DAY)
+    db.save_run({
+        "run_id": run_id, "status": status, "started_at": started_at,
+        "power_readings": [{"timestamp": started_at + i, "gpu_watts": float(i)} for i in range(readings)],
+    })
+
+
+def count_readings(db, run_id: str) -> int:
+    return db.get_db().execute("SELECT COUNT(*) FROM readings WHERE run_id = ?", (run_id,)).fetchone()[0]
+
+
+def test_cold_readings_move_to_the_archive_and_still_read_back(db):
+    save(db, "old", age_days=30)
+    save(db, "stuck", age_days=30, status="running")
+    save(db, "new", age_days=1)
+    db.flush_runs(5)
+
+    assert maintenance.archive_cold_readings() == 1
+    assert maintenance.archive_cold_readings() == 0
+    assert (count_readings(db, "old"), count_readings(db, "stuck"), count_readings(db, "new")) == (0, 2, 2)
+    assert [r["gpu_watts"] for r in db.get_run("old")["power_readings"]] == [0.0, 1.0]
+    assert [r["gpu_watts"] for r in db.iter_run_readings("old", started_at=db.get_run("old")["started_at"])] == [0.0, 1.0]
+
+
+def test_expired_runs_are_deleted_only_when_retention_is_set(db, monkeypatch):
+    save(db, "old", age_days=400)
+    save(db, "new", age_days=1)
+    db.flush_runs(5)
+    assert maintenance.expire_runs() == 0
+    monkeypatch.setattr(maintenance, "RUN_RETENTION_S", 365 * DAY)
+    assert maintenance.expire_runs() == 1
+    assert db.get_run("old") is None
+    assert db.get_run("new") is not None
+
+
+def test_new_databases_are_incremental_and_compact_frees_pages(db):
+    conn = db.get_db()
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == maintenance.INCREMENTAL
+    for i in range(50):
+        save(db, f"r{i}", age_days=1, readings=200)
+    db.flush_runs(5)
+    with conn:
+        conn.execute("DELETE FROM readings")
+    assert conn.execute("PRAGMA freelist_count").fetchone()[0] > 0
+    assert maintenance.compact() > 0
+    assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+
+
+def test_old_databases_switch_to_incremental_vacuum_below_the_size_cap(tmp_path, monkeypatch, db):
+    path = str(tmp_path / "legacy.db")
+    legacy = sqlite3.connect(path)
+    legacy.execute("CREATE TABLE runs (run_id TEXT PRIMARY KEY, data JSON NOT NULL, started_at INTEGER, status TEXT)")
+    legacy.commit()
+    legacy.close()
+    monkeypatch.setattr(db, "DB_PATH", path)
+    db.close_db()
+    db.init_db()
+    assert db.get_db().execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+
+    monkeypatch.setattr(maintenance, "AUTO_VACUUM_SWITCH_MAX_BYTES", 0)
+    assert maintenance.enable_incremental_vacuum() is False
+    assert maintenance.enable_incremental_vacuum(force=True) is True
+    assert db.get_db().execute("PRAGMA auto_vacuum").fetchone()[0] == maintenance.INCREMENTAL
+
+
+def test_only_the_lock_holder_runs_a_pass(db):
+    owner, other = Maintenance(), Maintenance()
+    try:
+        result = owner.run_once()
+        assert result["runs_archived"] == 0
+        assert other.run_once() == {}
+        owner.stop()
+        assert other.owns_lock()
+    finally:
+        owner.stop()
+        other.stop()
@@ -0,0 +1,56 @@
+import sqlite3
+
+import pytest
+
+from storage import rollups
+
+DAY = rollups.DAY_S
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    rollups.create(conn)
+    yield conn
+    conn.close()
+
+
+def complete(conn, energy_wh: float, started_at: int = 0, **fields):
+    rollups.record_completion(conn, {
+        "model": "bert", "precision": "FP16", "compute_target": "gpu", "started_at": started_at,
+        "total_energy_wh": energy_wh, "avg_watts": 100.0, "co2_g": 2.0, "num_samples": 50, "duration_s": 3.0,
+        **fields,
+    })
+
+
+def test_percentiles_from_the_histogram_stay_within_a_bin(conn):
+    energies = [i / 100 for i in range(1, 101)]
+    for energy in energies:
+        complete(conn, energy, grade="A" if energy < 0.5 else "B")
+    [group] = rollups.query(conn)
+    assert group["count"] == 100
+    assert group["p50_energy_wh"] == pytest.approx(0.50, rel=0.06)
+    assert group["p95_energy_wh"] == pytest.approx(0.95, rel=0.06)
+    assert group["mean_energy_wh"] == pytest.approx(sum(energies) / 100)
+    assert group["mean_watts"] == 100.0
+    assert group["co2_per_1k_calls"] == pytest.approx(200 / 5000 * 1000)
+    assert group["grade_distribution"] == {"A": 49, "B": 51}
+
+
+def test_energy_bins_clamp_at_both_ends():
+    assert rollups.energy_bin(0.0) == 0
+    assert rollups.energy_bin(1e9) == rollups.MAX_BIN
+    assert rollups.bin_value(rollups.energy_bin(2.0)) == pytest.approx(2.0, rel=0.06)
+
+
+def test_groups_filters_and_day_range(conn):
+    complete(conn, 1.0, started_at=0)
+    complete(conn, 1.0, started_at=DAY, precision="FP32")
+    complete(conn, 1.0, started_at=3 * DAY, precision="FP32")
+
+    by_precision = {g["precision"]: g["count"] for g in rollups.query(conn, group_by=("precision",))}
+    assert by_precision == {"FP16": 1, "FP32": 2}
+    assert [g["count"] for g in rollups.query(conn, since=DAY + 5, until=2 * DAY, group_by=())] == [1]
+    assert [g["count"] for g in rollups.query(conn, group_by=(), filters={"precision": "FP16"})] == [1]
+    with pytest.raises(ValueError, match="owner"):
+        rollups.query(conn, group_by=("owner",))
@@ -0,0 +1,94 @@
+import sqlite3
+
+import pytest
+
+from storage import timeseries
+from storage.timeseries import TimeSeriesStore, pick_tier, readings_timeline
+
+T0 = 1_000_000_020  # a whole minute
+NOW = 2_000_000_000.0
+
+
+@pytest.fixture
+def store():
+    conn = sqlite3.connect(":memory:")
+    timeseries.create(conn)
+    yield TimeSeriesStore(lambda: conn)
+    conn.close()
+
+
+def record(store: TimeSeriesStore, seconds: range) -> None:
+    for i in seconds:
+        store.record({"ts": T0 + i, "interval_s": 1.0, "total_watts": float(i), "gpu_watts": 2.0})
+
+
+@pytest.mark.parametrize("ago, span, tier", [
+    (600, 600, "raw"),               # recent and short
+    (10 * 3600, 3600, "10s"),        # past raw retention
+    (3600, 86400, "1m"),             # too many 10 s buckets for a day
+    (100 * 86400, 3600, "1h"),       # past the 1m retention
+    (5000 * 86400, 86400, "1h"),     # past everything: coarsest tier
+])
+def test_pick_tier_is_the_finest_that_holds_the_range(ago, span, tier):
+    assert pick_tier(NOW - ago, NOW - ago + span, NOW)[0] == tier
+
+
+def test_closed_buckets_roll_up_tier_by_tier(store):
+    record(store, range(130))
+    store.flush()
+    tens = store.query(T0, T0 + 130, tier="10s")["points"]
+    assert [p["ts"] - T0 for p in tens] == list(range(0, 120, 10))  # [120, 130) is still open
+    first = tens[0]
+    assert (first["samples"], first["seconds"]) == (10, 10.0)
+    assert (first["total_min"], first["total_mean"], first["total_max"], first["total_j"]) == (0.0, 4.5, 9.0, 45.0)
+    assert first["gpu_j"] == 20.0
+
+    minutes = store.query(T0, T0 + 130, tier="1m")["points"]
+    assert [p["ts"] - T0 for p in minutes] == [0, 60]
+    assert minutes[0]["samples"] == 60
+    assert minutes[0]["total_mean"] == 29.5
+    assert minutes[0]["total_j"] == sum(range(60))
+
+
+def test_rows_recorded_twice_and_repeated_flushes_do_not_double_count(store):
+    record(store, range(30))
+    store.flush()
+    record(store, range(30))
+    store.flush()
+    store.flush()
+    points = store.query(T0, T0 + 30, tier="10s")["points"]
+    assert [p["samples"] for p in points] == [10, 10]
+
+
+def test_raw_query_includes_readings_not_flushed_yet(store):
+    record(store, range(5))
+    store.flush()
+    record(store, range(5, 8))
+    points = store.query(T0, T0 + 10, tier="raw")["points"]
+    assert [p["ts"] - T0 for p in points] == list(range(8))
+
+
+def test_explicit_tier_over_max_points_is_rejected(store):
+    with pytest.raises(ValueError, match="over max_points"):
+        store.query(T0, T0 + 3600, tier="raw", max_points=100)
+    with pytest.raises(ValueError, match="Unknown tier"):
+        store.query(T0, T0 + 60, tier="5s")
+
+
+def test_readings_timeline_clips_to_the_range():
+    readings = [{"timestamp": 100 + i, "total_watts": float(i)} for i in range(10)]
+    timeline = readings_timeline(readings, 103, 107, 100, "total", "lttb")
+    assert timeline["points_in"] == 4
+    assert timeline["t"] == [103.0, 104.0, 105.0, 106.0]
+    assert timeline["watts"] == [3.0, 4.0, 5.0, 6.0]
+
+
+def test_store_timeline_reads_bucket_extremes_for_minmax(store, monkeypatch):
+    monkeypatch.setattr(timeseries.time, "time", lambda: T0 + 8 * 3600)  # raw no longer holds T0
+    record(store, range(130))
+    store.flush()
+    timeline = store.timeline(T0, T0 + 60, max_points=3, method="minmax")
+    assert timeline["source"] == "10s"
+    assert timeline["points_in"] == 6
+    assert timeline["min"][0] == 0.0
+    assert timeline["max"][-1] == 59.0
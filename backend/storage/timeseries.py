@@ -0,0 +1,350 @@
+"""
+Node power time series behind the poller, kept in tiers of decreasing resolution:
+    raw     every broadcast reading (ts, interval_s, per-device watts)   TS_RAW_RETENTION_H
+    10s     min/mean/max/energy buckets built from raw                   TS_10S_RETENTION_D
+    1m      built from 10s                                               TS_1M_RETENTION_D
+    1h      built from 1m                                                TS_1H_RETENTION_D
+Readings are buffered in memory and appended in one batch every TS_FLUSH_INTERVAL_S.
+Buckets are only written once closed (the finer tier has moved past them) and are
+recomputed from the tier below, so a restart or several uvicorn workers recording the
+same stream (raw rows are keyed by ts) never double count.
+"""
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterator
+
+import numpy as np
+
+from storage.downsample import METHODS, series
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("total", "gpu", "cpu", "npu")
+RAW = "raw"
+
+FLUSH_INTERVAL_S = float(os.getenv("TS_FLUSH_INTERVAL_S", "5"))
+PRUNE_INTERVAL_S = 600.0
+MAX_POINTS = int(os.getenv("TS_MAX_POINTS", "2000"))  # auto tier choice stays under this
+RAW_RETENTION_S = float(os.getenv("TS_RAW_RETENTION_H", "6")) * 3600
+
+# (name, resolution_s, retention_s); each tier is rolled up from the one before it
+TIERS = (
+    ("10s", 10, float(os.getenv("TS_10S_RETENTION_D", "3")) * 86400),
+    ("1m", 60, float(os.getenv("TS_1M_RETENTION_D", "30")) * 86400),
+    ("1h", 3600, float(os.getenv("TS_1H_RETENTION_D", "730")) * 86400),
+)
+RAW_RESOLUTION_S = 1.0  # nominal, for sizing raw queries
+# Most rows a timeline loads before downsampling (~4 MB as tuples); with the default
+# retentions every tier still qualifies for any range it holds
+TIMELINE_SOURCE_POINTS = 50_000
+
+RAW_FIELDS = ("ts", "interval_s", *(f"{m}_watts" for m in METRICS))
+_BUCKET_FIELDS = ("samples", "seconds", *(f"{m}_{s}" for m in METRICS for s in ("min", "mean", "max", "j")))
+
+SCHEMA = (
+    f'''CREATE TABLE IF NOT EXISTS ts_raw (
+        ts REAL PRIMARY KEY,
+        interval_s REAL NOT NULL,
+        {", ".join(f"{m}_watts REAL" for m in METRICS)}
+    ) WITHOUT ROWID''',
+    f'''CREATE TABLE IF NOT EXISTS ts_rollup (
+        tier INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        samples INTEGER NOT NULL,
+        seconds REAL NOT NULL,
+        {", ".join(f"{m}_min REAL, {m}_mean REAL, {m}_max REAL, {m}_j REAL" for m in METRICS)},
+        PRIMARY KEY (tier, bucket)
+    ) WITHOUT ROWID''',
+)
+
+_INSERT_RAW = f'''
+    INSERT OR IGNORE INTO ts_raw ({", ".join(RAW_FIELDS)})
+    VALUES ({", ".join("?" for _ in RAW_FIELDS)})
+'''
+_ROLLUP_FROM_RAW = f'''
+    INSERT OR REPLACE INTO ts_rollup (tier, bucket, {", ".join(_BUCKET_FIELDS)})
+    SELECT :res, CAST(ts / :res AS INTEGER) * :res AS b, COUNT(*), SUM(interval_s),
+        {", ".join(
+            f"MIN({m}_watts), SUM({m}_watts * interval_s) / NULLIF(SUM(interval_s), 0), "
+            f"MAX({m}_watts), SUM({m}_watts * interval_s)"
+            for m in METRICS
+        )}
+    FROM ts_raw WHERE ts >= :start AND ts < :end
+    GROUP BY b
+'''
+_ROLLUP_FROM_TIER = f'''
+    INSERT OR REPLACE INTO ts_rollup (tier, bucket, {", ".join(_BUCKET_FIELDS)})
+    SELECT :res, (bucket / :res) * :res AS b, SUM(samples), SUM(seconds),
+        {", ".join(
+            f"MIN({m}_min), SUM({m}_j) / NULLIF(SUM(seconds), 0), MAX({m}_max), SUM({m}_j)"
+            for m in METRICS
+        )}
+    FROM ts_rollup WHERE tier = :source AND bucket >= :start AND bucket < :end
+    GROUP BY b
+'''
+
+
+def create(conn: sqlite3.Connection):
+    for ddl in SCHEMA:
+        conn.execute(ddl)
+
+
+def pick_tier(start: float, end: float, now: float, max_points: int = MAX_POINTS) -> tuple[str, float]:
+    """Finest tier that still holds `start` and returns at most max_points for the span."""
+    span = max(end - start, 0.0)
+    if start >= now - RAW_RETENTION_S and span / RAW_RESOLUTION_S <= max_points:
+        return RAW, RAW_RESOLUTION_S
+    for name, resolution, retention in TIERS:
+        if start >= now - retention and span / resolution <= max_points:
+            return name, resolution
+    name, resolution, _ = TIERS[-1]
+    return name, resolution
+
+
+class TimeSeriesStore:
+    """Poller callback that persists node power into the tiered tables."""
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection], flush_interval_s: float = FLUSH_INTERVAL_S):
+        self._connect = connect
+        self.flush_interval_s = flush_interval_s
+        self._pending: list[tuple] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._last_prune = 0.0
+
+    # ── Ingest ────────────────────────────────────────────────────────────────
+    def record(self, reading: dict) -> None:
+        """Poller callback: buffer one reading (no I/O on the poller thread)."""
+        ts = reading.get("ts") or float(reading["timestamp"])
+        row = (ts, reading.get("interval_s", 1.0), *(reading.get(f"{m}_watts", 0.0) for m in METRICS))
+        with self._lock:
+            self._pending.append(row)
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="timeseries", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=10.0)
+        self.flush()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.flush_interval_s):
+            try:
+                self.flush()
+                if time.time() - self._last_prune >= PRUNE_INTERVAL_S:
+                    self.prune()
+            except Exception as e:
+                logger.error(f"Time series flush failed: {e}")
+
+    def flush(self) -> None:
+        """Append buffered readings in one transaction, then close any finished buckets."""
+        with self._lock:
+            rows, self._pending = self._pending, []
+        conn = self._connect()
+        with conn:
+            if rows:
+                conn.executemany(_INSERT_RAW, rows)
+            self._roll_up(conn)
+
+    def _roll_up(self, conn: sqlite3.Connection) -> None:
+        source_res = None  # None = raw
+        for _, resolution, _ in TIERS:
+            if source_res is None:
+                latest = conn.execute('SELECT MAX(ts) FROM ts_raw').fetchone()[0]
+            else:
+                # A source bucket covers [bucket, bucket + res); only count it once closed
+                latest = conn.execute(
+                    'SELECT MAX(bucket) + ? FROM ts_rollup WHERE tier = ?', (source_res, source_res),
+                ).fetchone()[0]
+            if latest is None:
+                return
+            end = int(latest // resolution) * resolution  # buckets before this one are closed
+            done = conn.execute('SELECT MAX(bucket) FROM ts_rollup WHERE tier = ?', (resolution,)).fetchone()[0]
+            if done is None:
+                first = conn.execute(
+                    'SELECT MIN(ts) FROM ts_raw' if source_res is None
+                    else 'SELECT MIN(bucket) FROM ts_rollup WHERE tier = ?',
+                    () if source_res is None else (source_res,),
+                ).fetchone()[0]
+                start = int(first // resolution) * resolution
+            else:
+                start = done + resolution
+            if start < end:
+                if source_res is None:
+                    conn.execute(_ROLLUP_FROM_RAW, {"res": resolution, "start": start, "end": end})
+                else:
+                    conn.execute(_ROLLUP_FROM_TIER, {
+                        "res": resolution, "source": source_res, "start": start, "end": end,
+                    })
+            source_res = resolution
+
+    def prune(self) -> None:
+        """Drop rows older than each tier's retention."""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            removed = conn.execute('DELETE FROM ts_raw WHERE ts < ?', (now - RAW_RETENTION_S,)).rowcount
+            for _, resolution, retention in TIERS:
+                removed += conn.execute(
+                    'DELETE FROM ts_rollup WHERE tier = ? AND bucket < ?', (resolution, now - retention),
+                ).rowcount
+        self._last_prune = now
+        if removed:
+            logger.info(f"Time series retention removed {removed} rows")
+
+    # ── Query ─────────────────────────────────────────────────────────────────
+    def query(self, start: float, end: float, tier: str | None = None, max_points: int = MAX_POINTS) -> dict:
+        """
+        Points in [start, end) from `tier` (None = pick_tier). Raw points include
+        readings not flushed yet; bucket points carry min/mean/max/joules per device.
+        An explicit tier that would return more than max_points raises ValueError (auto
+        only exceeds it on the coarsest tier, which its retention bounds).
+        """
+        now = time.time()
+        explicit = tier is not None
+        if tier is None:
+            tier, resolution = pick_tier(start, end, now, max_points)
+        elif tier == RAW:
+            resolution = RAW_RESOLUTION_S
+        else:
+            resolutions = {name: res for name, res, _ in TIERS}
+            if tier not in resolutions:
+                raise ValueError(f"Unknown tier '{tier}'; expected raw, {', '.join(resolutions)}")
+            resolution = resolutions[tier]
+        # Bucket ranges also return the bucket overlapping `start`
+        expected = math.ceil((end - start) / resolution) + (tier != RAW)
+        if explicit and expected > max_points:
+            raise ValueError(
+                f"Tier '{tier}' holds up to {expected} points for this range, over max_points={max_points}; "
+                f"use a coarser tier, a shorter range or tier=auto"
+            )
+
+        conn = self._connect()
+        # For explicit tiers LIMIT bounds the read even where the nominal resolution underestimates it
+        limit = max_points + 1 if explicit else -1
+        if tier == RAW:
+            fields = RAW_FIELDS
+            rows = conn.execute(
+                f'SELECT {", ".join(fields)} FROM ts_raw WHERE ts >= ? AND ts < ? ORDER BY ts LIMIT ?',
+                (start, end, limit),
+            ).fetchall()
+            with self._lock:
+                pending = [row for row in self._pending if start <= row[0] < end]
+            rows = [tuple(r) for r in rows]
+            if pending:
+                seen = {r[0] for r in rows}
+                rows += [row for row in pending if row[0] not in seen]
+                rows.sort()
+        else:
+            fields = ("bucket", *_BUCKET_FIELDS)
+            # Include the bucket that starts before `start` but overlaps it
+            rows = conn.execute(
+                f'SELECT {", ".join(fields)} FROM ts_rollup WHERE tier = ? AND bucket > ? AND bucket < ? '
+                f'ORDER BY bucket LIMIT ?',
+                (int(resolution), start - resolution, end, limit),
+            ).fetchall()
+            fields = ("ts", *_BUCKET_FIELDS)
+        if explicit and len(rows) > max_points:
+            raise ValueError(f"Tier '{tier}' has more than max_points={max_points} points for this range")
+        return {
+            "tier": tier,
+            "resolution_s": resolution,
+            "start": start,
+            "end": end,
+            "points": [dict(zip(fields, row)) for row in rows],
+        }
+
+    def iter_raw(self, start: float, end: float, chunk: int = 500) -> Iterator[list[dict]]:
+        """Committed raw samples in [start, end), oldest first, `chunk` rows per list."""
+        self.flush()
+        after = start
+        first = True
+        while True:
+            rows = self._connect().execute(
+                f'SELECT {", ".join(RAW_FIELDS)} FROM ts_raw WHERE ts {">=" if first else ">"} ? AND ts < ? '
+                f'ORDER BY ts LIMIT ?', (after, end, chunk),
+            ).fetchall()
+            yield [dict(zip(RAW_FIELDS, row)) for row in rows]
+            if len(rows) < chunk:
+                return
+            after, first = rows[-1][0], False
+
+    def timeline(
+        self, start: float, end: float, max_points: int = 500, metric: str = "total", method: str = "lttb",
+    ) -> dict:
+        """
+        One device's watts over [start, end), downsampled to at most max_points.
+        Reads the finest tier that holds the range (raw while retained), so LTTB
+        keeps real spikes; minmax on a bucket tier uses the buckets' own min/max.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}'; expected {', '.join(METRICS)}")
+        if method not in METHODS:
+            raise ValueError(f"Unknown method '{method}'; expected {' or '.join(METHODS)}")
+        tier, resolution = pick_tier(start, end, time.time(), TIMELINE_SOURCE_POINTS)
+        conn = self._connect()
+        lo = hi = None
+        if tier == RAW:
+            rows = conn.execute(
+                f'SELECT ts, {metric}_watts FROM ts_raw WHERE ts >= ? AND ts < ? ORDER BY ts', (start, end),
+            ).fetchall()
+            with self._lock:
+                column = 2 + METRICS.index(metric)
+                pending = [(row[0], row[column]) for row in self._pending if start <= row[0] < end]
+            data = np.array(rows + pending, dtype=np.float64).reshape(-1, 2)
+            if pending and rows:
+                data = data[np.argsort(data[:, 0], kind="stable")]
+        else:
+            rows = conn.execute(
+                f'SELECT bucket, {metric}_mean, {metric}_min, {metric}_max FROM ts_rollup '
+                f'WHERE tier = ? AND bucket > ? AND bucket < ? ORDER BY bucket',
+                (int(resolution), start - resolution, end),
+            ).fetchall()
+            data = np.array(rows, dtype=np.float64).reshape(-1, 4)
+            lo, hi = data[:, 2], data[:, 3]
+        result = series(data[:, 0], data[:, 1], max_points, method, lo, hi)
+        return {
+            "source": tier, "resolution_s": resolution, "metric": metric, "method": method,
+            "start": start, "end": end, "points_in": len(data), **result,
+        }
+
+
+def readings_timeline(
+    readings: list[dict], start: float, end: float, max_points: int, metric: str, method: str,
+) -> dict:
+    """TimeSeriesStore.timeline over the readings in [start, end) (e.g. those stored with a run)."""
+    points = []
+    for r in readings:
+        ts = r.get("ts") or r["timestamp"]
+        if start <= ts < end:
+            points.append((ts, r.get(f"{metric}_watts") or 0.0))
+    points.sort()
+    data = np.array(points, dtype=np.float64).reshape(-1, 2)
+    return {
+        "source": "run", "resolution_s": None, "metric": metric, "method": method,
+        "start": start, "end": end, "points_in": len(data),
+        **series(data[:, 0], data[:, 1], max_points, method),
+    }
+
+
+# ── Singleton ─────────────────────────────────────────────────────────────────
+_store: TimeSeriesStore | None = None
+
+
+def get_timeseries() -> TimeSeriesStore:
+    global _store
+    if _store is None:
+        from database import get_db
+        _store = TimeSeriesStore(get_db)
+    return _store
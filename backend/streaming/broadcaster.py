@@ -0,0 +1,235 @@
+"""
+WebSocket fan-out with one bounded outbound queue and writer task per client.
+`publish()` never awaits a socket: it drops the message into every client's queue and
+returns, so a stalled browser only ever delays itself.
+
+Slow-consumer policy (WS_SLOW_CLIENT_POLICY):
+    drop-oldest  full queue → discard the oldest queued frame (default)
+    latest       full queue → discard everything queued, keep only the newest frame
+A send that takes longer than WS_SEND_TIMEOUT_S closes that client; it reconnects and
+gets the history frame again.
+Each client has a wire encoding (streaming/codec.py) and a subscription
+(streaming/views.py). Clients are grouped by subscription; each group's View encodes a
+tick once per encoding its clients use and every client just picks its variant. A MessagePack client
+that dropped frames gets a keyframe next instead of a delta.
+"""
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from typing import Callable
+
+from fastapi import WebSocket
+
+from streaming.codec import JSON, MSGPACK, TickFrames
+from streaming.views import DEFAULT_SUBSCRIPTION, Subscription, View
+
+logger = logging.getLogger(__name__)
+
+SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "32"))
+SEND_TIMEOUT_S = float(os.getenv("WS_SEND_TIMEOUT_S", "2.0"))
+SLOW_CLIENT_POLICY = os.getenv("WS_SLOW_CLIENT_POLICY", "drop-oldest").strip().lower()
+
+
+class Subscriber:
+    """One connected client: its queue, writer task and delivery counters."""
+
+    def __init__(
+        self, websocket: WebSocket, queue_size: int, policy: str, send_timeout_s: float, encoding: str = JSON,
+    ):
+        self.websocket = websocket
+        self.policy = policy
+        self.send_timeout_s = send_timeout_s
+        self.encoding = encoding
+        self.subscription = DEFAULT_SUBSCRIPTION
+        self._need_keyframe = True  # until a history frame or keyframe sets the client's state
+        self._queue: deque[str | bytes] = deque()
+        self._queue_size = queue_size
+        self._ready = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.sent = 0
+        self.dropped = 0
+        self.timeouts = 0
+
+    def offer(self, frames: TickFrames) -> None:
+        """Queue this client's variant of a tick without blocking."""
+        dropping = len(self._queue) >= self._queue_size
+        if self.encoding != MSGPACK:
+            self.offer_raw(frames.json)
+        elif self._need_keyframe or dropping or frames.delta is None:
+            self.offer_raw(frames.keyframe)  # queued deltas after a gap are skipped by the client
+            self._need_keyframe = False
+        else:
+            self.offer_raw(frames.delta)
+
+    def offer_raw(self, message: str | bytes) -> None:
+        """Queue one encoded frame, applying the slow-consumer policy when full."""
+        if len(self._queue) >= self._queue_size:
+            if self.policy == "latest":
+                self.dropped += len(self._queue)
+                self._queue.clear()
+            else:
+                self._queue.popleft()
+                self.dropped += 1
+        self._queue.append(message)
+        self._ready.set()
+
+    def start(self, on_exit: Callable[["Subscriber"], None]) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._writer(on_exit))
+
+    def stop(self) -> None:
+        if self._task and not self._task.done() and self._task is not asyncio.current_task():
+            self._task.cancel()
+
+    async def _writer(self, on_exit: Callable[["Subscriber"], None]) -> None:
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                while self._queue:
+                    message = self._queue.popleft()
+                    send = self.websocket.send_bytes if isinstance(message, bytes) else self.websocket.send_text
+                    await asyncio.wait_for(send(message), self.send_timeout_s)
+                    self.sent += 1
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.info(f"WebSocket send timed out after {self.send_timeout_s}s; closing slow client")
+            await self._close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"WebSocket writer stopped: {e}")
+        finally:
+            on_exit(self)
+
+    async def _close(self) -> None:
+        try:
+            await asyncio.wait_for(self.websocket.close(code=1013), self.send_timeout_s)
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        return {"queued": len(self._queue), "sent": self.sent, "dropped": self.dropped, "timeouts": self.timeouts}
+
+
+class Broadcaster:
+    """
+    All connected clients, grouped into Views by subscription. Must be used from the
+    event loop thread. A View is created (and seeded from `history_source`, e.g. the
+    poller buffer) when its first client joins and dropped when its last one leaves.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = SEND_QUEUE_SIZE,
+        policy: str = SLOW_CLIENT_POLICY,
+        send_timeout_s: float = SEND_TIMEOUT_S,
+        history_size: int = 60,
+        history_source: Callable[[], list[dict]] | None = None,
+        on_change: Callable[[int], None] | None = None,
+    ):
+        if policy not in ("drop-oldest", "latest"):
+            logger.warning(f"Unknown WS_SLOW_CLIENT_POLICY '{policy}', using drop-oldest")
+            policy = "drop-oldest"
+        self.queue_size = queue_size
+        self.policy = policy
+        self.send_timeout_s = send_timeout_s
+        self.history_size = history_size
+        self.history_source = history_source
+        self.on_change = on_change
+        self._clients: dict[WebSocket, Subscriber] = {}
+        self._views: dict[tuple, View] = {}
+        self._members: dict[tuple, set[Subscriber]] = {}
+        self._dropped_closed = 0  # counters of clients that have since gone
+        self._timeouts_closed = 0
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def add(self, websocket: WebSocket, encoding: str = JSON) -> Subscriber:
+        """Register a client on the full stream; its view's history frame is queued first."""
+        subscriber = Subscriber(websocket, self.queue_size, self.policy, self.send_timeout_s, encoding)
+        self._clients[websocket] = subscriber
+        self._join(subscriber, DEFAULT_SUBSCRIPTION)
+        subscriber.start(self._writer_exited)
+        self._changed()
+        return subscriber
+
+    def subscribe(self, websocket: WebSocket, subscription: Subscription) -> None:
+        """Move a client to another view; it gets an ack and that view's history frame."""
+        subscriber = self._clients.get(websocket)
+        if subscriber is None:
+            return
+        self._leave(subscriber)
+        subscriber.offer_raw(json.dumps({"type": "subscribed", **subscription.as_dict()}))
+        self._join(subscriber, subscription)
+
+    def reject(self, websocket: WebSocket, detail: str) -> None:
+        subscriber = self._clients.get(websocket)
+        if subscriber is not None:
+            subscriber.offer_raw(json.dumps({"type": "error", "detail": detail}))
+
+    def remove(self, websocket: WebSocket) -> None:
+        subscriber = self._clients.pop(websocket, None)
+        if subscriber is not None:
+            self._leave(subscriber)
+            subscriber.stop()
+            self._dropped_closed += subscriber.dropped
+            self._timeouts_closed += subscriber.timeouts
+            self._changed()
+
+    def publish(self, reading: dict) -> None:
+        """Fan one broadcast reading out: each view encodes it once per encoding in use, then queues per client."""
+        for key, members in self._members.items():
+            frames = self._views[key].push(reading, {subscriber.encoding for subscriber in members})
+            if frames is not None:
+                for subscriber in members:
+                    subscriber.offer(frames)
+
+    def _join(self, subscriber: Subscriber, subscription: Subscription) -> None:
+        key = subscription.key
+        view = self._views.get(key)
+        if view is None:
+            view = self._views[key] = View(subscription, self.history_size)
+            view.seed(self.history_source() if self.history_source else [])
+        self._members.setdefault(key, set()).add(subscriber)
+        subscriber.subscription = subscription
+        frame = view.history.frame(subscriber.encoding)
+        if frame:
+            subscriber.offer_raw(frame)
+        subscriber._need_keyframe = not frame
+
+    def _leave(self, subscriber: Subscriber) -> None:
+        key = subscriber.subscription.key
+        members = self._members.get(key)
+        if members is not None:
+            members.discard(subscriber)
+            if not members:
+                del self._members[key]
+                del self._views[key]
+
+    def stats(self) -> dict:
+        clients = [s.stats() for s in self._clients.values()]
+        return {
+            "clients": len(clients),
+            "msgpack_clients": sum(s.encoding == MSGPACK for s in self._clients.values()),
+            "views": len(self._views),
+            "policy": self.policy,
+            "queue_size": self.queue_size,
+            "queued": sum(c["queued"] for c in clients),
+            "dropped_frames": self._dropped_closed + sum(c["dropped"] for c in clients),
+            "send_timeouts": self._timeouts_closed + sum(c["timeouts"] for c in clients),
+        }
+
+    def close(self) -> None:
+        for websocket in list(self._clients):
+            self.remove(websocket)
+
+    def _writer_exited(self, subscriber: Subscriber) -> None:
+        if self._clients.get(subscriber.websocket) is subscriber:
+            self.remove(subscriber.websocket)
+
+    def _changed(self) -> None:
+        if self.on_change:
+            self.on_change(len(self._clients))
@@ -0,0 +1,109 @@
+"""
+Wire encodings for /ws/power.
+
+JSON (default): one object per reading, as before.
+MessagePack (opt-in subprotocol "energent.msgpack.v2"): readings are flat arrays in a
+fixed field order, and after a keyframe only the fields that changed are sent:
+    keyframe  [0, fields, values]            full state, with the field order
+    delta     [1, base_seq, [index, value, index, value, ...]]
+                                             apply only when base_seq == last seq seen
+    history   [2, fields, [values, ...]]     backlog on connect, oldest first
+A client that missed a frame ignores deltas until its next keyframe; the broadcaster
+sends one to any client whose queue dropped frames.
+Every tick is encoded once per encoding in use, whatever the number of clients.
+"""
+import json
+import logging
+
+try:
+    import msgpack  # optional dependency; binary clients fall back to JSON without it
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+JSON = "json"
+MSGPACK = "msgpack"
+SUBPROTOCOL_MSGPACK = "energent.msgpack.v2"  # v2: flat delta pairs instead of an int-keyed map
+
+KEYFRAME, DELTA, HISTORY = 0, 1, 2
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+class TickFrames:
+    """One reading, encoded once per wire format its clients use (None for the others)."""
+    __slots__ = ("json", "keyframe", "delta")
+
+    def __init__(self, json_text: str | None = None, keyframe: bytes | None = None, delta: bytes | None = None):
+        self.json = json_text
+        self.keyframe = keyframe
+        self.delta = delta
+
+
+class MsgpackDeltaCodec:
+    """Keeps the field order and the previous reading so each tick is packed once."""
+
+    def __init__(self):
+        self.fields: tuple[str, ...] = ()
+        self._packer = msgpack.Packer()
+        self._packed_fields = b""
+        self._last_values: list | None = None
+        self._last_seq: int | None = None
+
+    def reset(self) -> None:
+        """Forget the previous reading (a tick went unencoded), so the next one has no delta."""
+        self._last_values = None
+
+    def encode(self, reading: dict) -> tuple[bytes, bytes, bytes | None]:
+        """
+        Pack `reading` as (row, keyframe, delta); row is the bare values array kept for
+        history frames. delta is None after reset() or when the field order changed,
+        since older state can't be patched into the new layout.
+        """
+        if tuple(reading) != self.fields:
+            self.fields = tuple(reading)
+            self._packed_fields = self._packer.pack(self.fields)
+            self._last_values = None
+        values = [reading[f] for f in self.fields]
+        row = self._packer.pack(values)
+        keyframe = b"".join([self._packer.pack_array_header(3), self._packer.pack(KEYFRAME), self._packed_fields, row])
+        delta = None
+        if self._last_values is not None:
+            # Flat [index, value, ...] pairs: int map keys are rejected by default decoders
+            changed = [
+                x for i, (v, old) in enumerate(zip(values, self._last_values)) if v != old for x in (i, v)
+            ]
+            delta = msgpack.packb([DELTA, self._last_seq, changed])
+        self._last_values = values
+        self._last_seq = reading.get("seq")
+        return row, keyframe, delta
+
+
+def msgpack_row(reading: dict) -> bytes:
+    """A reading's values in its own field order, as MsgpackDeltaCodec.encode packs them."""
+    return msgpack.packb(list(reading.values()))
+
+
+def msgpack_history_frame(fields: tuple[str, ...], rows: list[bytes]) -> bytes:
+    """Assemble [2, fields, [row, ...]] from already-packed rows without re-encoding them."""
+    packer = msgpack.Packer()
+    return b"".join([
+        packer.pack_array_header(3), packer.pack(HISTORY), packer.pack(fields),
+        packer.pack_array_header(len(rows)), *rows,
+    ])
+
+
+def json_history_frame(rows: list[str]) -> str:
+    return '{"type": "history", "readings": [' + ", ".join(rows) + "]}"
+
+
+def negotiate(requested: list[str]) -> str | None:
+    """Pick the subprotocol to accept from the client's offer (None → plain JSON)."""
+    if SUBPROTOCOL_MSGPACK in requested:
+        if msgpack_available():
+            return SUBPROTOCOL_MSGPACK
+        logger.warning("Client asked for MessagePack but msgpack is not installed; using JSON")
+    return None
@@ -0,0 +1,72 @@
+"""
+Serialized replay backlog for /ws/power.
+Every broadcast reading is kept here, encoded for the wire formats its view's clients
+use when it arrives; a new client gets the whole backlog as one pre-built frame:
+    JSON     {"type": "history", "readings": [<reading>, ...]}   (oldest first)
+    msgpack  [2, fields, [values, ...]]                          (see streaming/codec.py)
+Readings that arrived while no client used a format are encoded for it when the first
+such client asks for the frame. Each frame is rebuilt at most once per new reading, so a
+reconnect storm costs one send of the same cached frame per client.
+"""
+import json
+from collections import deque
+from typing import Collection
+
+from streaming.codec import (
+    JSON, MSGPACK, MsgpackDeltaCodec, TickFrames, json_history_frame, msgpack_available, msgpack_history_frame,
+    msgpack_row,
+)
+
+
+class HistoryCache:
+    """The newest `capacity` readings, each with its JSON text and packed msgpack row once encoded."""
+
+    def __init__(self, capacity: int):
+        self._entries: deque[list] = deque(maxlen=capacity)  # [reading, json text | None, msgpack row | None]
+        self._codec = MsgpackDeltaCodec() if msgpack_available() else None
+        self._frames: dict[str, str | bytes] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def append(self, reading: dict, encodings: Collection[str] = ()) -> TickFrames:
+        """Store one reading; returns its frames in `encodings` for the live broadcast."""
+        entry = [reading, None, None]
+        frames = TickFrames()
+        if JSON in encodings:
+            frames.json = entry[1] = json.dumps(reading)
+        if self._codec is not None:
+            if MSGPACK in encodings:
+                entry[2], frames.keyframe, frames.delta = self._codec.encode(reading)
+            else:
+                self._codec.reset()  # no delta can follow a tick msgpack clients never saw
+        self._entries.append(entry)
+        self._frames.clear()  # drop the cached frames; rebuilt on the next connect
+        return frames
+
+    def frame(self, encoding: str = JSON) -> str | bytes | None:
+        """The batched history frame for `encoding`, or None when there is nothing to replay."""
+        if not self._entries or (encoding == MSGPACK and self._codec is None):
+            return None
+        if encoding not in self._frames:
+            self._frames[encoding] = self._msgpack_frame() if encoding == MSGPACK else self._json_frame()
+        return self._frames[encoding]
+
+    def _json_frame(self) -> str:
+        for entry in self._entries:
+            if entry[1] is None:
+                entry[1] = json.dumps(entry[0])
+        return json_history_frame([entry[1] for entry in self._entries])
+
+    def _msgpack_frame(self) -> bytes:
+        # One field list per frame: only the newest run of readings sharing the latest field order
+        fields = tuple(self._entries[-1][0])
+        rows = []
+        for entry in reversed(self._entries):
+            if tuple(entry[0]) != fields:
+                break
+            if entry[2] is None:
+                entry[2] = msgpack_row(entry[0])
+            rows.append(entry[2])
+        rows.reverse()
+        return msgpack_history_frame(fields, rows)
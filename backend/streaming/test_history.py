@@ -0,0 +1,42 @@
+import json
+
+import msgpack
+
+from streaming.codec import JSON, MSGPACK
+from streaming.history import HistoryCache
+
+
+def tick(seq: int, **fields) -> dict:
+    return {"seq": seq, "total_watts": 10.0 + seq, **fields}
+
+
+def test_json_frame_replays_the_newest_readings_oldest_first():
+    history = HistoryCache(3)
+    assert history.frame(JSON) is None
+    for seq in range(5):
+        history.append(tick(seq), {JSON})
+    frame = json.loads(history.frame(JSON))
+    assert frame["type"] == "history"
+    assert [r["seq"] for r in frame["readings"]] == [2, 3, 4]
+    assert frame["readings"][-1] == tick(4)
+
+
+def test_frame_is_cached_until_the_next_reading():
+    history = HistoryCache(3)
+    history.append(tick(0), {JSON})
+    first = history.frame(JSON)
+    assert history.frame(JSON) is first
+    history.append(tick(1), {JSON})
+    assert history.frame(JSON) is not first
+    assert len(json.loads(history.frame(JSON))["readings"]) == 2
+
+
+def test_msgpack_frame_holds_only_rows_with_the_newest_field_order():
+    history = HistoryCache(5)
+    history.append({"seq": 0, "gpu_watts": 1.0}, {MSGPACK})
+    history.append(tick(1), {MSGPACK})
+    history.append(tick(2), {MSGPACK})
+    kind, fields, rows = msgpack.unpackb(history.frame(MSGPACK))
+    assert kind == 2
+    assert fields == ["seq", "total_watts"]
+    assert rows == [[1, 11.0], [2, 12.0]]
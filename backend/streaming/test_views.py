@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from streaming.codec import JSON
+from streaming.views import Subscription, View, fold_readings, project
+
+
+@pytest.mark.parametrize("message, error", [
+    ({"every": 0}, "'every'"),
+    ({"every": True}, "'every'"),
+    ({"every": 1.5}, "'every'"),
+    ({"fields": "total_watts"}, "'fields'"),
+    ({"fields": ["total_watts", "bogus"]}, "Unknown fields: bogus"),
+])
+def test_subscribe_rejects_bad_messages(message, error):
+    with pytest.raises(ValueError, match=error):
+        Subscription.parse(message)
+
+
+def test_subscription_key_ignores_field_order_and_implicit_fields():
+    a = Subscription.parse({"every": 5, "fields": ["total_watts", "gpu_watts", "seq"]})
+    b = Subscription.parse({"every": 5, "fields": ["gpu_watts", "total_watts"]})
+    assert a.key == b.key == (5, ("gpu_watts", "total_watts"))
+    assert Subscription.parse({}).key == (1, None)
+
+
+def test_fold_weights_by_interval_and_keeps_the_newest_metadata():
+    folded = fold_readings([
+        {"seq": 1, "total_watts": 10.0, "interval_s": 1.0, "gpu_card_watts": [4.0], "cpu_domain_watts": {"pkg": 2.0}},
+        {"seq": 2, "total_watts": 30.0, "interval_s": 3.0, "gpu_card_watts": [8.0], "cpu_domain_watts": {"pkg": 6.0}},
+    ])
+    assert folded["seq"] == 2
+    assert folded["total_watts"] == 25.0
+    assert folded["gpu_card_watts"] == [7.0]
+    assert folded["cpu_domain_watts"] == {"pkg": 5.0}
+    assert folded["interval_s"] == 4.0
+    assert folded["samples"] == 2
+
+
+def test_project_keeps_seq_and_timestamp():
+    reading = {"seq": 3, "timestamp": 100, "total_watts": 5.0, "gpu_watts": 1.0}
+    assert project(reading, ("total_watts",)) == {"seq": 3, "timestamp": 100, "total_watts": 5.0}
+    assert project(reading, None) is reading
+
+
+def test_view_emits_every_nth_reading_and_skips_replayed_seqs():
+    view = View(Subscription(every=2, fields=("total_watts",)), history_size=10)
+    emitted = []
+    for seq in (0, 1, 1, 2, 3):
+        frames = view.push({"seq": seq, "timestamp": seq, "total_watts": float(seq), "interval_s": 1.0}, {JSON})
+        if frames is not None:
+            emitted.append(json.loads(frames.json))
+    assert emitted == [
+        {"seq": 1, "timestamp": 1, "total_watts": 0.5},
+        {"seq": 3, "timestamp": 3, "total_watts": 2.5},
+    ]
+    assert len(view.history) == 2
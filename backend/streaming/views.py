@@ -0,0 +1,119 @@
+"""
+Per-subscriber views of the power stream.
+A client narrows its stream by sending, over the /ws/power socket:
+    {"type": "subscribe", "every": 10, "fields": ["total_watts"]}
+`every` folds that many consecutive readings into one (time-weighted averages, not
+dropping); `fields` projects each reading down to those fields plus seq/timestamp.
+Clients with the same subscription share one View, which is encoded once per tick
+for each wire format its clients use.
+"""
+from typing import Collection
+
+from models import PowerReading
+from streaming.codec import TickFrames
+from streaming.history import HistoryCache
+
+MAX_EVERY = 3600
+ALWAYS_FIELDS = ("seq", "timestamp")
+
+# Averaged over the folded readings; everything else is taken from the newest one
+AVERAGED_FIELDS = (
+    "gpu_watts", "cpu_watts", "npu_watts", "total_watts",
+    "gpu_utilization_pct", "cpu_utilization_pct", "npu_utilization_pct",
+)
+AVERAGED_LIST_FIELDS = ("gpu_card_watts", "gpu_card_utilization_pct")
+
+
+class Subscription:
+    """Downsample factor plus optional field projection; hashable via `key`."""
+    __slots__ = ("every", "fields")
+
+    def __init__(self, every: int = 1, fields: tuple[str, ...] | None = None):
+        self.every = every
+        self.fields = fields
+
+    @property
+    def key(self) -> tuple:
+        return self.every, self.fields
+
+    @classmethod
+    def parse(cls, message: dict) -> "Subscription":
+        """Validate a subscribe message; raises ValueError with a client-facing reason."""
+        every = message.get("every", 1)
+        if not isinstance(every, int) or isinstance(every, bool) or not 1 <= every <= MAX_EVERY:
+            raise ValueError(f"'every' must be an integer between 1 and {MAX_EVERY}")
+        fields = message.get("fields")
+        if fields is not None:
+            if not isinstance(fields, list) or not all(isinstance(f, str) for f in fields):
+                raise ValueError("'fields' must be a list of field names")
+            unknown = sorted(set(fields) - set(PowerReading.model_fields))
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+            fields = tuple(sorted(set(fields) - set(ALWAYS_FIELDS)))
+        return cls(every, fields)
+
+    def as_dict(self) -> dict:
+        return {"every": self.every, "fields": list(self.fields) if self.fields is not None else None}
+
+
+DEFAULT_SUBSCRIPTION = Subscription()
+
+
+class View:
+    """One distinct subscription: folds, projects and encodes readings once for all its clients."""
+
+    def __init__(self, subscription: Subscription, history_size: int):
+        self.subscription = subscription
+        self.history = HistoryCache(history_size)
+        self._pending: list[dict] = []
+        self._last_seq = -1
+
+    def push(self, reading: dict, encodings: Collection[str] = ()) -> TickFrames | None:
+        """Feed one broadcast reading; returns its frames in `encodings` when the view emits."""
+        seq = reading.get("seq", self._last_seq + 1)
+        if seq <= self._last_seq:
+            return None  # already seen (e.g. the seed raced with a queued broadcast)
+        self._last_seq = seq
+        self._pending.append(reading)
+        if len(self._pending) < self.subscription.every:
+            return None
+        folded = fold_readings(self._pending)
+        self._pending = []
+        return self.history.append(project(folded, self.subscription.fields), encodings)
+
+    def seed(self, readings: list[dict]) -> None:
+        """Fill the history without encoding anything (frames are built for whoever joins)."""
+        for reading in readings:
+            self.push(reading)
+
+
+def fold_readings(readings: list[dict]) -> dict:
+    """Merge consecutive readings into one, weighting each by its interval_s."""
+    if len(readings) == 1:
+        return readings[0]
+    folded = dict(readings[-1])
+    weights = [max(r.get("interval_s", 1.0), 1e-6) for r in readings]
+    span = sum(weights)
+
+    def mean(values: list[float]) -> float:
+        return round(sum(v * w for v, w in zip(values, weights)) / span, 1)
+
+    for field in AVERAGED_FIELDS:
+        folded[field] = mean([r.get(field, 0.0) for r in readings])
+    for field in AVERAGED_LIST_FIELDS:
+        columns = [r.get(field, []) for r in readings]
+        if len({len(c) for c in columns}) == 1:
+            folded[field] = [mean(list(values)) for values in zip(*columns)]
+    domains = folded.get("cpu_domain_watts", {})
+    folded["cpu_domain_watts"] = {
+        name: mean([r.get("cpu_domain_watts", {}).get(name, 0.0) for r in readings]) for name in domains
+    }
+    folded["interval_s"] = round(span, 4)
+    folded["samples"] = sum(r.get("samples", 1) for r in readings)
+    return folded
+
+
+def project(reading: dict, fields: tuple[str, ...] | None) -> dict:
+    if fields is None:
+        return reading
+    return {f: reading[f] for f in (*ALWAYS_FIELDS, *fields) if f in reading}
@@ -0,0 +1,141 @@
+import json
+import sqlite3
+import threading
+
+import pytest
+
+import database
+
+
+def test_each_thread_reuses_its_own_connection(db):
+    conn = db.get_db()
+    assert db.get_db() is conn
+    other = []
+    thread = threading.Thread(target=lambda: other.append(db.get_db()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_close_db_closes_every_connection_and_reopens_on_next_use(db):
+    conn = db.get_db()
+    db.close_db()
+    assert db._connections == []
+    reopened = db.get_db()
+    assert reopened is not conn
+    assert reopened.execute("SELECT 1").fetchone()[0] == 1
+
+
+def test_single_blob_database_is_migrated_to_the_current_schema(tmp_path, monkeypatch):
+    path = str(tmp_path / "legacy.db")
+    legacy = sqlite3.connect(path)
+    legacy.execute("CREATE TABLE runs (run_id TEXT PRIMARY KEY, data JSON NOT NULL, started_at INTEGER, status TEXT)")
+    done = {
+        "run_id": "old-1", "model": "bert", "task": "qa", "precision": "FP16", "compute_target": "gpu",
+        "status": "complete", "started_at": 1_700_000_000, "total_energy_wh": 0.5, "grade": "A",
+        "device_index": 0, "power_readings": [
+            {"timestamp": 1_700_000_000, "gpu_watts": 80.0, "latency_ms": {"gpu": 2.0}},
+            {"timestamp": 1_700_000_001, "gpu_watts": 90.0},
+        ],
+    }
+    failed = {"run_id": "old-2", "model": "bert", "status": "failed", "started_at": 1_700_000_100}
+    for run in (done, failed):
+        legacy.execute("INSERT INTO runs VALUES (?, ?, ?, ?)", (run["run_id"], json.dumps(run), run["started_at"], run["status"]))
+    legacy.commit()
+    legacy.close()
+
+    monkeypatch.setattr(database, "DB_PATH", path)
+    database.close_db()
+    database.init_db()
+    try:
+        conn = database.get_db()
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == database.SCHEMA_VERSION == 4
+        row = conn.execute("SELECT model, precision, grade, total_energy_wh FROM runs WHERE run_id = 'old-1'").fetchone()
+        assert tuple(row) == ("bert", "FP16", "A", 0.5)
+        assert conn.execute("SELECT COUNT(*) FROM readings WHERE run_id = 'old-1'").fetchone()[0] == 2
+        assert conn.execute("SELECT COUNT(*) FROM ts_raw").fetchone()[0] == 0
+
+        run = database.get_run("old-1")
+        assert run["device_index"] == 0
+        assert [r["gpu_watts"] for r in run["power_readings"]] == [80.0, 90.0]
+        assert run["power_readings"][0]["latency_ms"] == {"gpu": 2.0}
+
+        [group] = database.get_aggregates(group_by=("model",))
+        assert group["count"] == 1  # only the completed run is backfilled
+        assert group["grade_distribution"] == {"A": 1}
+    finally:
+        database.close_db()
+
+
+@pytest.fixture
+def held_writes(db, monkeypatch):
+    """Block the run writer's commits until the returned event is set."""
+    release = threading.Event()
+    write = db._writer._write
+    monkeypatch.setattr(db._writer, "_write", lambda runs: (release.wait(5), write(runs)))
+    yield release
+    release.set()
+    db.flush_runs(5)
+
+
+def make_run(run_id: str, started_at: int, readings: int = 0, **fields) -> dict:
+    return {
+        "run_id": run_id, "status": "complete", "started_at": started_at, "model": "bert",
+        "power_readings": [{"timestamp": started_at + i, "gpu_watts": float(i)} for i in range(readings)],
+        **fields,
+    }
+
+
+def test_unsaved_runs_are_read_from_the_write_queue(db, held_writes):
+    before = db.writer_stats()  # the writer is process-wide; counters include earlier tests
+    run = make_run("r1", 1_000, readings=3, status="running")
+    db.save_run(run)
+    run["status"] = "complete"
+    db.save_run(run)
+    db.save_run(run)
+
+    assert db.get_run("r1")["status"] == "complete"
+    assert [r["gpu_watts"] for r in db.iter_run_readings("r1")] == [0.0, 1.0, 2.0]
+    assert db.writer_stats()["pending"] >= 1
+    assert db.get_db().execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 0
+
+    held_writes.set()
+    assert db.flush_runs(5)
+    stats = db.writer_stats()
+    assert stats["pending"] == 0
+    assert stats["committed"] - before["committed"] + stats["coalesced"] - before["coalesced"] == 3
+    assert db.get_db().execute("SELECT status FROM runs WHERE run_id = 'r1'").fetchone()[0] == "complete"
+    assert [r["run_id"] for r in db.iter_run_readings("r1", chunk=2)] == ["r1"] * 3
+
+
+def test_history_pages_by_keyset_and_merges_unsaved_runs(db, held_writes):
+    held_writes.set()
+    for i, started_at in enumerate([100, 200, 200, 300, 400, 500, 600]):
+        db.save_run(make_run(f"r{i}", started_at, precision="FP16" if i % 2 else "FP32"))
+    assert db.flush_runs(5)
+    held_writes.clear()
+    db.save_run(make_run("new", 350))                   # not committed yet
+    db.save_run(make_run("r4", 400, status="failed"))   # committed as complete, now pending as failed
+
+    ids, cursor = [], None
+    while True:
+        page, cursor = db.query_history(3, cursor, fields=("started_at",))
+        ids += [run["run_id"] for run in page]
+        assert all(set(run) == {"run_id", "started_at"} for run in page)
+        if cursor is None:
+            break
+    assert ids == ["r6", "r5", "new", "r3", "r2", "r1", "r0"]
+
+    page, _ = db.query_history(10, filters={"precision": "FP16"}, since=200, until=500)
+    assert [run["run_id"] for run in page] == ["r5", "r3", "r1"]
+    page, _ = db.query_history(10, status="failed", fields=("power_readings",))
+    assert page == [{"run_id": "r4", "power_readings": []}]
+
+
+def test_history_rejects_bad_cursors_and_filters(db):
+    assert db.decode_cursor(db.encode_cursor({"run_id": "r1", "started_at": 5})) == (5, "r1")
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        db.query_history(10, cursor="not-a-cursor")
+    with pytest.raises(ValueError, match="Unknown filters: owner"):
+        db.query_history(10, filters={"owner": "me"})
@@ -8,7 +8,7 @@ export default function WorkloadsView() {
 
     useEffect(() => {
         setLoading(true)
-        fetch(API.history)
+        fetch(`${API.history}?fields=model,task,precision,compute_target,grade,avg_watts,co2_g,started_at`)
             .then(r => {
                 if (!r.ok) throw new Error('Failed to retrieve telemetry archive')
                 return r.json()
@@ -3,10 +3,17 @@ import { useState, useEffect, useRef } from 'react'
 
 const BUFFER_SIZE = 60
 
-export function usePowerData(lastMessage) {
+export function usePowerData(lastMessage, history) {
     const [buffer, setBuffer] = useState([])
     const [latest, setLatest] = useState(null)
 
+    // Backlog replayed on (re)connect replaces the buffer
+    useEffect(() => {
+        if (!history || history.length === 0) return
+        setBuffer(history.slice(-BUFFER_SIZE))
+        setLatest(history[history.length - 1])
+    }, [history])
+
     useEffect(() => {
         if (!lastMessage) return
         setLatest(lastMessage)
@@ -1,5 +1,6 @@
 // WebSocket connection to /ws/power with auto-reconnect every 2s
 // Handles React StrictMode double-mount cleanly with a mounted flag
+// On connect the server replays its backlog as one {type: 'history', readings: [...]} frame
 import { useState, useEffect, useRef, useCallback } from 'react'
 
 // Direct IPv4 connection to avoid localhost→IPv6 resolution issues on Windows
@@ -10,6 +11,7 @@ const RECONNECT_DELAY = 2000
 export function useWebSocket() {
     const [connected, setConnected] = useState(false)
     const [lastMessage, setLastMessage] = useState(null)
+    const [history, setHistory] = useState(null)
     const wsRef = useRef(null)
     const reconnectTimer = useRef(null)
     const mountedRef = useRef(true)  // prevents reconnect after unmount
@@ -35,7 +37,12 @@ export function useWebSocket() {
             ws.onmessage = (e) => {
                 if (!mountedRef.current) return
                 try {
-                    setLastMessage(JSON.parse(e.data))
+                    const data = JSON.parse(e.data)
+                    if (data.type === 'history') {
+                        setHistory(data.readings)
+                    } else if (!data.type) {
+                        setLastMessage(data)  // a reading (acks/errors carry a type)
+                    }
                 } catch { }
             }
 
@@ -79,5 +86,5 @@ export function useWebSocket() {
         }
     }, [connect])
 
-    return { connected, lastMessage }
+    return { connected, lastMessage, history }
 }
@@ -50,8 +50,8 @@ export default function Dashboard() {
     const [suggestions, setSuggestions] = useState([])
 
     // ── WebSocket & power data ─────────────────────────────────────────────────
-    const { connected, lastMessage } = useWebSocket()
-    const { latest, labels, gpuData, cpuData, npuData } = usePowerData(lastMessage)
+    const { connected, lastMessage, history } = useWebSocket()
+    const { latest, labels, gpuData, cpuData, npuData } = usePowerData(lastMessage, history)
 
     // ── PreOpt prediction ──────────────────────────────────────────────────────
     const { prediction, loading: predLoading } = usePredict(selectedModel, computeTarget, precision)